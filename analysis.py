@@ -10,20 +10,92 @@ different attributes, such as:
     user - the profile/handle of the Tweet's author
 These functions will only utilize the text information in each tweet.
 '''
-import string
-from nltk.corpus import stopwords
-import json
+import argparse
 from collections import Counter
 from collections import defaultdict
 from operator import itemgetter
+from math import fsum
 from math import log2
 import os
 import sys
-import numpy as np
-from pre_process import preprocess
+from co_occurrence_modes import resolve_mode
+from lexicons import lexicon
+from pre_process import preprocess_many
+from profiling import get_profiler
+from term_filters import resolve_filter
+from tweet_reader import read_texts
+from topk import top_pairs
 
 
-def generate_term_list(filename, term_filter):
+class TermStream(object):
+    '''
+    Iterable that lazily yields the filtered list of terms of each Tweet in a
+    .json file, so that a file larger than the available memory can be
+    analyzed. Every iteration reads the file again from the beginning.
+
+    **Parameters**
+
+        filename: *str*
+            The name of the .json file to be input, which can be
+            gzip-compressed.
+        term_filter: *str or TermFilter*
+            The filter to be used for parsing through all the words in the
+            Tweets (see term_filters.py).
+        start: *int*
+            The byte offset at which to start reading. It must be the start of
+            a line.
+        end: *int, optional*
+            The byte offset at which to stop reading. A line that starts
+            before end is read in full. If None, the file is read to the end.
+
+    **Attributes**
+
+        count: *int*
+            The number of lines read in the .json file so far.
+        ntweets: *int*
+            The number of Tweets yielded so far.
+    '''
+
+    def __init__(self, filename, term_filter, start=0, end=None):
+        self.filename = filename
+        self.start = start
+        self.end = end
+        # Resolve the filter once instead of once per Tweet
+        self.term_filter = resolve_filter(term_filter)
+        self.count = 0
+        self.ntweets = 0
+
+    def texts(self):
+        '''
+        Generator that yields the text of each Tweet in the .json file.
+        '''
+        reader = read_texts(self.filename, self.start, self.end)
+        self.count = 0
+        for text in reader:
+            self.count = reader.count
+            yield text
+        self.count = reader.count
+
+    def __iter__(self):
+        term_filter = self.term_filter
+        self.ntweets = 0
+        # Pre-process the information in each Tweet and apply the filter
+        for ppterms in preprocess_many(self.texts()):
+            self.ntweets += 1
+            yield term_filter(ppterms)
+
+
+def iter_terms(filename, term_filter):
+    '''
+    Lazily generate the filtered terms of each Tweet in a .json file. This is
+    the streaming counterpart of generate_term_list, and its output can be
+    consumed by calculate_term_frequencies, generate_co_matrix,
+    search_word_co_occurrences and stream_statistics.
+    '''
+    return TermStream(filename, term_filter)
+
+
+def generate_term_list(filename, term_filter, compact=False):
     '''
     Generate a list of all the terms that appear in a .json file
 
@@ -41,6 +113,12 @@ def generate_term_list(filename, term_filter):
                 single_terms - only counts terms once in a Tweet
                 single_stop_words - only counts terms once and does not
                                     consider stop-words
+            A TermFilter object or any other callable that filters a list of
+            tokens can also be used.
+        compact: *boolean*
+            If True, the terms are returned as a term_corpus.TermCorpus, which
+            stores them as arrays of integer term IDs and takes a fraction of
+            the memory of a list of lists of strings.
 
     **Returns**
 
@@ -50,50 +128,16 @@ def generate_term_list(filename, term_filter):
         count: *int*
             The number of lines in the .json file.
     '''
-    # Define list of common characters used for punctuation
-    punctuation = list(string.punctuation)
-    # Define list of stop-words, which are common words that do not carry
-    # significance (conjunctions, adverbs, etc.)
-    stop = stopwords.words('english') + punctuation + \
-        ["rt", "via", "…", "’", "“", "”", "‘", "1",
-            "2", "3", "4", "5", "6", "7", "8", "9", "0"]
-    terms = []
-    # Open the file
-    count = 0
-    with open(filename, 'rb') as f:
-        # Parse through each line/Tweet in the .json file
-        for line in f:
-            count += 1
-            tweet = json.loads(line)
-            # Pre-process the information in the Tweet
-            try:
-                ppterms = preprocess(tweet["text"])
-            except KeyError:
-                continue
-            # raise Exception("DEBUG")
-            # Apply the appropriate filter as specified by the user
-            if term_filter == "remove_stop_words":
-                terms.append([term for term in ppterms if term not in stop])
-            elif term_filter == "hashtags":
-                terms.append(
-                    [term for term in ppterms if term.startswith('#')])
-            elif term_filter == "terms_only":
-                terms.append(
-                    [term for term in ppterms if term not in stop and not term.startswith(('#', '@'))])
-            elif term_filter == "single_terms":
-                temp = [term for term in ppterms]
-                terms.append(list(set(temp)))
-            elif term_filter == "single_stop_words":
-                temp = [term for term in ppterms if term not in stop]
-                terms.append(list(set(temp)))
-            elif term_filter == "default" or term_filter is None:
-                terms.append([term for term in ppterms])
-            else:
-                raise Exception("Invalid filter type.")
-    return terms, count
+    if compact:
+        from term_corpus import TermCorpus
+        corpus = TermCorpus.from_file(filename, term_filter)
+        return corpus, corpus.count
+    stream = iter_terms(filename, term_filter)
+    terms = list(stream)
+    return terms, stream.count
 
 
-def calculate_term_frequencies(term_list, n):
+def calculate_term_frequencies(term_list, n, sketch=None, weights=None):
     '''
     Calculates term frequencies and will return the most common terms that
     appear in the data.
@@ -105,23 +149,48 @@ def calculate_term_frequencies(term_list, n):
             file.
         n: *int*
             The number of terms to return in the list of most common terms.
+        sketch: *topk.SpaceSaving or topk.CountMinSketch, optional*
+            If given, the terms are counted approximately with this sketch
+            instead of keeping an exact count of every term. The error
+            guarantees of the counts are given by sketch.error_bounds().
+        weights: *list, int, optional*
+            The number of times each Tweet is counted, as returned by
+            dedup.dedup_term_list. Every Tweet is counted once by default.
 
     **Returns**
 
         count_all: *collections.Counter*
             A Counter object that is used to keep count of how many times each
-            term appears in the term list.
+            term appears in the term list. If a sketch is used, the sketch is
+            returned instead.
         most_common_terms: *list, tuple*
             A list of the n most common terms that appear in the term list,
             along with the number of times each term appears.
     '''
-    count_all = Counter()
-    for i in term_list:
-        count_all.update(i)
+    # A TermCorpus counts the terms directly from its token array
+    if sketch is None and weights is None and \
+            hasattr(term_list, "term_counts"):
+        count_all = term_list.term_counts()
+        return count_all, count_all.most_common(n)
+    count_all = Counter() if sketch is None else sketch
+    if weights is None:
+        for i in term_list:
+            count_all.update(i)
+    else:
+        add = count_all.add if sketch is not None else None
+        for i, weight in zip(term_list, weights):
+            if weight == 1:
+                count_all.update(i)
+            elif add is not None:
+                for term in i:
+                    add(term, weight)
+            else:
+                for term in i:
+                    count_all[term] += weight
     return count_all, count_all.most_common(n)
 
 
-def generate_co_matrix(term_list):
+def generate_co_matrix(term_list, mode=None, weights=None):
     '''
     Generates the co-occurrence matrix (com), which keeps track of where terms
     appear in the same Tweet. The matrix is built such that the element at
@@ -129,21 +198,49 @@ def generate_co_matrix(term_list):
     Tweet as term y. Because this matrix will be symmetric, we only need to
     build a triangular matrix to keep track of all the different times terms
     appear next to each other in Tweets.
+
+    The mode (see co_occurrence_modes.py) decides which pairs of terms of a
+    Tweet are counted: all of them by default, or only the ones within a
+    sliding window, the distinct terms or the first terms of the Tweet. If
+    weights are given (see dedup.py), the pairs of each Tweet are counted as
+    many times as its weight.
     '''
+    mode = resolve_mode(mode)
     # Initialize dict subclass for the co-occurrence matrix
     com = defaultdict(lambda: defaultdict(int))
-    for tweet in term_list:
-        # Build co-occurrence matrix
-        for i in range(len(tweet) - 1):
-            # Have this loop start from i + 1 to build a triangular matrix
-            for j in range(i + 1, len(tweet)):
-                # Use sorted function to preserve alphabetical order
-                w1, w2 = sorted([tweet[i], tweet[j]])
-                if w1 != w2:
-                    com[w1][w2] += 1
+    if weights is not None:
+        for tweet, weight in zip(term_list, weights):
+            add_co_occurrences(com, mode.prepare(tweet), mode.window, weight)
+    elif mode.full:
+        for tweet in term_list:
+            add_co_occurrences(com, tweet)
+    else:
+        for tweet in term_list:
+            add_co_occurrences(com, mode.prepare(tweet), mode.window)
     return com
 
 
+def add_co_occurrences(com, tweet, window=None, weight=1):
+    '''
+    Add the pairs of terms of a single Tweet to the co-occurrence matrix. If
+    a window is given, only the terms that are less than window positions
+    apart are paired. Every pair is counted weight times.
+    '''
+    k = len(tweet)
+    # Build co-occurrence matrix
+    for i in range(k - 1):
+        # Have this loop start from i + 1 to build a triangular matrix
+        end = k if window is None else min(k, i + window)
+        for j in range(i + 1, end):
+            # Store the pair in alphabetical order
+            w1 = tweet[i]
+            w2 = tweet[j]
+            if w1 > w2:
+                w1, w2 = w2, w1
+            if w1 != w2:
+                com[w1][w2] += weight
+
+
 def co_occurrent_terms(com, n):
     '''
     Calculate the most frequent co-occurrent terms that appear in the data.
@@ -162,21 +259,16 @@ def co_occurrent_terms(com, n):
             the most frequent, along with the number of times they appear
             together.
     '''
-    com_max = []
-    for t1 in com:
-        # For each term in the co-occurrence matrix, sort according to
-        # frequency
-        t1_max_terms = sorted(
-            com[t1].items(), key=itemgetter(1), reverse=True)[:n]
-        for t2, count in t1_max_terms:
-            # Add each pairing to com_max
-            com_max.append(((t1, t2), count))
-    # Sort the output list by frequency
-    terms_max = sorted(com_max, key=itemgetter(1), reverse=True)
-    return terms_max[:n]
-
-
-def search_word_co_occurrences(keyword, term_list, n):
+    # The sparse matrix selects the most frequent pairs from its arrays
+    if hasattr(com, "top_pairs"):
+        return com.top_pairs(n)
+    # Select the n most frequent pairs with a heap instead of sorting every
+    # row of the matrix. Ties are kept in the order of the matrix, as with a
+    # stable sort.
+    return top_pairs(com, n)
+
+
+def search_word_co_occurrences(keyword, term_list, n, weights=None):
     '''
     Calculate term co-occurrences for a given keyword.
 
@@ -189,6 +281,9 @@ def search_word_co_occurrences(keyword, term_list, n):
             file.
         n: *int*
             The number of terms to return in the list of co-occurrences.
+        weights: *list, int, optional*
+            The number of times each Tweet is counted, as returned by
+            dedup.dedup_term_list. Every Tweet is counted once by default.
 
     **Returns**
 
@@ -196,28 +291,80 @@ def search_word_co_occurrences(keyword, term_list, n):
             A list with the words that appear the most frequently along with
             the specified keyword.
     '''
+    # A TermCorpus only reads the Tweets that contain the keyword
+    if weights is None and hasattr(term_list, "keyword_counts"):
+        return term_list.keyword_counts(keyword).most_common(n)
     count_search = Counter()
-    for tweet in term_list:
-        if keyword in tweet:
-            count_search.update(tweet)
+    if weights is None:
+        for tweet in term_list:
+            if keyword in tweet:
+                count_search.update(tweet)
+    else:
+        for tweet, weight in zip(term_list, weights):
+            if keyword in tweet:
+                for term in tweet:
+                    count_search[term] += weight
     return count_search.most_common(n)
 
 
+def stream_statistics(term_stream, keywords=(), mode=None):
+    '''
+    Calculate the term frequencies, the co-occurrence matrix and the keyword
+    co-occurrences in a single pass over a stream of terms, so that the terms
+    of every Tweet never have to be held in memory at the same time.
+
+    **Parameters**
+
+        term_stream: *iterable, list, str*
+            The terms of each Tweet, such as the output of iter_terms.
+        keywords: *list, str*
+            The words we want to calculate co-occurrences for.
+        mode: *str or co_occurrence_modes.CoOccurrenceMode, optional*
+            The mode of the co-occurrence matrix. All of the pairs of terms
+            are counted by default.
+
+    **Returns**
+
+        count_all: *collections.Counter*
+            A Counter object that is used to keep count of how many times each
+            term appears in the stream.
+        com: *collections.defaultdict*
+            The co-occurrence matrix, as built by generate_co_matrix.
+        keyword_counts: *dict*
+            A Counter object for each keyword with the terms that appear in
+            the same Tweets as the keyword.
+        ntweets: *int*
+            The number of Tweets in the stream.
+    '''
+    mode = resolve_mode(mode)
+    count_all = Counter()
+    com = defaultdict(lambda: defaultdict(int))
+    keyword_counts = {keyword: Counter() for keyword in keywords}
+    ntweets = 0
+    for tweet in term_stream:
+        ntweets += 1
+        count_all.update(tweet)
+        if mode.full:
+            add_co_occurrences(com, tweet)
+        else:
+            add_co_occurrences(com, mode.prepare(tweet), mode.window)
+        for keyword, count_search in keyword_counts.items():
+            if keyword in tweet:
+                count_search.update(tweet)
+    return count_all, com, keyword_counts, ntweets
+
+
 def define_lexicon(filename):
     '''
     Parse through a user-defined lexicon (in a text file) to create a list of
-    terms.
+    terms. The lexicon is loaded from the snapshot of lexicons.py, which is
+    only rebuilt when the text file changes.
     '''
-    raw_string_of_file = open(filename, encoding="ISO-8859-1")
-    words = []
-    for line in raw_string_of_file:
-        temp = line.splitlines()[0]
-        words.append(temp)
-    return words
+    return list(lexicon(filename))
 
 
 def sentiment_analysis(term_list, term_counts, com, positive_vocab,
-                       negative_vocab, num):
+                       negative_vocab, num, ntweets=None):
     '''
     Perform sentiment anlysis for a given data set of Tweets.
 
@@ -238,6 +385,11 @@ def sentiment_analysis(term_list, term_counts, com, positive_vocab,
         num: *int*
             The number of words to be returned in the top_pos and top_neg
             lists.
+        ntweets: *int, optional*
+            The number of Tweets. It must be given when term_list is a stream
+            that has already been consumed, in which case term_list is not
+            used. For weighted Tweets (see dedup.py), it is the sum of the
+            weights.
 
     **Returns**
 
@@ -253,16 +405,18 @@ def sentiment_analysis(term_list, term_counts, com, positive_vocab,
     # observing t1 and t2 together in the same Tweet
     pt = {}
     ptcom = defaultdict(lambda: defaultdict(int))
-    ntweets = len(term_list)
+    if ntweets is None:
+        ntweets = len(term_list)
     for t1, n in term_counts.items():
         pt[t1] = n / ntweets
-        for t2 in com[t1]:
-            ptcom[t1][t2] = com[t1][t2] / ntweets
+        # Read each row of the matrix once
+        for t2, count in com[t1].items():
+            ptcom[t1][t2] = count / ntweets
     # Calculate the PMI for each pair of terms
     pmi = defaultdict(lambda: defaultdict(int))
     for t1 in pt:
-        for t2 in com[t1]:
-            pmi[t1][t2] = log2(ptcom[t1][t2] / (pt[t1] * pt[t2]))
+        for t2, p in ptcom[t1].items():
+            pmi[t1][t2] = log2(p / (pt[t1] * pt[t2]))
     # Calculate the semantic orientation for every term
     semantic_orientation = {}
     for term, n in pt.items():
@@ -280,7 +434,33 @@ def sentiment_analysis(term_list, term_counts, com, positive_vocab,
     return semantic_sorted, top_pos, top_neg
 
 
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Analyze Tweets")
+    # Add arguments for profiling the analysis
+    parser.add_argument("--profile", dest="profile", nargs="?",
+                        const="profile.json", default=None,
+                        help="Write a .json report of the time and memory of each stage")
+    parser.add_argument("--sample-stage", dest="sample_stage",
+                        help="A stage to run under the sampling profiler")
+    parser.add_argument("--sample-file", dest="sample_file",
+                        help="The file the sampled call stacks are written to (profile_stacks.txt by default)")
+    parser.add_argument("--co-mode", dest="co_mode", default="full",
+                        help="The co-occurrence mode, such as full, window:5, dedup or cap:50")
+    return parser
+
+
 def main():
+    # Retrieve the input arguments
+    parser = get_parser()
+    args = parser.parse_args()
+    if args.profile is None and (args.sample_stage is not None or
+                                 args.sample_file is not None):
+        parser.error("--sample-stage and --sample-file require --profile")
+    profiler = get_profiler(args.profile is not None, args.sample_stage,
+                            args.sample_file or "profile_stacks.txt")
     # Input the filename
     filename = input("Please input the filename of the data to be analyzed: ")
     directory = "data"
@@ -319,15 +499,43 @@ def main():
             break
         else:
             search_word_ans = input("Please enter y/n ")
+    # Load the pre-processed Tweets from the cache next to the data file,
+    # which is only (re)built when the data file is new or has changed
+    from corpus_cache import load_corpus
+    with profiler.stage("load_corpus") as stage:
+        term_list = load_corpus(filename, term_filter)
+        stage["tweets"] = len(term_list)
+        stage["tokens"] = len(term_list.tokens)
+    num_tweets = term_list.count
+    ntweets = len(term_list)
+    ntokens = len(term_list.tokens)
     # Call upon the functions to perform sentiment analysis
-    term_list, num_tweets = generate_term_list(filename, term_filter)
-    term_count, term_freq = calculate_term_frequencies(term_list, n)
-    com = generate_co_matrix(term_list)
-    co_terms = co_occurrent_terms(com, n)
+    with profiler.stage("calculate_term_frequencies", ntweets, ntokens):
+        term_count = term_list.term_counts()
+        term_freq = term_count.most_common(n)
+    with profiler.stage("generate_co_matrix", ntweets, ntokens):
+        # The sparse matrix is built directly from the term IDs of the corpus
+        com = term_list.co_matrix(mode=args.co_mode)
+    with profiler.stage("co_occurrent_terms"):
+        co_terms = co_occurrent_terms(com, n)
     if SEARCH_WORD:
-        searched_word = search_word_co_occurrences(search_word, term_list, n)
-    so, top_pos, top_neg = sentiment_analysis(
-        term_list, term_count, com, positive_vocab, negative_vocab, n)
+        with profiler.stage("search_word_co_occurrences", ntweets, ntokens):
+            searched_word = search_word_co_occurrences(search_word, term_list,
+                                                       n)
+    # The vectorized sentiment analysis gives the same results as
+    # sentiment_analysis, up to floating-point rounding, when only the stored
+    # half of the matrix is used. Terms with no orientation are printed as
+    # 0.0 instead of 0.
+    import semantic
+    with profiler.stage("sentiment_analysis", ntweets, ntokens):
+        so, top_pos, top_neg = semantic.sentiment_analysis(
+            term_list, term_count, com, positive_vocab, negative_vocab, n,
+            ntweets, symmetric=False)
+    if profiler.enabled:
+        from profiling import co_matrix_entries
+        profiler.record(lines=num_tweets, tweets=ntweets, tokens=ntokens,
+                        vocabulary_size=len(term_count),
+                        co_occurrence_entries=co_matrix_entries(com))
     # Print results
     print("Most frequent terms:")
     for i in term_freq:
@@ -349,8 +557,14 @@ def main():
     orientations = []
     for i in so:
         orientations.append(i[1])
+    # The average of no orientations is nan, as with np.mean
+    average = fsum(orientations) / len(orientations) if orientations \
+        else float("nan")
     print("For a collection of " + str(num_tweets) +
-          " tweets, the average semantic orientation is " + str(np.mean(orientations)))
+          " tweets, the average semantic orientation is " + str(average))
+    if profiler.enabled:
+        profiler.write(args.profile)
+        print("Profile written to %s" % args.profile)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,523 @@
+'''
+This Python script runs a long-running local analysis service, so that every
+query does not have to start a new analysis.py process (which imports the
+modules, loads the lexicons, reads the data file and builds the co-occurrence
+matrix again). The server keeps in memory:
+    the pre-processed Tweets of every data file and term filter that was
+    queried (loaded from the cache of corpus_cache.py), along with their term
+    counts, co-occurrence matrix and semantic orientations, which are built
+    on the first query that needs them
+    the results of the queries, in an LRU cache with a memory budget: the
+    least recently used results are evicted first when the encoded results
+    take more than the budget
+
+Everything that was computed from a data file is keyed by its modification
+time, so when the file changes (for example, while collect_data.py is still
+streaming), its corpus is reloaded and its results are invalidated. To start
+the server from the terminal, enter the following command:
+
+python analysis_server.py -d data -p 8081 --cache-mb 64
+
+and query it with, for example:
+
+curl "http://localhost:8081/frequencies?file=stream_QUERY.json&filter=terms_only&n=10"
+
+The queries are frequencies, co_occurrences, search (with keyword=WORD),
+sentiment and orientation (with term=WORD). Every query takes the file
+(relative to the data directory), filter and n parameters, the sentiment and
+orientation queries also take symmetric=0 (the default, as in
+analysis.sentiment_analysis) or 1 (see semantic.semantic_orientations), and
+/stats returns the statistics of the server. The answers are JSON objects.
+'''
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+import numpy as np
+from analysis import define_lexicon
+from analysis import search_word_co_occurrences
+from co_occurrence_modes import resolve_mode
+from corpus_cache import load_corpus
+from semantic import semantic_orientations
+from term_filters import FILTER_NAMES
+
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "term_database")
+QUERIES = ("frequencies", "co_occurrences", "search", "sentiment",
+           "orientation")
+
+
+class QueryError(Exception):
+    '''
+    Error in the parameters of a query, which is answered with its status.
+    '''
+
+    def __init__(self, message, status=400):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+class ResultCache(object):
+    '''
+    LRU cache of encoded results with a memory budget.
+
+    **Parameters**
+
+        budget: *int*
+            The maximum number of bytes of the cached results.
+
+    **Attributes**
+
+        size: *int*
+            The number of bytes of the cached results.
+        hits: *int*
+            The number of results found in the cache.
+        misses: *int*
+            The number of results that were not in the cache.
+        evictions: *int*
+            The number of results evicted to stay within the budget.
+    '''
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        '''
+        Cache an encoded result, evicting the least recently used results
+        until the cache is within its budget. A result larger than the budget
+        is not cached.
+        '''
+        with self._lock:
+            if len(value) > self.budget:
+                return
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.budget:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, path):
+        '''
+        Remove the results of a data file.
+        '''
+        with self._lock:
+            for key in [key for key in self.entries if key[0] == path]:
+                self.size -= len(self.entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "bytes": self.size,
+                    "budget": self.budget, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+class ResidentCorpus(object):
+    '''
+    The pre-processed Tweets of a data file for a term filter, along with the
+    statistics that are built from them on demand.
+
+    **Parameters**
+
+        path: *str*
+            The path of the data file.
+        term_filter: *str*
+            The name of the term filter.
+        mtime: *int*
+            The modification time of the data file, in nanoseconds.
+        mode: *str or co_occurrence_modes.CoOccurrenceMode, optional*
+            The mode of the co-occurrence matrix.
+    '''
+
+    def __init__(self, path, term_filter, mtime, mode=None):
+        self.path = path
+        self.term_filter = term_filter
+        self.mtime = mtime
+        self.mode = mode
+        self.corpus = load_corpus(path, term_filter)
+        self._term_counts = None
+        self._com = None
+        self._orientations = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.corpus.close()
+
+    @property
+    def term_counts(self):
+        with self._lock:
+            if self._term_counts is None:
+                self._term_counts = self.corpus.term_counts()
+            return self._term_counts
+
+    @property
+    def com(self):
+        with self._lock:
+            if self._com is None:
+                self._com = self.corpus.co_matrix(mode=self.mode)
+            return self._com
+
+    def orientations(self, positive_vocab, negative_vocab, symmetric):
+        '''
+        Return the terms, their semantic orientations and the order of the
+        orientations, from the highest to the lowest.
+        '''
+        term_counts = self.term_counts
+        com = self.com
+        with self._lock:
+            if symmetric not in self._orientations:
+                terms, values = semantic_orientations(
+                    term_counts, com, positive_vocab, negative_vocab,
+                    len(self.corpus), symmetric)
+                order = np.argsort(-values, kind="stable")
+                self._orientations[symmetric] = (
+                    terms, values, order, {term: i for i, term in
+                                           enumerate(terms)})
+            return self._orientations[symmetric]
+
+
+class AnalysisService(object):
+    '''
+    The state of the analysis server: the resident corpora, the lexicons and
+    the result cache.
+
+    **Parameters**
+
+        data_dir: *str*
+            The directory of the data files. Files outside of it cannot be
+            queried.
+        cache_bytes: *int*
+            The memory budget of the result cache, in bytes.
+        max_corpora: *int*
+            The maximum number of resident corpora. The least recently used
+            corpus is unloaded first.
+        mode: *str, optional*
+            The mode of the co-occurrence matrices (see
+            co_occurrence_modes.py).
+        positive: *str*
+            The lexicon of positive words.
+        negative: *str*
+            The lexicon of negative words.
+    '''
+
+    def __init__(self, data_dir, cache_bytes=64 << 20, max_corpora=8,
+                 mode=None, positive=None, negative=None):
+        self.data_dir = os.path.realpath(data_dir)
+        self.cache = ResultCache(cache_bytes)
+        self.max_corpora = max_corpora
+        self.mode = resolve_mode(mode)
+        self.positive_vocab = define_lexicon(
+            positive or os.path.join(LEXICON_DIR, "positive_words.txt"))
+        self.negative_vocab = define_lexicon(
+            negative or os.path.join(LEXICON_DIR, "negative_words.txt"))
+        self.corpora = OrderedDict()
+        self.loads = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+        # One lock per corpus that is being loaded, so that a corpus is only
+        # loaded once and queries on the other corpora are not blocked
+        self._loading = {}
+
+    def resolve_file(self, filename):
+        '''
+        Return the path of a data file, which must be in the data directory.
+        '''
+        if not filename:
+            raise QueryError("Missing file parameter.")
+        path = os.path.realpath(os.path.join(self.data_dir, filename))
+        if os.path.commonpath([path, self.data_dir]) != self.data_dir:
+            raise QueryError("The file must be in the data directory.", 403)
+        if not os.path.isfile(path):
+            raise QueryError("Data file not found.", 404)
+        return path
+
+    def corpus(self, path, term_filter):
+        '''
+        Return the resident corpus of a data file and a term filter, loading
+        it again if the file has changed since it was loaded.
+        '''
+        mtime = os.stat(path).st_mtime_ns
+        key = (path, term_filter)
+        resident = self._resident(key, mtime)
+        if resident is not None:
+            return resident
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            # Another query may have loaded the corpus in the meantime
+            resident = self._resident(key, mtime)
+            if resident is not None:
+                return resident
+            # The corpus is loaded outside of the lock of the service
+            resident = ResidentCorpus(path, term_filter, mtime, self.mode)
+            with self._lock:
+                if self.corpora.pop(key, None) is not None:
+                    # The file has changed, so everything computed from it
+                    # is out of date. The old corpus is not closed, since
+                    # another query may still be reading it, and is freed
+                    # with its last reference.
+                    self.cache.invalidate(path)
+                self.loads += 1
+                self.corpora[key] = resident
+                while len(self.corpora) > self.max_corpora:
+                    # An evicted corpus is not closed either, for the same
+                    # reason: its memory map is released when the last query
+                    # that uses it returns
+                    self.corpora.popitem(last=False)
+                if self._loading.get(key) is loading:
+                    del self._loading[key]
+            return resident
+
+    def _resident(self, key, mtime):
+        '''
+        Return the resident corpus of a key if it is up to date, or None.
+        '''
+        with self._lock:
+            resident = self.corpora.get(key)
+            if resident is not None and resident.mtime == mtime:
+                self.corpora.move_to_end(key)
+                return resident
+            return None
+
+    def query(self, name, params):
+        '''
+        Answer a query, from the result cache if possible.
+
+        **Parameters**
+
+            name: *str*
+                The name of the query.
+            params: *dict*
+                The parameters of the query, as parsed by
+                urllib.parse.parse_qs.
+
+        **Returns**
+
+            body: *bytes*
+                The result, encoded as JSON.
+        '''
+        if name not in QUERIES:
+            raise QueryError("Unknown query.", 404)
+        path = self.resolve_file(first(params, "file"))
+        term_filter = first(params, "filter", "terms_only")
+        if term_filter not in FILTER_NAMES:
+            raise QueryError("Invalid filter.")
+        try:
+            n = int(first(params, "n", "10"))
+        except ValueError:
+            raise QueryError("Invalid n parameter.")
+        if n < 0:
+            raise QueryError("Invalid n parameter.")
+        argument = None
+        symmetric = first(params, "symmetric", "0") not in ("0", "false")
+        if name in ("search", "orientation"):
+            parameter = "keyword" if name == "search" else "term"
+            argument = first(params, parameter)
+            if not argument:
+                raise QueryError("Missing %s parameter." % parameter)
+        elif name == "sentiment":
+            argument = symmetric
+        mtime = os.stat(path).st_mtime_ns
+        key = (path, mtime, term_filter, name, argument, symmetric, n)
+        body = self.cache.get(key)
+        if body is not None:
+            return body
+        resident = self.corpus(path, term_filter)
+        result = self.compute(resident, name, argument, n, symmetric)
+        result.update({"file": os.path.relpath(path, self.data_dir),
+                       "filter": term_filter, "tweets": len(resident.corpus)})
+        body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        # The result is cached under the modification time of the corpus it
+        # was computed from
+        self.cache.put((path, resident.mtime, term_filter, name, argument,
+                        symmetric, n), body)
+        return body
+
+    def compute(self, resident, name, argument, n, symmetric=False):
+        '''
+        Compute the result of a query from a resident corpus.
+        '''
+        if name == "frequencies":
+            return {"frequencies": resident.term_counts.most_common(n)}
+        elif name == "co_occurrences":
+            return {"co_occurrences": resident.com.top_pairs(n)}
+        elif name == "search":
+            return {"keyword": argument,
+                    "co_occurrences": search_word_co_occurrences(
+                        argument, resident.corpus, n)}
+        terms, values, order, index = resident.orientations(
+            self.positive_vocab, self.negative_vocab, symmetric)
+        if name == "orientation":
+            i = index.get(argument)
+            return {"term": argument, "symmetric": symmetric,
+                    "orientation": float(values[i]) if i is not None else None}
+        top = order[:n].tolist()
+        bottom = order[max(len(order) - n, 0):].tolist() if n > 0 else []
+        return {"symmetric": argument,
+                "top_positive": [(terms[i], float(values[i])) for i in top],
+                "top_negative": [(terms[i], float(values[i]))
+                                 for i in bottom],
+                "average": float(values.mean()) if len(values) else None}
+
+    def stats(self):
+        '''
+        Return the statistics of the server as a dict.
+        '''
+        with self._lock:
+            corpora = [{"file": os.path.relpath(path, self.data_dir),
+                        "filter": term_filter,
+                        "tweets": len(resident.corpus),
+                        "tokens": len(resident.corpus.tokens)}
+                       for (path, term_filter), resident in
+                       self.corpora.items()]
+        return {"uptime": time.time() - self.started, "loads": self.loads,
+                "corpora": corpora, "cache": self.cache.stats()}
+
+    def close(self):
+        with self._lock:
+            for resident in self.corpora.values():
+                resident.close()
+            self.corpora.clear()
+
+
+def first(params, name, default=None):
+    '''
+    Return the first value of a query parameter.
+    '''
+    values = params.get(name)
+    return values[0] if values else default
+
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    '''
+    Handler of the queries to the analysis server.
+    '''
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        name = url.path.strip("/")
+        service = self.server.service
+        try:
+            if name == "stats":
+                body = json.dumps(service.stats()).encode("utf-8")
+            else:
+                body = service.query(name, parse_qs(url.query))
+        except QueryError as e:
+            self._send(e.status, json.dumps({"error": str(e)}).encode("utf-8"))
+            return
+        except Exception as e:
+            # Any other error is answered too, so that the client does not
+            # wait for a response that never comes
+            self.log_error("Error in %s: %r", self.path, e)
+            self._send(500, json.dumps(
+                {"error": "Internal error: %s" % e}).encode("utf-8"))
+            return
+        self._send(200, body)
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    '''
+    HTTP server that answers the queries of an AnalysisService.
+
+    **Parameters**
+
+        address: *tuple*
+            The host and port to listen on. Port 0 picks a free port.
+        service: *AnalysisService*
+            The service that answers the queries.
+        verbose: *boolean*
+            Whether to log every request.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, address, service, verbose=False):
+        ThreadingHTTPServer.__init__(self, address, AnalysisHandler)
+        self.service = service
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Serve analysis queries")
+    parser.add_argument("-d", "--data-dir", dest="data_dir", default="data",
+                        help="The directory of the data files")
+    parser.add_argument("--host", dest="host", default="localhost",
+                        help="The host to listen on")
+    parser.add_argument("-p", "--port", dest="port", type=int, default=8081,
+                        help="The port to listen on")
+    parser.add_argument("--cache-mb", dest="cache_mb", type=float, default=64,
+                        help="The memory budget of the result cache, in MB")
+    parser.add_argument("--max-corpora", dest="max_corpora", type=int,
+                        default=8,
+                        help="The number of corpora kept in memory")
+    parser.add_argument("--co-mode", dest="co_mode", default="full",
+                        help="The co-occurrence mode, such as full, window:5, dedup or cap:50")
+    parser.add_argument("-v", "--verbose", dest="verbose", action="store_true",
+                        help="Log every request")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    service = AnalysisService(args.data_dir, int(args.cache_mb * (1 << 20)),
+                              args.max_corpora, args.co_mode)
+    server = AnalysisServer((args.host, args.port), service, args.verbose)
+    print("Serving the data files of %s on %s" % (service.data_dir,
+                                                  server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+'''
+This Python script is a non-interactive version of the analysis in
+analysis.py, which can be run from scripts and cron jobs. It computes the
+results of several term filters and several search words in a single pass
+over each data file: every Tweet is read and tokenized once, and the view of
+every filter is derived from the same tokens. To run the analysis from the
+terminal, enter the following command:
+
+python batch_analysis.py -i data/stream_QUERY.json -f terms_only hashtags -k word1 word2 -n 10 --format json -o results.json
+
+The results of each data file and each filter are written as JSON or CSV, to
+the output file or to the terminal.
+'''
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter
+from analysis import define_lexicon
+from cooccurrence import SparseCoMatrix
+from pre_process import preprocess_many
+from profiling import co_matrix_entries
+from profiling import get_profiler
+from semantic import sentiment_analysis
+from term_filters import FILTER_NAMES
+from term_filters import resolve_filter
+from tweet_reader import TweetReader
+
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "term_database")
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Analyze Tweets in batch")
+    parser.add_argument("-i", "--input", dest="inputs", nargs="+",
+                        required=True, help="The .json files to analyze")
+    parser.add_argument("-f", "--filter", dest="filters", nargs="+",
+                        default=["terms_only"], choices=FILTER_NAMES,
+                        help="The term filters to use")
+    parser.add_argument("-k", "--keyword", dest="keywords", nargs="+",
+                        default=[],
+                        help="The words to calculate co-occurrences for")
+    parser.add_argument("-n", dest="n", type=int, default=10,
+                        help="The number of terms to return")
+    parser.add_argument("--combine", dest="combine", action="store_true",
+                        help="Analyze all of the input files as one data set")
+    parser.add_argument("--symmetric", dest="symmetric", action="store_true",
+                        help="Use both halves of the co-occurrence matrix for sentiment analysis")
+    parser.add_argument("--co-mode", dest="co_mode", default="full",
+                        help="The co-occurrence mode, such as full, window:5, dedup or cap:50")
+    parser.add_argument("--positive", dest="positive",
+                        default=os.path.join(LEXICON_DIR, "positive_words.txt"),
+                        help="The lexicon of positive words")
+    parser.add_argument("--negative", dest="negative",
+                        default=os.path.join(LEXICON_DIR, "negative_words.txt"),
+                        help="The lexicon of negative words")
+    parser.add_argument("--format", dest="format", default="json",
+                        choices=["json", "csv"], help="The output format")
+    parser.add_argument("-o", "--output", dest="output",
+                        help="The output file (the terminal by default)")
+    parser.add_argument("--profile", dest="profile",
+                        help="Write a .json report of the time and memory of each stage")
+    return parser
+
+
+class FilterAccumulator(object):
+    '''
+    Accumulator of the term counts, co-occurrences and keyword co-occurrences
+    of one term filter, which is fed the tokens of each Tweet.
+
+    **Parameters**
+
+        term_filter: *str*
+            The name of the term filter.
+        keywords: *list, str*
+            The words to calculate co-occurrences for.
+        mode: *str, optional*
+            The mode of the co-occurrence matrix (see co_occurrence_modes.py).
+    '''
+
+    def __init__(self, term_filter, keywords, mode=None):
+        self.name = term_filter
+        self.term_filter = resolve_filter(term_filter)
+        self.term_counts = Counter()
+        self.com = SparseCoMatrix(mode=mode)
+        self.keyword_counts = {keyword: Counter() for keyword in keywords}
+        self.ntweets = 0
+
+    def add(self, tokens):
+        '''
+        Add the tokens of a Tweet.
+        '''
+        terms = self.term_filter(tokens)
+        self.ntweets += 1
+        self.term_counts.update(terms)
+        self.com.add(terms)
+        for keyword, count_search in self.keyword_counts.items():
+            if keyword in terms:
+                count_search.update(terms)
+
+    def results(self, n, positive_vocab, negative_vocab, symmetric=False):
+        '''
+        Return the results of the filter as a dict.
+        '''
+        so, top_pos, top_neg = sentiment_analysis(
+            None, self.term_counts, self.com, positive_vocab, negative_vocab,
+            n, self.ntweets, symmetric)
+        average = sum(value for _, value in so) / len(so) if so else None
+        return {"filter": self.name,
+                "tweets": self.ntweets,
+                "vocabulary_size": len(self.term_counts),
+                "frequencies": self.term_counts.most_common(n),
+                "co_occurrences": self.com.top_pairs(n),
+                "keywords": {keyword: count_search.most_common(n)
+                             for keyword, count_search in
+                             self.keyword_counts.items()},
+                "sentiment": {"top_positive": top_pos,
+                              "top_negative": top_neg,
+                              "average": average}}
+
+
+def analyze(filenames, filters, keywords, n, positive_vocab, negative_vocab,
+            symmetric=False, profiler=None, mode=None):
+    '''
+    Analyze one data set, made of one or more .json files, for several term
+    filters and keywords in a single pass.
+
+    **Returns**
+
+        results: *list, dict*
+            The results of each filter.
+        lines: *int*
+            The number of lines read.
+    '''
+    if profiler is None:
+        profiler = get_profiler(False)
+    accumulators = [FilterAccumulator(term_filter, keywords, mode)
+                    for term_filter in filters]
+    lines = 0
+    with profiler.stage("single_pass %s" % " ".join(filenames)) as stage:
+        for filename in filenames:
+            reader = TweetReader(filename)
+            for tokens in preprocess_many(reader):
+                for accumulator in accumulators:
+                    accumulator.add(tokens)
+            lines += reader.count
+        stage["tweets"] = accumulators[0].ntweets if accumulators else 0
+    results = []
+    with profiler.stage("results %s" % " ".join(filenames)):
+        for accumulator in accumulators:
+            result = accumulator.results(n, positive_vocab, negative_vocab,
+                                         symmetric)
+            result["lines"] = lines
+            results.append(result)
+            key = "%s %s" % (accumulator.name, " ".join(filenames))
+            profiler.record(**{key: {
+                "vocabulary_size": len(accumulator.term_counts),
+                "co_occurrence_entries": co_matrix_entries(accumulator.com)}})
+    return results, lines
+
+
+def csv_rows(output):
+    '''
+    Generator that yields the results as rows of a CSV file, with one row per
+    value: input, filter, section, key, term, term2, value.
+    '''
+    yield ["input", "filter", "section", "key", "term", "term2", "value"]
+    for result in output["results"]:
+        prefix = [result["input"], result["filter"]]
+        yield prefix + ["tweets", "", "", "", result["tweets"]]
+        for term, count in result["frequencies"]:
+            yield prefix + ["frequency", "", term, "", count]
+        for (t1, t2), count in result["co_occurrences"]:
+            yield prefix + ["co_occurrence", "", t1, t2, count]
+        for keyword, terms in result["keywords"].items():
+            for term, count in terms:
+                yield prefix + ["keyword", keyword, term, "", count]
+        sentiment = result["sentiment"]
+        for term, value in sentiment["top_positive"]:
+            yield prefix + ["positive", "", term, "", value]
+        for term, value in sentiment["top_negative"]:
+            yield prefix + ["negative", "", term, "", value]
+        yield prefix + ["average_orientation", "", "", "",
+                        sentiment["average"]]
+
+
+def write_output(output, fmt, f):
+    '''
+    Write the results in the given format to an open file.
+    '''
+    if fmt == "json":
+        json.dump(output, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    else:
+        writer = csv.writer(f)
+        for row in csv_rows(output):
+            writer.writerow(row)
+
+
+def main():
+    args = get_parser().parse_args()
+    profiler = get_profiler(args.profile is not None)
+    missing = [filename for filename in args.inputs
+               if not os.path.exists(filename)]
+    if missing:
+        sys.stderr.write("Data file not found: %s\n" % ", ".join(missing))
+        sys.exit(2)
+    # Define the lexicons to be used for sentiment analysis
+    positive_vocab = define_lexicon(args.positive)
+    negative_vocab = define_lexicon(args.negative)
+    if args.combine:
+        data_sets = [(" ".join(args.inputs), args.inputs)]
+    else:
+        data_sets = [(filename, [filename]) for filename in args.inputs]
+    output = {"n": args.n, "keywords": args.keywords, "results": []}
+    for name, filenames in data_sets:
+        results, _ = analyze(filenames, args.filters, args.keywords, args.n,
+                             positive_vocab, negative_vocab, args.symmetric,
+                             profiler, args.co_mode)
+        for result in results:
+            result["input"] = name
+            output["results"].append(result)
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8", newline="") as f:
+            write_output(output, args.format, f)
+    else:
+        write_output(output, args.format, sys.stdout)
+    if args.profile:
+        profiler.write(args.profile)
+
+
+if __name__ == '__main__':
+    main()
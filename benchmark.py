@@ -0,0 +1,383 @@
+'''
+This Python script measures how the stages of the analysis scale with the
+size of the data. It generates a synthetic stream of Tweets (see
+synthetic_stream.py), runs every stage of the analysis on it and reports, for
+each stage, the time it takes, its throughput in Tweets per second and the
+peak memory it allocates. The results can be saved as a baseline, and later
+runs can be compared against the baseline to flag regressions. To run the
+benchmarks from the terminal, enter the following command:
+
+python benchmark.py -n 10000 100000 --baseline benchmark_baseline.json
+
+The inputs of the stages (the term list, the term counts and the
+co-occurrence matrices) are only built for the stages that are run, when they
+are first needed, and are released when no remaining stage needs them. The
+read, preprocess and generate_term_list stages stream the file without keeping
+its Tweets (preprocess includes the time to read the texts), so that they can
+run on streams larger than the available memory.
+
+The startup time of the analysis (imports, term filter and lexicons) is also
+measured in a new Python process, unless --no-startup is given.
+
+Add --save-baseline to store the results of the run as the new baseline. The
+run exits with status 1 if a stage is slower than its baseline by more than
+the threshold (25% by default), or if none of its sizes and stages are in the
+baseline. The timings depend on the machine, so the baseline should be saved
+again on the machine that runs the comparison, and after every intended
+change of performance.
+
+The legacy sentiment analysis (the sentiment_analysis stage) is quadratic in
+the size of the vocabulary, so it is only run if --include-slow is given or if
+it is named in --stages.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+import analysis
+import cooccurrence
+import semantic
+from pre_process import preprocess_many
+from synthetic_stream import generate_stream
+from tweet_reader import read_texts
+
+STAGES = ["read", "preprocess", "generate_term_list",
+          "calculate_term_frequencies", "generate_co_matrix",
+          "co_occurrent_terms", "search_word_co_occurrences",
+          "sparse_co_matrix", "sentiment_analysis",
+          "vectorized_sentiment_analysis"]
+# Stages that are too slow to run by default
+SLOW_STAGES = ["sentiment_analysis"]
+# The inputs of each stage, which are built outside of the timings
+STAGE_INPUTS = {
+    "read": (),
+    "preprocess": (),
+    "generate_term_list": (),
+    "calculate_term_frequencies": ("term_list",),
+    "generate_co_matrix": ("term_list",),
+    "co_occurrent_terms": ("com",),
+    "search_word_co_occurrences": ("term_list", "keyword"),
+    "sparse_co_matrix": ("term_list",),
+    "sentiment_analysis": ("term_list", "term_counts", "com"),
+    "vectorized_sentiment_analysis": ("term_list", "term_counts",
+                                      "sparse_com")}
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "term_database")
+# The startup of a short analysis: the imports, the term filter and the
+# lexicons
+STARTUP_CODE = """
+import analysis
+from term_filters import resolve_filter
+resolve_filter("terms_only")
+analysis.define_lexicon("term_database/positive_words.txt")
+analysis.define_lexicon("term_database/negative_words.txt")
+"""
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark the analysis")
+    parser.add_argument("-n", dest="sizes", type=int, nargs="+",
+                        default=[10000],
+                        help="The numbers of lines of the synthetic streams")
+    parser.add_argument("-s", "--seed", dest="seed", type=int, default=0,
+                        help="The seed of the synthetic streams")
+    parser.add_argument("-f", "--filter", dest="term_filter",
+                        default="default", help="The term filter to use")
+    parser.add_argument("--stages", dest="stages", nargs="+",
+                        choices=STAGES, help="The stages to run")
+    parser.add_argument("--include-slow", dest="include_slow",
+                        action="store_true",
+                        help="Also run the legacy sentiment analysis")
+    parser.add_argument("-r", "--repeat", dest="repeat", type=int, default=3,
+                        help="The number of timed runs of each stage")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Do not measure the peak memory of each stage")
+    parser.add_argument("--no-startup", dest="startup", action="store_false",
+                        help="Do not measure the startup time of the analysis")
+    parser.add_argument("--baseline", dest="baseline",
+                        help="The baseline file to compare against")
+    parser.add_argument("--save-baseline", dest="save_baseline",
+                        action="store_true",
+                        help="Save the results as the new baseline")
+    parser.add_argument("--threshold", dest="threshold", type=float,
+                        default=0.25,
+                        help="The relative slowdown flagged as a regression")
+    parser.add_argument("-o", "--output", dest="output",
+                        help="A .json file to write the results to")
+    return parser
+
+
+def measure(function, memory=True, repeat=3):
+    '''
+    Run a function and measure its wall time, and, in a separate run, the
+    peak memory it allocates. Memory is measured separately because
+    tracemalloc slows down the code that it traces.
+
+    **Returns**
+
+        result: *object*
+            The return value of the function.
+        seconds: *float*
+            The shortest wall time of repeat runs, which is the least affected
+            by other processes on the machine.
+        peak_mb: *float*
+            The peak memory allocated during the memory run, in MB, or None.
+    '''
+    seconds = None
+    for _ in range(repeat):
+        result = None
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        if seconds is None or elapsed < seconds:
+            seconds = elapsed
+    peak_mb = None
+    if memory:
+        del result
+        tracemalloc.start()
+        result = function()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def measure_startup(repeat=5):
+    '''
+    Measure the startup time of the analysis in a new Python process, which
+    is what short runs, such as cron jobs, pay every time. The time of an
+    empty Python process is subtracted.
+
+    **Returns**
+
+        seconds: *float*
+            The shortest startup time of repeat runs.
+    '''
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    def run(code):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=directory,
+                           check=True)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        return best
+
+    # The first run also builds the snapshot of lexicons.py if needed
+    return max(0.0, run(STARTUP_CODE) - run("pass"))
+
+
+def consume(iterable):
+    '''
+    Iterate over an iterable without keeping its items, and return the number
+    of items.
+    '''
+    last = deque(enumerate(iterable, 1), maxlen=1)
+    return last[0][0] if last else 0
+
+
+class StageInputs(object):
+    '''
+    The inputs of the stages for a .json file, each built when it is first
+    needed.
+    '''
+
+    def __init__(self, filename, term_filter):
+        self.filename = filename
+        self.term_filter = term_filter
+        self.values = {}
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            self.values[name] = getattr(self, "_" + name)()
+        return self.values[name]
+
+    def release(self, keep):
+        '''
+        Release every input that is not in keep.
+        '''
+        for name in [name for name in self.values if name not in keep]:
+            del self.values[name]
+
+    def _term_list(self):
+        return analysis.generate_term_list(self.filename, self.term_filter)[0]
+
+    def _term_counts(self):
+        return analysis.calculate_term_frequencies(self["term_list"], 10)[0]
+
+    def _keyword(self):
+        top_terms = self["term_counts"].most_common(1)
+        return top_terms[0][0] if top_terms else ""
+
+    def _com(self):
+        return analysis.generate_co_matrix(self["term_list"])
+
+    def _sparse_com(self):
+        return cooccurrence.generate_sparse_co_matrix(self["term_list"])
+
+
+def run_stages(filename, term_filter, stages, memory=True, repeat=3):
+    '''
+    Run the stages of the analysis on a .json file.
+
+    **Returns**
+
+        results: *dict*
+            The seconds, Tweets per second and peak memory of each stage.
+        ntweets: *int*
+            The number of Tweets in the file.
+    '''
+    positive_vocab = analysis.define_lexicon(
+        os.path.join(LEXICON_DIR, "positive_words.txt"))
+    negative_vocab = analysis.define_lexicon(
+        os.path.join(LEXICON_DIR, "negative_words.txt"))
+    inputs = StageInputs(filename, term_filter)
+    functions = {
+        "read": lambda: consume(read_texts(filename)),
+        "preprocess": lambda: consume(preprocess_many(read_texts(filename))),
+        "generate_term_list":
+            lambda: consume(analysis.TermStream(filename, term_filter)),
+        "calculate_term_frequencies":
+            lambda: analysis.calculate_term_frequencies(inputs["term_list"],
+                                                        10),
+        "generate_co_matrix":
+            lambda: analysis.generate_co_matrix(inputs["term_list"]),
+        "co_occurrent_terms":
+            lambda: analysis.co_occurrent_terms(inputs["com"], 10),
+        "search_word_co_occurrences":
+            lambda: analysis.search_word_co_occurrences(
+                inputs["keyword"], inputs["term_list"], 10),
+        "sparse_co_matrix":
+            lambda: cooccurrence.generate_sparse_co_matrix(
+                inputs["term_list"]),
+        "sentiment_analysis":
+            lambda: analysis.sentiment_analysis(
+                inputs["term_list"], inputs["term_counts"], inputs["com"],
+                positive_vocab, negative_vocab, 10),
+        "vectorized_sentiment_analysis":
+            lambda: semantic.sentiment_analysis(
+                inputs["term_list"], inputs["term_counts"],
+                inputs["sparse_com"], positive_vocab, negative_vocab, 10)}
+    results = {}
+    ntweets = None
+    for i, stage in enumerate(stages):
+        # Build the inputs of the stage outside of its timings
+        for name in STAGE_INPUTS[stage]:
+            inputs[name]
+        if ntweets is None and "term_list" in inputs.values:
+            ntweets = len(inputs["term_list"])
+        # Slow stages are only run once
+        _, seconds, peak_mb = measure(functions[stage], memory,
+                                      1 if stage in SLOW_STAGES else repeat)
+        results[stage] = {"seconds": seconds, "tweets_per_sec": None,
+                          "peak_mb": peak_mb}
+        inputs.release({name for remaining in stages[i + 1:]
+                        for name in STAGE_INPUTS[remaining]})
+    if ntweets is None:
+        # Only streaming stages were run
+        ntweets = consume(read_texts(filename))
+    for result in results.values():
+        if result["seconds"]:
+            result["tweets_per_sec"] = ntweets / result["seconds"]
+    return results, ntweets
+
+
+def compare(results, baseline, threshold, min_seconds=0.01):
+    '''
+    Compare the results of a run against a baseline. Stages that take less
+    than min_seconds in the baseline are too noisy to compare.
+
+    **Returns**
+
+        regressions: *list, str*
+            A description of every stage that is slower than its baseline by
+            more than the threshold.
+        compared: *int*
+            The number of stages that were compared against the baseline.
+    '''
+    regressions = []
+    compared = 0
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference is None or reference["seconds"] < min_seconds:
+                continue
+            compared += 1
+            ratio = result["seconds"] / reference["seconds"]
+            if ratio > 1 + threshold:
+                regressions.append("%s (n=%s): %.3fs vs %.3fs baseline (+%.0f%%)" %
+                                   (stage, size, result["seconds"],
+                                    reference["seconds"], (ratio - 1) * 100))
+    return regressions, compared
+
+
+def main():
+    args = get_parser().parse_args()
+    stages = args.stages
+    if stages is None:
+        # The legacy sentiment analysis is only run when asked for
+        stages = [stage for stage in STAGES
+                  if args.include_slow or stage not in SLOW_STAGES]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            filename = os.path.join(directory, "stream_%d.json" % size)
+            generate_stream(filename, size, args.seed)
+            stage_results, ntweets = run_stages(filename, args.term_filter,
+                                                stages, args.memory,
+                                                args.repeat)
+            results[str(size)] = stage_results
+            # Print results
+            print("\n%d lines, %d tweets:" % (size, ntweets))
+            print("%-30s %10s %14s %10s" % ("stage", "seconds", "tweets/sec",
+                                            "peak MB"))
+            for stage, result in stage_results.items():
+                peak = "-" if result["peak_mb"] is None else \
+                    "%.1f" % result["peak_mb"]
+                print("%-30s %10.4f %14.0f %10s" %
+                      (stage, result["seconds"], result["tweets_per_sec"] or 0,
+                       peak))
+    if args.startup:
+        seconds = measure_startup()
+        results["startup"] = {"startup": {"seconds": seconds,
+                                          "tweets_per_sec": None,
+                                          "peak_mb": None}}
+        print("\nStartup of the analysis: %.4f seconds" % seconds)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    status = 0
+    if args.baseline and os.path.exists(args.baseline) and \
+            not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions, compared = compare(results, baseline, args.threshold)
+        if not compared:
+            print("\nNo stage was compared: none of the sizes and stages of "
+                  "this run are in %s." % args.baseline)
+            status = 1
+        elif regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(regression)
+            status = 1
+        else:
+            print("\nNo regressions against %s." % args.baseline)
+    if args.save_baseline:
+        with open(args.baseline or "benchmark_baseline.json", 'w') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+'''
+This Python script contains the modes of the co-occurrence matrix, which
+decide which pairs of terms of a Tweet are counted. By default, every term of
+a Tweet is paired with every other term, so a Tweet of k terms adds k(k-1)/2
+pairs, and long Tweets (spam, walls of hashtags) dominate both the time it
+takes to build the matrix and its size. The modes are:
+    full - every pair of terms of the Tweet, as in analysis.generate_co_matrix
+           (O(k^2) per Tweet)
+    window:W - only the pairs of terms that are less than W positions apart,
+               which is a sliding window of W terms (O(k * W) per Tweet)
+    dedup - every term is only counted once per Tweet, so a term that is
+            repeated does not add its pairs again (O(k) to remove the
+            repetitions, then O(u^2) for the u distinct terms)
+    cap:M - only the first M terms of the Tweet are paired (O(min(k, M)^2)
+            per Tweet)
+
+Modes can be combined with "+", for example "dedup+window:5" or "cap:50+dedup".
+The repetitions are always removed first, then the terms are capped, and then
+the window is applied. If W or M is not given, DEFAULT_WINDOW and
+DEFAULT_MAX_TOKENS are used.
+'''
+
+DEFAULT_WINDOW = 5
+DEFAULT_MAX_TOKENS = 50
+MODE_NAMES = ("full", "window", "dedup", "cap")
+
+
+class CoOccurrenceMode(object):
+    '''
+    A mode of the co-occurrence matrix.
+
+    **Parameters**
+
+        name: *str*
+            The name of the mode.
+        window: *int, optional*
+            If given, only the terms that are less than this number of
+            positions apart are paired.
+        dedup: *boolean*
+            Whether a term should only be counted once in a Tweet.
+        max_tokens: *int, optional*
+            If given, only the first max_tokens terms of a Tweet are paired.
+    '''
+
+    def __init__(self, name="full", window=None, dedup=False,
+                 max_tokens=None):
+        if window is not None and window < 2:
+            raise Exception("The window must contain at least 2 terms.")
+        if max_tokens is not None and max_tokens < 0:
+            raise Exception("The number of terms cannot be negative.")
+        self.name = name
+        self.window = window
+        self.dedup = dedup
+        self.max_tokens = max_tokens
+
+    def __repr__(self):
+        return "CoOccurrenceMode(%r)" % self.name
+
+    @property
+    def full(self):
+        '''
+        Whether the mode pairs every term of a Tweet with every other term.
+        '''
+        return self.window is None and not self.dedup and \
+            self.max_tokens is None
+
+    def prepare(self, tweet):
+        '''
+        Return the terms (or term IDs) of a Tweet that are paired, before the
+        window is applied.
+        '''
+        if self.dedup:
+            # Keep the first occurrence of each term in the Tweet
+            tweet = list(dict.fromkeys(tweet))
+        if self.max_tokens is not None and len(tweet) > self.max_tokens:
+            tweet = tweet[:self.max_tokens]
+        return tweet
+
+    def npairs(self, k):
+        '''
+        Return the number of pairs of positions of a prepared Tweet of k
+        terms.
+        '''
+        if self.window is None or self.window >= k:
+            return k * (k - 1) // 2
+        w = self.window - 1
+        # Every position pairs with the next w positions, except the last w
+        return (k - w) * w + w * (w - 1) // 2
+
+
+def build_mode(mode):
+    '''
+    Build the CoOccurrenceMode object of a mode given by name, such as
+    "window:5" or "dedup+cap:50".
+    '''
+    window = None
+    dedup = False
+    max_tokens = None
+    for part in mode.split("+"):
+        name, _, value = part.strip().partition(":")
+        if name == "full" and not value:
+            continue
+        elif name == "window":
+            window = int(value) if value else DEFAULT_WINDOW
+        elif name == "dedup" and not value:
+            dedup = True
+        elif name == "cap":
+            max_tokens = int(value) if value else DEFAULT_MAX_TOKENS
+        else:
+            raise Exception("Invalid co-occurrence mode.")
+    return CoOccurrenceMode(mode, window, dedup, max_tokens)
+
+
+def resolve_mode(mode):
+    '''
+    Resolve a co-occurrence mode given either by name or as a
+    CoOccurrenceMode object. None is the full mode.
+    '''
+    if isinstance(mode, CoOccurrenceMode):
+        return mode
+    if mode is None:
+        return FULL
+    return build_mode(mode)
+
+
+FULL = CoOccurrenceMode()
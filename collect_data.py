@@ -8,15 +8,20 @@ python collect_data.py -q QUERY -d data -t hh:mm:ss
 where QUERY is the query of interest, data is the directory where the json
 file will be saved to, and time is the time that the stream will run for. If
 the query does not appear in enough tweets after 5 seconds, the stream will
-time out and return an error.
+time out and return an error. Tweets are saved by a background writer (see
+writers.py), and the following options can be added:
+    -v - print every Tweet to the terminal
+    -z - compress the output with gzip
+    --rotate-mb MB - start a new file when the current one reaches MB MB
+    --rotate-minutes MIN - start a new file every MIN minutes
 '''
 import argparse
-import string
 from tweepy import OAuthHandler
 from tweepy import Stream
 from tweepy.streaming import StreamListener
 import time
-import config
+from writers import StreamWriter
+from writers import format_filename
 
 
 def get_parser():
@@ -32,6 +37,16 @@ def get_parser():
                         help="The directory where the data will be saved in a .json file")
     parser.add_argument("-t", "--time-limit", dest="time_limit",
                         help="The desired amount of time to run the stream. Format should be hh:mm:ss")
+    # Add arguments for the output of the stream
+    parser.add_argument("-v", "--verbose", dest="verbose",
+                        action="store_true",
+                        help="Print every Tweet to the terminal")
+    parser.add_argument("-z", "--gzip", dest="compress", action="store_true",
+                        help="Compress the output with gzip")
+    parser.add_argument("--rotate-mb", dest="rotate_mb", type=float,
+                        help="Start a new file when the current one reaches this size")
+    parser.add_argument("--rotate-minutes", dest="rotate_minutes", type=float,
+                        help="Start a new file after this many minutes")
     return parser
 
 
@@ -46,29 +61,6 @@ def get_sec(time_str):
     return float(int(h) * 3600 + int(m) * 60 + int(s))
 
 
-def convert_valid(char):
-    '''
-    Converts a character into an appropriate one for use in filenames. If a
-    character is invalid, it will be replaced with a '_' character.
-    '''
-    # Define string with all valid characters for filenames
-    valid_chars = "-_.%s%s" % (string.ascii_letters, string.digits)
-    # Check if the character is valid or not and replace the invalid character
-    if char in valid_chars:
-        return char
-    else:
-        return '_'
-
-
-def format_filename(filename):
-    '''
-    Converts the filename into a string with suitable characters. It takes in
-    the name of the file to be converted and will return the appropriate
-    string.
-    '''
-    return ''.join(convert_valid(char) for char in filename)
-
-
 class MyListener(StreamListener):
     '''
     StreamListener object that is used to stream data from Twitter.
@@ -81,37 +73,71 @@ class MyListener(StreamListener):
             The keyword of interest.
         time_limit: *int*
             The time limit for the stream to run
+        writer: *writers.StreamWriter, optional*
+            The writer used to save the Tweets. If None, a writer with a
+            background thread is used.
+        verbose: *boolean*
+            Whether to print every Tweet to the terminal.
+
+    **Attributes**
+
+        received: *int*
+            The number of Tweets received from the stream.
+        dropped: *int*
+            The number of Tweets that could not be queued for writing.
     '''
 
-    def __init__(self, data_dir, query, time_limit):
+    def __init__(self, data_dir, query, time_limit, writer=None,
+                 verbose=False):
         # Make sure the filename is formatted properly
         query_filename = format_filename(query)
         self.outfile = "%s/stream_%s.json" % (data_dir, query_filename)
         self.start_time = time.time()
         self.time_limit = time_limit
+        if writer is None:
+            writer = StreamWriter(self.outfile, background=True)
+        self.writer = writer
+        self.verbose = verbose
+        self.received = 0
+        self.dropped = 0
+        self.closed = False
+
+    @property
+    def written(self):
+        '''
+        The number of Tweets that have been written to disk.
+        '''
+        return self.writer.written
 
     def on_data(self, data):
         '''
-        Write an individual Tweet to the output file. The data input is
-        encoded as a unicode type.
+        Queue an individual Tweet to be written to the output file. The data
+        input is encoded as a unicode type.
         '''
         # Check if the time limit has been reached
         if (time.time() - self.start_time) < self.time_limit:
-            try:
-                # Write data to the output file and print it to the terminal
-                with open(self.outfile, 'a') as f:
-                    f.write(data)
-                    print(data)
-                    return True
-            # Error handling
-            except BaseException as e:
-                print("Error on_data: %s" % str(e))
-                time.sleep(5)
+            self.received += 1
+            if not self.writer.write(data):
+                self.dropped += 1
+            if self.verbose:
+                print(data)
             return True
         else:
+            self.close()
             print("Time limit has been reached.")
             return False
 
+    def close(self):
+        '''
+        Write the remaining Tweets and print how many were saved.
+        '''
+        if self.closed:
+            return
+        self.closed = True
+        self.writer.close()
+        print("%d tweets received, %d written, %d dropped." %
+              (self.received, self.written, self.dropped))
+
     def on_error(self, status):
         '''
         Print the error status in case an error occurs.
@@ -124,7 +150,9 @@ def main():
     # Define parser and retrieve the input arguments
     parser = get_parser()
     args = parser.parse_args()
-    # Retrieve API keys and tokens
+    # Retrieve API keys and tokens. The config module is only imported here,
+    # so that MyListener can be used without credentials (see load_test.py)
+    import config
     consumer_key = config.consumer_key
     consumer_secret = config.consumer_secret
     access_token = config.access_token
@@ -132,10 +160,25 @@ def main():
     # Authenticate user
     auth = OAuthHandler(consumer_key, consumer_secret)
     auth.set_access_token(access_token, access_secret)
+    # Define the writer used to save the Tweets
+    query_filename = format_filename(args.query)
+    rotate_bytes = None
+    if args.rotate_mb is not None:
+        rotate_bytes = int(args.rotate_mb * 1024 * 1024)
+    rotate_interval = None
+    if args.rotate_minutes is not None:
+        rotate_interval = args.rotate_minutes * 60
+    writer = StreamWriter("%s/stream_%s.json" % (args.data_dir, query_filename),
+                          compress=args.compress, rotate_bytes=rotate_bytes,
+                          rotate_interval=rotate_interval, background=True)
     # Stream Twitter data using StreamListener object
-    twitter_stream = Stream(auth, MyListener(
-        args.data_dir, args.query, get_sec(args.time_limit)), timeout=10)
-    twitter_stream.filter(track=[args.query])
+    listener = MyListener(args.data_dir, args.query,
+                          get_sec(args.time_limit), writer, args.verbose)
+    twitter_stream = Stream(auth, listener, timeout=10)
+    try:
+        twitter_stream.filter(track=[args.query])
+    finally:
+        listener.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,439 @@
+'''
+This Python script contains a compact co-occurrence matrix for large data
+sets. Instead of nested dicts keyed by strings, every term is interned once in
+a Vocabulary that maps it to an integer ID, and the pairs of IDs that appear
+in the same Tweet are accumulated in batches into sorted NumPy arrays. Every
+batch is reduced on its own into a sorted run, and runs of similar sizes are
+merged (geometric compaction, as in a log-structured merge tree), so that
+every pair is merged O(log N) times instead of once per batch. The finished
+matrix is stored in CSR form (compressed sparse rows): for the row of a term,
+indptr gives the range of the cols and counts arrays that hold its
+co-occurrences. The transposed matrix, which gives the rows in which a term
+appears as a column, is built from the CSR arrays when it is first needed.
+
+As in analysis.generate_co_matrix, only the triangular half of the matrix is
+stored, with the alphabetically smaller term as the row. A SparseCoMatrix can
+be indexed like the dict returned by that function (com[t1][t2]), so that it
+can be used with co_occurrent_terms and sentiment_analysis.
+'''
+import numpy as np
+from co_occurrence_modes import resolve_mode
+
+
+class Vocabulary(object):
+    '''
+    Mapping of terms to consecutive integer IDs, in the order in which the
+    terms are first seen.
+    '''
+
+    def __init__(self, terms=()):
+        self.ids = {}
+        self.terms = []
+        for term in terms:
+            self.intern(term)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return term in self.ids
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def intern(self, term):
+        '''
+        Return the ID of a term, adding it to the vocabulary if it is new.
+        '''
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def encode(self, tokens):
+        '''
+        Convert a list of terms into a list of IDs, interning new terms.
+        '''
+        ids = self.ids
+        intern = self.intern
+        return [ids[term] if term in ids else intern(term) for term in tokens]
+
+    def decode(self, ids):
+        '''
+        Convert a sequence of IDs back into a list of terms.
+        '''
+        terms = self.terms
+        return [terms[term_id] for term_id in ids]
+
+    def get(self, term, default=None):
+        '''
+        Return the ID of a term without interning it.
+        '''
+        return self.ids.get(term, default)
+
+
+class SparseCoMatrix(object):
+    '''
+    Sparse co-occurrence matrix of integer term IDs.
+
+    **Parameters**
+
+        vocabulary: *Vocabulary, optional*
+            The vocabulary used to intern terms. A new one is created if None.
+        batch_size: *int*
+            The number of pairs of terms that are buffered before they are
+            merged into the sorted arrays of the matrix.
+        mode: *str or co_occurrence_modes.CoOccurrenceMode, optional*
+            The mode of the matrix, which decides which pairs of terms of a
+            Tweet are counted. All of the pairs are counted by default.
+    '''
+
+    def __init__(self, vocabulary=None, batch_size=1000000, mode=None):
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self.batch_size = batch_size
+        self.mode = resolve_mode(mode)
+        # Accumulated pairs, as runs of sorted unique keys (lo << 32 | hi)
+        # and counts, from the largest to the smallest
+        self._runs = []
+        # Tweets whose pairs have not been accumulated yet, and their weights
+        self._pending = []
+        self._pending_weights = []
+        self._pending_pairs = 0
+        self._csr = None
+        self._transposed = None
+        self._rank = None
+
+    def add(self, tweet, weight=1):
+        '''
+        Add the pairs of terms of a single Tweet to the matrix. A weight
+        greater than 1 counts the Tweet that many times (see dedup.py).
+        '''
+        self.add_ids(self.vocabulary.encode(tweet), weight)
+
+    def add_ids(self, ids, weight=1):
+        '''
+        Add the pairs of term IDs of a single Tweet to the matrix.
+        '''
+        mode = self.mode
+        if not mode.full:
+            ids = mode.prepare(ids)
+        k = len(ids)
+        if k < 2:
+            return
+        self._pending.append(ids)
+        self._pending_weights.append(weight)
+        self._pending_pairs += mode.npairs(k)
+        self._csr = None
+        self._transposed = None
+        if self._pending_pairs >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        '''
+        Reduce the pairs of the pending Tweets into a new run of the
+        accumulated arrays. Tweets with the same number of terms are stacked
+        into one 2D array, so that all of their pairs are generated with a few
+        NumPy operations.
+        '''
+        if not self._pending:
+            return
+        by_length = {}
+        for ids, weight in zip(self._pending, self._pending_weights):
+            group = by_length.setdefault(len(ids), ([], []))
+            group[0].append(ids)
+            group[1].append(weight)
+        self._pending = []
+        self._pending_weights = []
+        self._pending_pairs = 0
+        keys = []
+        counts = []
+        window = self.mode.window
+        for k, (tweets, weights) in by_length.items():
+            stacked = np.array(tweets, dtype=np.uint64)
+            i, j = np.triu_indices(k, 1)
+            if window is not None:
+                # Only the positions that are less than window apart
+                near = j - i < window
+                i, j = i[near], j[near]
+            lo = np.minimum(stacked[:, i], stacked[:, j]).ravel()
+            hi = np.maximum(stacked[:, i], stacked[:, j]).ravel()
+            # A term is never paired with itself
+            distinct = lo != hi
+            keys.append((lo[distinct] << np.uint64(32)) | hi[distinct])
+            # Every pair of a Tweet counts as many times as the Tweet
+            counts.append(np.repeat(np.array(weights, dtype=np.int64),
+                                    len(i))[distinct])
+        unique, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        runs = self._runs
+        counts = np.bincount(inverse.ravel(), weights=np.concatenate(counts),
+                             minlength=len(unique))
+        runs.append((unique, counts.astype(np.int64)))
+        # Merge the last run into the one before it while they have similar
+        # sizes, so that the sizes of the runs decrease geometrically
+        while len(runs) > 1 and len(runs[-2][0]) <= 2 * len(runs[-1][0]):
+            run = runs.pop()
+            runs[-1] = merge_runs(runs[-1], run)
+
+    def _merged(self):
+        '''
+        Merge every run, and return the keys and counts of all of the pairs.
+        '''
+        self._flush()
+        runs = self._runs
+        if not runs:
+            return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+        while len(runs) > 1:
+            run = runs.pop()
+            runs[-1] = merge_runs(runs[-1], run)
+        return runs[0]
+
+    def _build(self):
+        '''
+        Build the CSR arrays, with the alphabetically smaller term of each
+        pair as the row, in the same way as analysis.generate_co_matrix.
+        '''
+        keys, counts = self._merged()
+        terms = self.vocabulary.terms
+        nterms = len(terms)
+        # Rank of every ID in alphabetical order of the terms
+        rank = np.empty(nterms, dtype=np.int64)
+        rank[np.array(sorted(range(nterms), key=terms.__getitem__),
+                      dtype=np.int64)] = np.arange(nterms)
+        lo = (keys >> np.uint64(32)).astype(np.int64)
+        hi = (keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        swap = rank[lo] > rank[hi]
+        rows = np.where(swap, hi, lo)
+        cols = np.where(swap, lo, hi)
+        order = np.lexsort((cols, rows))
+        rows = rows[order]
+        cols = cols[order]
+        counts = counts[order]
+        indptr = np.zeros(nterms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=nterms), out=indptr[1:])
+        self._rank = rank
+        self._csr = (indptr, rows, cols, counts)
+        self._transposed = None
+        return self._csr
+
+    @property
+    def csr(self):
+        '''
+        The (indptr, rows, cols, counts) arrays of the matrix.
+        '''
+        if self._csr is None:
+            self._build()
+        return self._csr
+
+    @property
+    def transposed(self):
+        '''
+        The (indptr, rows, counts) arrays of the transposed matrix: for the
+        column of a term, indptr gives the range of the rows and counts arrays
+        of the terms that come before it in alphabetical order and co-occur
+        with it.
+        '''
+        if self._transposed is None:
+            indptr, rows, cols, counts = self.csr
+            # The rows are sorted, so a stable sort by column keeps them
+            # sorted within each column
+            order = np.argsort(cols, kind="stable")
+            col_indptr = np.zeros(len(indptr), dtype=np.int64)
+            np.cumsum(np.bincount(cols, minlength=len(indptr) - 1),
+                      out=col_indptr[1:])
+            self._transposed = (col_indptr, rows[order], counts[order])
+        return self._transposed
+
+    @property
+    def nnz(self):
+        '''
+        The number of distinct pairs of terms stored in the matrix.
+        '''
+        return len(self.csr[2])
+
+    def coo(self):
+        '''
+        Return the (rows, cols, counts) arrays of the triangular matrix.
+        '''
+        _, rows, cols, counts = self.csr
+        return rows, cols, counts
+
+    def row(self, term):
+        '''
+        Return the IDs and counts of the terms that come after the given term
+        in alphabetical order and co-occur with it.
+        '''
+        term_id = self.vocabulary.get(term)
+        indptr, _, cols, counts = self.csr
+        if term_id is None or term_id >= len(indptr) - 1:
+            return cols[:0], counts[:0]
+        start, end = indptr[term_id], indptr[term_id + 1]
+        return cols[start:end], counts[start:end]
+
+    def neighbors(self, term):
+        '''
+        Return the IDs and counts of all of the terms that co-occur with the
+        given term, reading both halves of the symmetric matrix.
+        '''
+        term_id = self.vocabulary.get(term)
+        row_cols, row_counts = self.row(term)
+        col_indptr, col_rows, col_counts = self.transposed
+        if term_id is None or term_id >= len(col_indptr) - 1:
+            return row_cols, row_counts
+        start, end = col_indptr[term_id], col_indptr[term_id + 1]
+        return (np.concatenate((row_cols, col_rows[start:end])),
+                np.concatenate((row_counts, col_counts[start:end])))
+
+    def get(self, t1, t2, default=0):
+        '''
+        Return the number of times two terms appear together, in either
+        order, or default if they never do. The column is found with a binary
+        search in the row of the alphabetically smaller term, without building
+        the dict of the row as com[t1][t2] does.
+        '''
+        ids = self.vocabulary.ids
+        i = ids.get(t1)
+        j = ids.get(t2)
+        indptr, _, cols, counts = self.csr
+        if i is None or j is None or i == j or \
+                max(i, j) >= len(indptr) - 1:
+            return default
+        if self._rank[i] > self._rank[j]:
+            i, j = j, i
+        start, end = indptr[i], indptr[i + 1]
+        k = start + int(np.searchsorted(cols[start:end], j))
+        if k < end and cols[k] == j:
+            return int(counts[k])
+        return default
+
+    def top_pairs(self, n):
+        '''
+        Return the n most frequent pairs of terms, along with the number of
+        times they appear together. Only the n largest counts are selected
+        (with np.argpartition) and sorted. Pairs with equal counts are ordered
+        by term, as (t1, t2) tuples; analysis.co_occurrent_terms with the dict
+        matrix keeps ties in the order in which the pairs were first seen
+        instead, so the two may list tied pairs differently.
+        '''
+        _, rows, cols, counts = self.csr
+        if n <= 0 or len(counts) == 0:
+            return []
+        rank = self._rank
+        if n < len(counts):
+            # Count of the n-th most frequent pair
+            kth = -np.partition(-counts, n - 1)[n - 1]
+            above = np.flatnonzero(counts > kth)
+            equal = np.flatnonzero(counts == kth)
+            need = n - len(above)
+            if len(equal) > need:
+                # The first pairs with the n-th count, in the order of terms
+                order = rank[rows[equal]] * len(rank) + rank[cols[equal]]
+                equal = equal[np.argpartition(order, need - 1)[:need]]
+            top = np.concatenate((above, equal))
+        else:
+            top = np.arange(len(counts))
+        # Sort the selected pairs by count, then by term
+        top = top[np.lexsort((rank[cols[top]], rank[rows[top]],
+                              -counts[top]))]
+        terms = self.vocabulary.terms
+        return [((terms[rows[i]], terms[cols[i]]), int(counts[i]))
+                for i in top.tolist()]
+
+    # Dict-like view, so that the matrix can be used in place of the nested
+    # defaultdict returned by analysis.generate_co_matrix
+
+    def __getitem__(self, term):
+        # The dict of the row is built on every call; use get for single
+        # pairs of terms
+        cols, counts = self.row(term)
+        terms = self.vocabulary.terms
+        return dict(zip([terms[i] for i in cols.tolist()], counts.tolist()))
+
+    def __contains__(self, term):
+        term_id = self.vocabulary.get(term)
+        indptr = self.csr[0]
+        if term_id is None or term_id >= len(indptr) - 1:
+            return False
+        return indptr[term_id + 1] > indptr[term_id]
+
+    def __iter__(self):
+        indptr = self.csr[0]
+        terms = self.vocabulary.terms
+        for term_id in np.flatnonzero(np.diff(indptr)).tolist():
+            yield terms[term_id]
+
+    def __len__(self):
+        return int(np.count_nonzero(np.diff(self.csr[0])))
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        for term in self:
+            yield term, self[term]
+
+    def to_dict(self):
+        '''
+        Convert the matrix into a dict of dicts of counts.
+        '''
+        return {term: row for term, row in self.items()}
+
+
+def merge_runs(run, other):
+    '''
+    Merge two runs of sorted unique keys and their counts into one run, with
+    a binary search of the keys of the second run in the first one.
+    '''
+    keys, counts = run
+    other_keys, other_counts = other
+    positions = np.searchsorted(keys, other_keys)
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == other_keys[found]
+    counts = counts.copy()
+    # The keys of a run are unique, so each position is only added to once
+    counts[positions[found]] += other_counts[found]
+    new = ~found
+    return (np.insert(keys, positions[new], other_keys[new]),
+            np.insert(counts, positions[new], other_counts[new]))
+
+
+def generate_sparse_co_matrix(term_list, vocabulary=None, batch_size=1000000,
+                              mode=None, weights=None):
+    '''
+    Generates the co-occurrence matrix of a list (or stream) of Tweet terms as
+    a SparseCoMatrix. The counts are the same as those of
+    analysis.generate_co_matrix.
+
+    **Parameters**
+
+        term_list: *iterable, list, str*
+            The terms of each Tweet.
+        vocabulary: *Vocabulary, optional*
+            The vocabulary used to intern terms.
+        batch_size: *int*
+            The number of pairs of terms that are buffered at a time.
+        mode: *str or co_occurrence_modes.CoOccurrenceMode, optional*
+            The mode of the matrix. All of the pairs of terms are counted by
+            default, as in analysis.generate_co_matrix.
+        weights: *list, int, optional*
+            The number of times each Tweet is counted, as returned by
+            dedup.dedup_term_list. Every Tweet is counted once by default.
+
+    **Returns**
+
+        com: *SparseCoMatrix*
+            The co-occurrence matrix.
+    '''
+    # A TermCorpus adds the term IDs of its token array directly
+    if vocabulary is None and weights is None and \
+            hasattr(term_list, "co_matrix"):
+        return term_list.co_matrix(batch_size, mode)
+    com = SparseCoMatrix(vocabulary, batch_size, mode)
+    if weights is None:
+        for tweet in term_list:
+            com.add(tweet)
+    else:
+        for tweet, weight in zip(term_list, weights):
+            com.add(tweet, weight)
+    return com
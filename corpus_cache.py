@@ -0,0 +1,270 @@
+'''
+This Python script contains a cache of pre-processed Tweets, so that a .json
+file does not have to be read and tokenized again every time it is analyzed.
+The cache of a .json file is written next to it, with one cache file for each
+term filter (for example, data/stream_QUERY.json.terms_only.tcc), and it
+contains:
+    a header - the path, size and modification time of the .json file, a hash
+               of the start and of the end of the part of the file that was
+               read, the term filter and the number of lines and Tweets
+    a vocabulary table - every distinct term, in the order of its ID
+    a token array - the term IDs of all of the Tweets, one after the other
+    an offsets array - the start of the terms of each Tweet in the token
+                       array, followed by the length of the token array
+
+The arrays are loaded with mmap and read through memoryviews, so loading a
+cache does not copy them. When the .json file has grown since the cache was
+written (for example, while collect_data.py is still streaming), only the new
+lines are tokenized and appended to the cache.
+
+The last line of the file is read even if it does not end with a newline, so
+that a finished file is read in full. Since that line may still be being
+written, the header records the number of Tweets and lines that it added, and
+they are removed and read again when the file grows.
+'''
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from analysis import TermStream
+from cooccurrence import Vocabulary
+from term_corpus import TermCorpus
+from tweet_reader import is_compressed
+
+MAGIC = b"TWCACHE1"
+VERSION = 2
+# Number of bytes hashed at the start and at the end of the part of the .json
+# file that has been read, to detect files that were rewritten
+HASH_BYTES = 65536
+
+
+def cache_path(filename, term_filter):
+    '''
+    Return the name of the cache file of a .json file and a term filter.
+    '''
+    return "%s.%s.tcc" % (filename, term_filter or "default")
+
+
+def complete_size(filename, size):
+    '''
+    Return the size of the part of a file that ends with a complete line, so
+    that a line that is still being written is not read.
+    '''
+    with open(filename, 'rb') as f:
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            block = f.read(end - start)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def source_hash(filename, consumed):
+    '''
+    Hash the start and the end of the first consumed bytes of a file.
+    '''
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as f:
+        digest.update(f.read(min(consumed, HASH_BYTES)))
+        f.seek(max(0, consumed - HASH_BYTES))
+        digest.update(f.read(min(consumed, HASH_BYTES)))
+    return digest.hexdigest()
+
+
+def align(n):
+    '''
+    Return the number of padding bytes needed to align n to 8 bytes.
+    '''
+    return -n % 8
+
+
+class CachedCorpus(TermCorpus):
+    '''
+    The pre-processed Tweets of a .json file, backed by the arrays of a cache
+    file. It is a TermCorpus (see term_corpus.py) whose token and offsets
+    arrays are memoryviews of the cache file, so it can be used in place of
+    the term list returned by analysis.generate_term_list.
+
+    **Attributes**
+
+        header: *dict*
+            The header of the cache file.
+        terms: *list, str*
+            The vocabulary, indexed by term ID.
+        tokens: *memoryview*
+            The term IDs of all of the Tweets.
+        offsets: *memoryview*
+            The start of the terms of each Tweet in tokens.
+        count: *int*
+            The number of lines that were read from the .json file.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise Exception("Invalid cache file.")
+        position = len(MAGIC)
+        header_length, vocab_length = struct.unpack_from("<QQ", buf, position)
+        position += 16
+        self.header = json.loads(bytes(buf[position:position + header_length]))
+        position += header_length
+        terms = json.loads(
+            bytes(buf[position:position + vocab_length]).decode("utf-8"))
+        position += vocab_length
+        position += align(position)
+        ntokens = self.header["ntokens"]
+        tokens = buf[position:position + 4 * ntokens].cast('I')
+        position += 4 * ntokens
+        position += align(position)
+        noffsets = self.header["ntweets"] + 1
+        offsets = buf[position:position + 8 * noffsets].cast('Q')
+        TermCorpus.__init__(self, tokens=tokens, offsets=offsets,
+                            count=self.header["count"])
+        # The vocabulary dict is only built if a term is looked up
+        self._vocabulary = None
+        self.terms = terms
+
+    def append(self, terms):
+        raise Exception("A cached corpus is read-only.")
+
+    def extend(self, term_stream):
+        raise Exception("A cached corpus is read-only.")
+
+    def close(self):
+        '''
+        Release the memoryviews and close the memory-mapped file.
+        '''
+        self._unique = None
+        self.tokens.release()
+        self.offsets.release()
+        self._mmap.close()
+
+
+def write_cache(path, header, terms, tokens, offsets):
+    '''
+    Write a cache file. The file is written under a temporary name first and
+    then renamed, so that a reader never sees a partially written cache.
+    '''
+    header = dict(header, version=VERSION, ntokens=len(tokens),
+                  ntweets=len(offsets) - 1)
+    header_bytes = json.dumps(header).encode("utf-8")
+    vocab_bytes = json.dumps(terms).encode("utf-8")
+    # A unique temporary name in the same directory, so that two processes
+    # writing the same cache do not write to the same temporary file, and the
+    # rename stays on the same file system
+    fd, temporary = tempfile.mkstemp(prefix=os.path.basename(path) + ".",
+                                     suffix=".tmp",
+                                     dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<QQ", len(header_bytes), len(vocab_bytes)))
+            f.write(header_bytes)
+            f.write(vocab_bytes)
+            f.write(b"\0" * align(f.tell()))
+            f.write(tokens.tobytes())
+            f.write(b"\0" * align(f.tell()))
+            f.write(offsets.tobytes())
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def load_corpus(filename, term_filter="terms_only", rebuild=False):
+    '''
+    Load the pre-processed Tweets of a .json file from its cache, creating or
+    updating the cache first if needed.
+
+    **Parameters**
+
+        filename: *str*
+            The name of the .json file.
+        term_filter: *str*
+            The name of the term filter (see term_filters.py). Only named
+            filters can be cached.
+        rebuild: *boolean*
+            If True, the cache is rebuilt even if it is up to date.
+
+    **Returns**
+
+        corpus: *CachedCorpus*
+            The pre-processed Tweets.
+    '''
+    if not isinstance(term_filter, str) and term_filter is not None:
+        raise Exception("Only named term filters can be cached.")
+    path = cache_path(filename, term_filter)
+    stat = os.stat(filename)
+    corpus = None
+    if not rebuild and os.path.exists(path):
+        try:
+            corpus = CachedCorpus(path)
+        except Exception:
+            corpus = None
+    if corpus is not None:
+        header = corpus.header
+        if header.get("version") == VERSION and \
+                header["filter"] == term_filter:
+            if header["size"] == stat.st_size and \
+                    header["mtime"] == stat.st_mtime_ns:
+                return corpus
+            consumed = header["consumed"]
+            if not is_compressed(filename) and stat.st_size >= consumed and \
+                    source_hash(filename, consumed) == header["hash"]:
+                # The file has grown, so only the new lines are tokenized,
+                # along with the unterminated last line that was read before
+                ntweets = len(corpus) - header["tail_tweets"]
+                tokens = array('I')
+                tokens.frombytes(
+                    corpus.tokens[:corpus.offsets[ntweets]].tobytes())
+                offsets = array('Q')
+                offsets.frombytes(corpus.offsets[:ntweets + 1].tobytes())
+                grown = TermCorpus(Vocabulary(corpus.terms), tokens, offsets,
+                                   corpus.count - header["tail_lines"])
+                corpus.close()
+                return build_cache(filename, term_filter, path, stat, grown,
+                                   consumed)
+        corpus.close()
+    return build_cache(filename, term_filter, path, stat, TermCorpus(), 0)
+
+
+def build_cache(filename, term_filter, path, stat, corpus, start):
+    '''
+    Tokenize the lines of a .json file from the given byte offset, add them to
+    a corpus, write the cache and load it. The complete lines are consumed,
+    and the unterminated last line, if any, is read as well.
+    '''
+    tail_tweets = tail_lines = 0
+    if is_compressed(filename):
+        # A compressed file is always read in full
+        end = stat.st_size
+        corpus.extend(TermStream(filename, term_filter))
+    else:
+        end = complete_size(filename, stat.st_size)
+        corpus.extend(TermStream(filename, term_filter, start, end))
+        if end < stat.st_size:
+            ntweets = len(corpus)
+            tail_lines = corpus.extend(
+                TermStream(filename, term_filter, end, stat.st_size))
+            tail_tweets = len(corpus) - ntweets
+    header = {"source": os.path.abspath(filename),
+              "size": stat.st_size,
+              "mtime": stat.st_mtime_ns,
+              "consumed": end,
+              "hash": source_hash(filename, end),
+              "filter": term_filter,
+              "count": corpus.count,
+              "tail_tweets": tail_tweets,
+              "tail_lines": tail_lines}
+    write_cache(path, header, corpus.terms, corpus.tokens, corpus.offsets)
+    return CachedCorpus(path)
@@ -0,0 +1,480 @@
+'''
+This Python script contains a stage that collapses duplicate Tweets before
+they are analyzed. Retweets and copy-pasted campaigns can make up a large part
+of a stream, and every copy would otherwise be tokenized and paired again, and
+would skew the counts. Every Tweet is checked in two steps:
+    exact duplicates - the filtered terms of the Tweet are hashed, so a copy
+                       only matches a Tweet with exactly the same terms, and
+                       counting the copies gives the same counts as analyzing
+                       every copy
+    near duplicates - the MinHash signature of the character shingles of the
+                      normalized text (in lowercase, without the "RT @user:"
+                      prefix, links and repeated whitespace) is looked up in
+                      a locality-sensitive hash (LSH) table, so a truncated
+                      retweet or a copy with a few words changed matches the
+                      first copy
+
+Both indexes keep at most a fixed number of entries and forget the least
+recently matched ones first, so their memory is bounded however long the
+stream is. Every Tweet that is a duplicate is collapsed into the first copy,
+whose weight is the number of copies. Only the unique Tweets are paired and
+counted, and the weights can either be passed to the analysis functions
+(weights=...) so that the counts are those of the whole data set (with near
+duplicates counted as copies of the Tweet they match), or ignored, so that
+every duplicate is skipped. To analyze a file with duplicates collapsed, enter
+the following command:
+
+python dedup.py -i data/stream_QUERY.json -f terms_only --near --duplicates weight -n 10
+'''
+import argparse
+import hashlib
+import re
+from collections import OrderedDict
+from itertools import tee
+import numpy as np
+from analysis import TermStream
+from analysis import calculate_term_frequencies
+from analysis import define_lexicon
+from analysis import search_word_co_occurrences
+from cooccurrence import generate_sparse_co_matrix
+from pre_process import preprocess_many
+from semantic import sentiment_analysis
+
+RETWEET_RE = re.compile(r"^(?:rt\s+@\w+:?\s*)+")
+URL_RE = re.compile(r"https?://\S+")
+SPACE_RE = re.compile(r"\s+")
+# Odd constant used to fold the shingles longer than 4 bytes into 32 bits
+MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def normalize_text(text):
+    '''
+    Normalize the text of a Tweet for its MinHash signature, so that the
+    copies of a Tweet have similar texts: it is converted to lowercase, and
+    the "RT @user:" prefix of retweets, links, the ellipsis of truncated
+    Tweets and repeated whitespace are removed.
+    '''
+    text = URL_RE.sub(" ", text.lower())
+    text = RETWEET_RE.sub("", text.strip())
+    return SPACE_RE.sub(" ", text.rstrip("…").strip())
+
+
+class LRUIndex(object):
+    '''
+    Mapping of keys to record IDs that keeps at most max_entries keys and
+    forgets the least recently used key first.
+    '''
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        record = self.entries.get(key)
+        if record is not None:
+            self.entries.move_to_end(key)
+        return record
+
+    def add(self, key, record):
+        '''
+        Add a key and return the (key, record) pair that was evicted, if any.
+        '''
+        self.entries[key] = record
+        if len(self.entries) > self.max_entries:
+            return self.entries.popitem(last=False)
+        return None
+
+
+class MinHashLSH(object):
+    '''
+    Index of near-duplicate texts, using MinHash signatures and
+    locality-sensitive hashing. The signature of a text is split into bands,
+    and two texts whose signatures share a band are compared: they are
+    near duplicates if their estimated Jaccard similarity (the fraction of
+    equal signature values) is at least the threshold.
+
+    **Parameters**
+
+        num_perm: *int*
+            The number of hash functions of the signatures.
+        bands: *int*
+            The number of bands of the signatures. num_perm must be a multiple
+            of bands. More bands find more candidates at lower similarities.
+        threshold: *float*
+            The estimated Jaccard similarity above which two texts are near
+            duplicates.
+        shingle_size: *int*
+            The number of bytes of the shingles of a text.
+        max_entries: *int*
+            The maximum number of signatures kept in the index.
+        seed: *int*
+            The seed of the hash functions.
+    '''
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.8, shingle_size=4,
+                 max_entries=100000, seed=1):
+        if num_perm % bands:
+            raise Exception("The number of hash functions must be a multiple "
+                            "of the number of bands.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        # Multiply-shift hash functions ((a * x + b) >> 32, with odd a)
+        random = np.random.RandomState(seed)
+        self._a = random.randint(0, 1 << 62, size=(num_perm, 1),
+                                 dtype=np.uint64) * np.uint64(2) + \
+            np.uint64(1)
+        self._b = random.randint(0, 1 << 62, size=(num_perm, 1),
+                                 dtype=np.uint64)
+        # Weights that turn the bytes of a shingle into one integer
+        self._place = np.uint64(256) ** np.arange(shingle_size,
+                                                  dtype=np.uint64)
+        self.signatures = LRUIndex(max_entries)
+        self.buckets = [{} for _ in range(bands)]
+
+    def signature(self, text):
+        '''
+        Return the MinHash signature of a text, or None if it is empty.
+        '''
+        return self.signature_many([text])[0]
+
+    def signature_many(self, texts):
+        '''
+        Return the MinHash signatures of several texts at once (None for the
+        empty ones). The shingles of all of the texts are hashed together, so
+        the cost of NumPy is paid once per batch rather than once per text.
+        '''
+        k = self.shingle_size
+        data = [text.encode("utf-8") for text in texts]
+        # Short texts are padded to one shingle
+        data = [d + b"\0" * (k - len(d)) if 0 < len(d) < k else d
+                for d in data]
+        lengths = np.array([len(d) for d in data], dtype=np.int64)
+        present = np.flatnonzero(lengths)
+        signatures = [None] * len(texts)
+        if len(present) == 0:
+            return signatures
+        buf = np.frombuffer(b"".join(data), dtype=np.uint8)
+        windows = np.lib.stride_tricks.sliding_window_view(buf, k)
+        # The shingles of a text start at its first byte and end k - 1 bytes
+        # before its last byte
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[present]
+        counts = lengths[present] - k + 1
+        first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        positions = np.repeat(starts - first, counts) + \
+            np.arange(int(counts.sum()))
+        shingles = (windows[positions].astype(np.uint64) *
+                    self._place).sum(axis=1)
+        if k > 4:
+            shingles = (shingles * MIX) >> np.uint64(32)
+        hashes = (self._a * shingles + self._b) >> np.uint64(32)
+        minimums = np.minimum.reduceat(hashes, first, axis=1)
+        for column, i in enumerate(present.tolist()):
+            signatures[i] = minimums[:, column].copy()
+        return signatures
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[i * rows:(i + 1) * rows].tobytes()
+                for i in range(self.bands)]
+
+    def query(self, signature):
+        '''
+        Return the record ID of a near duplicate of a signature, or None.
+        '''
+        seen = set()
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            record = band.get(key)
+            if record is None or record in seen:
+                continue
+            seen.add(record)
+            other = self.signatures.get(record)
+            if other is not None and \
+                    np.mean(other == signature) >= self.threshold:
+                return record
+        return None
+
+    def add(self, record, signature):
+        '''
+        Add the signature of a record, evicting the least recently matched
+        signature if the index is full.
+        '''
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            band.setdefault(key, record)
+        evicted = self.signatures.add(record, signature)
+        if evicted is not None:
+            old_record, old_signature = evicted
+            for band, key in zip(self.buckets,
+                                 self._band_keys(old_signature)):
+                if band.get(key) == old_record:
+                    del band[key]
+
+
+def exact_key(terms):
+    '''
+    Return the key of the exact duplicates of a Tweet: a hash of its terms.
+    Terms never contain whitespace, so they are joined with newlines.
+    '''
+    return hashlib.blake2b("\n".join(terms).encode("utf-8", "surrogatepass"),
+                           digest_size=16).digest()
+
+
+class Deduplicator(object):
+    '''
+    Detector of duplicate Tweets, which assigns every unique Tweet a record ID
+    and returns the record ID of the first copy for every duplicate.
+
+    **Parameters**
+
+        near: *boolean*
+            Whether near duplicates are detected with MinHash/LSH, in addition
+            to exact duplicates.
+        max_exact: *int*
+            The maximum number of hashes of exact duplicates kept.
+        lsh: *dict*
+            The parameters of the MinHashLSH index.
+
+    **Attributes**
+
+        records: *int*
+            The number of unique texts.
+        exact: *int*
+            The number of exact duplicates.
+        near: *int*
+            The number of near duplicates.
+    '''
+
+    def __init__(self, near=True, max_exact=1000000, **lsh):
+        self.hashes = LRUIndex(max_exact)
+        self.lsh = MinHashLSH(**lsh) if near else None
+        self.records = 0
+        self.exact = 0
+        self.near = 0
+
+    def add(self, text, terms=None):
+        '''
+        Check a Tweet. The hash of its terms is the key of the exact
+        duplicates; if the terms are not given, the normalized text is used
+        instead.
+
+        **Returns**
+
+            record: *int*
+                The record ID of the text, or of the first copy of it.
+            duplicate: *boolean*
+                Whether the text is a duplicate.
+        '''
+        return next(self.add_many([text],
+                                  None if terms is None else [terms]))
+
+    def add_many(self, texts, terms=None, batch_size=256):
+        '''
+        Generator that checks a sequence of Tweets, given by their texts and
+        optionally by their terms, and yields the (record, duplicate) pair of
+        each one, as add does. The signatures of a batch of texts are
+        computed at once, skipping the exact duplicates.
+        '''
+        if terms is None:
+            texts, checked = tee(texts)
+            keys = (exact_key([normalize_text(text)]) for text in checked)
+        else:
+            keys = (exact_key(tweet) for tweet in terms)
+        items = zip(texts, keys)
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield from self._add_batch(batch)
+                batch = []
+        if batch:
+            yield from self._add_batch(batch)
+
+    def _add_batch(self, items):
+        digests = [digest for _, digest in items]
+        signatures = {}
+        if self.lsh is not None:
+            # Only the first copy of a Tweet that is not known yet needs a
+            # signature
+            known = self.hashes.entries
+            new = {}
+            for i, digest in enumerate(digests):
+                if digest not in known and digest not in new:
+                    new[digest] = i
+            indexes = list(new.values())
+            signatures = dict(zip(indexes, self.lsh.signature_many(
+                [normalize_text(items[i][0]) for i in indexes])))
+        for i, digest in enumerate(digests):
+            record = self.hashes.get(digest)
+            if record is not None:
+                self.exact += 1
+                yield record, True
+                continue
+            signature = signatures.get(i)
+            if signature is not None:
+                record = self.lsh.query(signature)
+                if record is not None:
+                    self.near += 1
+                    self.hashes.add(digest, record)
+                    yield record, True
+                    continue
+            record = self.records
+            self.records += 1
+            self.hashes.add(digest, record)
+            if signature is not None:
+                self.lsh.add(record, signature)
+            yield record, False
+
+    def stats(self):
+        return {"unique": self.records, "exact_duplicates": self.exact,
+                "near_duplicates": self.near}
+
+
+def collapse_duplicates(texts, deduplicator, terms=None):
+    '''
+    Collapse the duplicates of a sequence of Tweets, given by their texts and
+    optionally by their terms (see Deduplicator.add_many).
+
+    **Returns**
+
+        unique: *list*
+            The terms (or the text, if the terms are not given) of the first
+            copy of every unique Tweet, in order.
+        weights: *list, int*
+            The number of copies of every unique Tweet.
+    '''
+    unique = []
+    weights = []
+    if terms is None:
+        texts, kept = tee(texts)
+    else:
+        terms, kept = tee(terms)
+    for item, (record, duplicate) in zip(kept,
+                                         deduplicator.add_many(texts, terms)):
+        if duplicate:
+            weights[record] += 1
+        else:
+            unique.append(item)
+            weights.append(1)
+    return unique, weights
+
+
+def dedup_term_list(filename, term_filter, near=True, **options):
+    '''
+    Generate the list of the terms of the unique Tweets of a .json file, as
+    analysis.generate_term_list does for all of the Tweets. Every Tweet is
+    tokenized, since its terms are the key of the exact duplicates, but only
+    the terms of the unique Tweets are kept.
+
+    **Parameters**
+
+        filename: *str*
+            The name of the .json file to be input.
+        term_filter: *str or TermFilter*
+            The filter to be used for parsing through all the words in the
+            Tweets (see term_filters.py).
+        near: *boolean*
+            Whether near duplicates are collapsed too.
+        options: *dict*
+            The other parameters of the Deduplicator.
+
+    **Returns**
+
+        terms: *list, str*
+            The terms of every unique Tweet.
+        weights: *list, int*
+            The number of copies of every unique Tweet.
+        count: *int*
+            The number of lines in the .json file.
+        stats: *dict*
+            The number of unique Tweets and of exact and near duplicates.
+    '''
+    stream = TermStream(filename, term_filter)
+    deduplicator = Deduplicator(near, **options)
+    term_filter = stream.term_filter
+    texts, tokenized = tee(stream.texts())
+    terms, weights = collapse_duplicates(
+        texts, deduplicator,
+        (term_filter(ppterms) for ppterms in preprocess_many(tokenized)))
+    return terms, weights, stream.count, deduplicator.stats()
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Analyze unique Tweets")
+    parser.add_argument("-i", "--input", dest="input", required=True,
+                        help="The .json file to analyze")
+    parser.add_argument("-f", "--filter", dest="term_filter",
+                        default="terms_only", help="The term filter to use")
+    parser.add_argument("-k", "--keyword", dest="keywords", action="append",
+                        default=[], help="A word to search co-occurrences for")
+    parser.add_argument("-n", dest="n", type=int, default=10,
+                        help="The number of terms to return")
+    parser.add_argument("--near", dest="near", action="store_true",
+                        help="Also collapse near duplicates")
+    parser.add_argument("--threshold", dest="threshold", type=float,
+                        default=0.8,
+                        help="The similarity above which Tweets are near duplicates")
+    parser.add_argument("--max-entries", dest="max_entries", type=int,
+                        default=100000,
+                        help="The number of signatures kept for near duplicates")
+    parser.add_argument("--duplicates", dest="duplicates", default="weight",
+                        choices=["weight", "skip"],
+                        help="Count every copy (weight) or only the first one (skip)")
+    parser.add_argument("--co-mode", dest="co_mode", default="full",
+                        help="The co-occurrence mode, such as full, window:5, dedup or cap:50")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    options = {}
+    if args.near:
+        options = {"threshold": args.threshold,
+                   "max_entries": args.max_entries}
+    term_list, weights, count, stats = dedup_term_list(
+        args.input, args.term_filter, args.near, **options)
+    if args.duplicates == "skip":
+        weights = None
+    ntweets = sum(weights) if weights is not None else len(term_list)
+    term_count, term_freq = calculate_term_frequencies(term_list, args.n,
+                                                       weights=weights)
+    com = generate_sparse_co_matrix(term_list, mode=args.co_mode,
+                                    weights=weights)
+    positive_vocab = define_lexicon("term_database/positive_words.txt")
+    negative_vocab = define_lexicon("term_database/negative_words.txt")
+    so, top_pos, top_neg = sentiment_analysis(
+        None, term_count, com, positive_vocab, negative_vocab, args.n,
+        ntweets)
+    # Print results
+    print("Read %d lines: %d unique tweets, %d exact and %d near duplicates."
+          % (count, stats["unique"], stats["exact_duplicates"],
+             stats["near_duplicates"]))
+    print("\nMost frequent terms:")
+    for i in term_freq:
+        print(i)
+    print("\nMost frequent co-occurrent terms:")
+    for i in com.top_pairs(args.n):
+        print(i)
+    for keyword in args.keywords:
+        print("\nFor the word %s, the most frequent co-occurrent terms are:" %
+              keyword)
+        for i in search_word_co_occurrences(keyword, term_list, args.n,
+                                            weights):
+            print(i)
+    print("\nThe most positive terms:")
+    for i in top_pos:
+        print(i)
+    print("\nThe most negative terms:")
+    for i in top_neg:
+        print(i)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,541 @@
+'''
+This Python script contains an analyzer that follows a .json file while
+collect_data.py is still appending Tweets to it. Every update reads only the
+complete lines that were added since the last update, and the byte offset
+reached in the file is saved along with the results, so that the analysis
+resumes where it stopped after a restart. To follow a stream from the
+terminal, enter the following command:
+
+python incremental.py -i data/stream_QUERY.json -f terms_only -n 10
+
+The term frequencies, the co-occurrence matrix, the keyword co-occurrences and
+the semantic orientation (SO) of every term are all updated incrementally. The
+PMI of two terms t and x, which appear n_t and n_x times in N Tweets and
+together in c_tx Tweets, is
+
+    PMI(t, x) = log2(c_tx) + log2(N) - log2(n_t) - log2(n_x)
+
+so, with w_x the lexicon weight of x (see semantic.lexicon_weights), the SO of
+t is split into three sums over the lexicon words x that appear with t:
+
+    SO(t) = A(t) + K(t) * (log2(N) - log2(n_t)) - B(t)
+    A(t) = sum of w_x * log2(c_tx)
+    K(t) = sum of w_x
+    B(t) = sum of w_x * log2(n_x)
+
+A(t) and K(t) only change when a pair of t changes, so they are updated with
+the new pairs of each Tweet. B(t) changes whenever a lexicon word is counted
+again, which would touch every term that appears with it, so lexicon words
+whose counts changed are only marked, and B is brought up to date once per
+query. The cost of an update is proportional to the number of new Tweets and
+pairs, not to the size of the corpus.
+
+The most common terms and pairs are also kept up to date: counts only grow, so
+the n most common terms are among the previous n and the terms counted since,
+and only those are ranked again. The state is saved every few minutes and when
+the analyzer stops, instead of after every update.
+'''
+import argparse
+import heapq
+import os
+import pickle
+import time
+from collections import Counter
+from collections import defaultdict
+from math import log2
+from analysis import TermStream
+from analysis import define_lexicon
+from corpus_cache import complete_size
+from corpus_cache import source_hash
+from cooccurrence import Vocabulary
+from semantic import lexicon_weights
+from tweet_reader import is_compressed
+
+STATE_VERSION = 1
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "term_database")
+
+
+def state_path(filename, term_filter):
+    '''
+    Return the name of the state file of a .json file and a term filter.
+    '''
+    return "%s.%s.state" % (filename, term_filter or "default")
+
+
+class IncrementalAnalyzer(object):
+    '''
+    Analyzer that keeps the results of a growing .json file up to date.
+
+    **Parameters**
+
+        filename: *str*
+            The name of the .json file. It must not be compressed.
+        term_filter: *str*
+            The name of the term filter (see term_filters.py).
+        positive_vocab: *list, str*
+            The lexicon of words that have a positive connotation.
+        negative_vocab: *list, str*
+            The lexicon of words that have a negative connotation.
+        keywords: *list, str*
+            The words to calculate co-occurrences for.
+        symmetric: *boolean*
+            Whether both halves of the co-occurrence matrix are used for the
+            semantic orientations (see semantic.semantic_orientations).
+        state_file: *str, optional*
+            The file that the state is saved to and loaded from. By default,
+            it is written next to the .json file.
+
+    **Attributes**
+
+        offset: *int*
+            The byte offset up to which the .json file has been read.
+        count: *int*
+            The number of lines read so far.
+        ntweets: *int*
+            The number of Tweets analyzed so far.
+        term_counts: *collections.Counter*
+            The number of times each term appears.
+        com: *collections.defaultdict*
+            The co-occurrence matrix, as built by analysis.generate_co_matrix.
+        keyword_counts: *dict*
+            A Counter object for each keyword with the terms that appear in
+            the same Tweets as the keyword.
+    '''
+
+    def __init__(self, filename, term_filter="terms_only", positive_vocab=(),
+                 negative_vocab=(), keywords=(), symmetric=False,
+                 state_file=None):
+        if is_compressed(filename):
+            raise Exception("Only uncompressed files can be followed.")
+        self.filename = filename
+        self.term_filter = term_filter
+        self.keywords = list(keywords)
+        self.symmetric = symmetric
+        self.state_file = state_file or state_path(filename, term_filter)
+        # The lexicon weight of each term, as in semantic.lexicon_weights
+        lexicon = Vocabulary(list(positive_vocab) + list(negative_vocab))
+        self.weights = {term: weight for term, weight in
+                        zip(lexicon.terms,
+                            lexicon_weights(lexicon, positive_vocab,
+                                            negative_vocab).tolist())
+                        if weight}
+        self.reset()
+
+    def reset(self):
+        '''
+        Discard the results and start again from the beginning of the file.
+        '''
+        self.offset = 0
+        self.hash = None
+        self.count = 0
+        self.ntweets = 0
+        # The vocabulary keeps the terms in the order of term_counts, which
+        # breaks ties between equal orientations
+        self.vocabulary = Vocabulary()
+        self.term_counts = Counter()
+        self.com = defaultdict(Counter)
+        self.keyword_counts = {keyword: Counter() for keyword in self.keywords}
+        self._reset_orientations()
+        self._reset_top()
+
+    def _reset_top(self):
+        # The last n most common terms and pairs, and the terms and pairs
+        # whose count has changed since (only tracked once there is a top)
+        self._top_n = None
+        self._top_terms = []
+        self._top_pairs = []
+        self._changed_terms = set()
+        self._changed_pairs = set()
+
+    def _reset_orientations(self):
+        self.a = defaultdict(float)
+        self.k = defaultdict(float)
+        self.b = defaultdict(float)
+        # The terms that appear with each lexicon word, the log2 count of the
+        # word that B includes and the words whose count has changed since
+        self.lex_neighbors = defaultdict(set)
+        self.applied = {}
+        self.dirty = set()
+
+    def _add_pair(self, t, x, old, new):
+        '''
+        Update the sums of the SO of term t for a change of the number of
+        Tweets in which t appears with the lexicon word x.
+        '''
+        weight = self.weights[x]
+        if old:
+            self.a[t] += weight * (log2(new) - log2(old))
+            return
+        self.a[t] += weight * log2(new)
+        self.k[t] += weight
+        self.b[t] += weight * self.applied.get(x, 0.0)
+        self.lex_neighbors[x].add(t)
+
+    def _rebuild_orientations(self):
+        '''
+        Compute the sums of the SO of every term from the co-occurrence
+        matrix, when the lexicons or the symmetric setting have changed.
+        '''
+        self._reset_orientations()
+        weights = self.weights
+        for t1, row in self.com.items():
+            for t2, count in row.items():
+                if t2 in weights:
+                    self._add_pair(t1, t2, 0, count)
+                if self.symmetric and t1 in weights:
+                    self._add_pair(t2, t1, 0, count)
+        self.dirty = set(self.lex_neighbors)
+
+    def add(self, tweet):
+        '''
+        Add the terms of a single Tweet.
+        '''
+        self.ntweets += 1
+        self.vocabulary.encode(tweet)
+        self.term_counts.update(tweet)
+        if self._top_n is not None:
+            self._changed_terms.update(tweet)
+        weights = self.weights
+        self.dirty.update(term for term in tweet if term in weights)
+        for keyword, count_search in self.keyword_counts.items():
+            if keyword in tweet:
+                count_search.update(tweet)
+        # Count the pairs of the Tweet first, as in add_co_occurrences, so
+        # that each distinct pair is updated once
+        pairs = Counter()
+        for i in range(len(tweet) - 1):
+            for j in range(i + 1, len(tweet)):
+                w1, w2 = sorted([tweet[i], tweet[j]])
+                if w1 != w2:
+                    pairs[w1, w2] += 1
+        com = self.com
+        symmetric = self.symmetric
+        if self._top_n is not None:
+            self._changed_pairs.update(pairs)
+        for (w1, w2), n in pairs.items():
+            row = com[w1]
+            old = row[w2]
+            row[w2] = old + n
+            if w2 in weights:
+                self._add_pair(w1, w2, old, old + n)
+            if symmetric and w1 in weights:
+                self._add_pair(w2, w1, old, old + n)
+
+    def update(self):
+        '''
+        Analyze the complete lines that were added to the .json file since
+        the last update. If the file was truncated or replaced, the analysis
+        starts again from the beginning.
+
+        **Returns**
+
+            ntweets: *int*
+                The number of new Tweets.
+        '''
+        size = os.path.getsize(self.filename)
+        if size < self.offset or (self.offset and source_hash(
+                self.filename, self.offset) != self.hash):
+            self.reset()
+        end = complete_size(self.filename, size)
+        if end <= self.offset:
+            return 0
+        before = self.ntweets
+        stream = TermStream(self.filename, self.term_filter, self.offset, end)
+        for tweet in stream:
+            self.add(tweet)
+        self.count += stream.count
+        self.offset = end
+        self.hash = source_hash(self.filename, end)
+        return self.ntweets - before
+
+    def _refresh(self):
+        '''
+        Bring B up to date with the counts of the lexicon words.
+        '''
+        b = self.b
+        term_counts = self.term_counts
+        for x in self.dirty:
+            value = log2(term_counts[x])
+            delta = value - self.applied.get(x, 0.0)
+            if delta:
+                weight = self.weights[x] * delta
+                for t in self.lex_neighbors.get(x, ()):
+                    b[t] += weight
+            self.applied[x] = value
+        self.dirty.clear()
+
+    def orientation(self, term):
+        '''
+        Return the semantic orientation of a term.
+        '''
+        self._refresh()
+        if not self.ntweets:
+            return 0.0
+        return self._orientation(term, log2(self.ntweets))
+
+    def _orientation(self, term, log_ntweets):
+        k = self.k.get(term)
+        if k is None:
+            return 0.0
+        return self.a[term] + k * (log_ntweets - log2(self.term_counts[term])) \
+            - self.b[term]
+
+    def orientations(self):
+        '''
+        Return the semantic orientation of every term with a non-zero SO, as
+        a dict.
+        '''
+        self._refresh()
+        if not self.ntweets:
+            return {}
+        log_ntweets = log2(self.ntweets)
+        return {term: self._orientation(term, log_ntweets) for term in self.k}
+
+    def top_orientations(self, n):
+        '''
+        Return the n terms with the highest and the n terms with the lowest
+        semantic orientations, ordered as in the output of
+        semantic.sentiment_analysis. Only the terms that appear with a
+        lexicon word are sorted; the other terms have an SO of 0 and are only
+        needed when there are fewer than n positive or negative terms.
+
+        **Returns**
+
+            top_pos: *list, tuple*
+                The terms with the highest semantic orientations.
+            top_neg: *list, tuple*
+                The terms with the lowest semantic orientations.
+        '''
+        if n <= 0:
+            return [], []
+        ids = self.vocabulary.ids
+        terms = self.vocabulary.terms
+        so = self.orientations()
+        # Ties are kept in the order of term_counts, as with a stable sort
+        top_pos = heapq.nsmallest(
+            n, ((-value, ids[term], term) for term, value in so.items()
+                if value > 0))
+        top_pos = [(term, -value) for value, _, term in top_pos]
+        top_neg = heapq.nsmallest(
+            n, ((value, -ids[term], term) for term, value in so.items()
+                if value < 0))
+        top_neg = [(term, value) for value, _, term in reversed(top_neg)]
+        if len(top_pos) < n or len(top_neg) < n:
+            # The lists are truncated to n, so the zeros are counted from the
+            # number of positive and negative terms among all of them
+            npos = sum(1 for value in so.values() if value > 0)
+            nneg = sum(1 for value in so.values() if value < 0)
+            nzeros = len(terms) - npos - nneg
+            if len(top_pos) + nzeros < n or len(top_neg) + nzeros < n:
+                # Too few terms to fill both lists, so every term is sorted
+                ranked = sorted(((-so.get(term, 0.0), term_id, term)
+                                 for term_id, term in enumerate(terms)))
+                ranked = [(term, -value) for value, _, term in ranked]
+                return ranked[:n], ranked[-n:]
+            top_pos.extend(self._zeros(so, range(len(terms)),
+                                       n - len(top_pos)))
+            zeros = self._zeros(so, range(len(terms) - 1, -1, -1),
+                                n - len(top_neg))
+            top_neg = zeros[::-1] + top_neg
+        return top_pos[:n], top_neg[-n:]
+
+    def _zeros(self, so, order, n):
+        '''
+        Return the first n terms with an SO of 0, in the given order of IDs.
+        '''
+        terms = self.vocabulary.terms
+        zeros = []
+        for term_id in order:
+            if len(zeros) == n:
+                break
+            term = terms[term_id]
+            if so.get(term, 0.0) == 0:
+                zeros.append((term, 0.0))
+        return zeros
+
+    def _update_top(self, n):
+        '''
+        Rank again the previous n most common terms and pairs along with the
+        terms and pairs counted since, or every term and pair if n changed.
+        '''
+        term_counts = self.term_counts
+        com = self.com
+        if n != self._top_n:
+            terms = term_counts
+            pairs = ((w1, w2) for w1, row in com.items() for w2 in row)
+        else:
+            terms = self._changed_terms.union(self._top_terms)
+            pairs = self._changed_pairs.union(self._top_pairs)
+        # Ties are kept in the order of term_counts, as with most_common, and
+        # pairs with equal counts are ordered by term
+        ids = self.vocabulary.ids
+        self._top_terms = heapq.nsmallest(
+            n, terms, key=lambda term: (-term_counts[term], ids[term]))
+        self._top_pairs = heapq.nsmallest(
+            n, pairs, key=lambda pair: (-com[pair[0]][pair[1]], pair))
+        self._top_n = n
+        self._changed_terms.clear()
+        self._changed_pairs.clear()
+
+    def top_terms(self, n):
+        '''
+        Return the n most common terms, as term_counts.most_common(n).
+        '''
+        self._update_top(n)
+        return [(term, self.term_counts[term]) for term in self._top_terms]
+
+    def top_pairs(self, n):
+        '''
+        Return the n most frequent pairs of terms, along with the number of
+        Tweets they appear together in. Pairs with equal counts are ordered
+        by term.
+        '''
+        self._update_top(n)
+        com = self.com
+        return [((w1, w2), com[w1][w2]) for w1, w2 in self._top_pairs]
+
+    def results(self, n):
+        '''
+        Return the current results as a dict.
+        '''
+        top_pos, top_neg = self.top_orientations(n)
+        return {"lines": self.count,
+                "tweets": self.ntweets,
+                "vocabulary_size": len(self.term_counts),
+                "frequencies": self.top_terms(n),
+                "co_occurrences": self.top_pairs(n),
+                "keywords": {keyword: count_search.most_common(n)
+                             for keyword, count_search in
+                             self.keyword_counts.items()},
+                "sentiment": {"top_positive": top_pos,
+                              "top_negative": top_neg}}
+
+    def save(self):
+        '''
+        Save the state of the analyzer, so that a new analyzer resumes from
+        the current offset. The state file is replaced atomically.
+        '''
+        self._refresh()
+        state = {"version": STATE_VERSION,
+                 "source": os.path.abspath(self.filename),
+                 "filter": self.term_filter,
+                 "weights": self.weights,
+                 "symmetric": self.symmetric}
+        for name in ("offset", "hash", "count", "ntweets", "vocabulary",
+                     "term_counts", "com", "keyword_counts", "a", "k", "b",
+                     "lex_neighbors", "applied"):
+            state[name] = getattr(self, name)
+        temporary = self.state_file + ".tmp"
+        with open(temporary, 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self.state_file)
+
+    def load(self):
+        '''
+        Load the saved state of the analyzer, if there is one for the same
+        file and term filter.
+
+        **Returns**
+
+            loaded: *boolean*
+                Whether a state was loaded.
+        '''
+        try:
+            with open(self.state_file, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False
+        if state.get("version") != STATE_VERSION or \
+                state["source"] != os.path.abspath(self.filename) or \
+                state["filter"] != self.term_filter:
+            return False
+        for name in ("offset", "hash", "count", "ntweets", "vocabulary",
+                     "term_counts", "com", "a", "k", "b", "lex_neighbors",
+                     "applied"):
+            setattr(self, name, state[name])
+        self.dirty = set()
+        self._reset_top()
+        # Keywords that were added since the state was saved start counting
+        # from the current offset
+        self.keyword_counts = {keyword: state["keyword_counts"].get(
+            keyword, Counter()) for keyword in self.keywords}
+        if state["weights"] != self.weights or \
+                state["symmetric"] != self.symmetric:
+            self._rebuild_orientations()
+        return True
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Follow a stream of Tweets")
+    parser.add_argument("-i", "--input", dest="input", required=True,
+                        help="The .json file to follow")
+    parser.add_argument("-f", "--filter", dest="term_filter",
+                        default="terms_only", help="The term filter to use")
+    parser.add_argument("-k", "--keyword", dest="keywords", nargs="+",
+                        default=[],
+                        help="The words to calculate co-occurrences for")
+    parser.add_argument("-n", dest="n", type=int, default=10,
+                        help="The number of terms to return")
+    parser.add_argument("--symmetric", dest="symmetric", action="store_true",
+                        help="Use both halves of the co-occurrence matrix for sentiment analysis")
+    parser.add_argument("--interval", dest="interval", type=float, default=5.0,
+                        help="The number of seconds between updates")
+    parser.add_argument("--save-interval", dest="save_interval", type=float,
+                        default=300.0,
+                        help="The number of seconds between saves of the state")
+    parser.add_argument("--once", dest="once", action="store_true",
+                        help="Update once and exit instead of following the file")
+    parser.add_argument("--restart", dest="restart", action="store_true",
+                        help="Ignore the saved state and start from the beginning")
+    return parser
+
+
+def print_results(results):
+    '''
+    Print the current results in the terminal.
+    '''
+    print("\n%d lines, %d tweets, %d terms" % (results["lines"],
+                                               results["tweets"],
+                                               results["vocabulary_size"]))
+    print("Most common terms: %s" % results["frequencies"])
+    print("Most common co-occurrences: %s" % results["co_occurrences"])
+    for keyword, terms in results["keywords"].items():
+        print("Co-occurrences for %s: %s" % (keyword, terms))
+    print("Most positive terms: %s" % results["sentiment"]["top_positive"])
+    print("Most negative terms: %s" % results["sentiment"]["top_negative"])
+
+
+def main():
+    args = get_parser().parse_args()
+    positive_vocab = define_lexicon(os.path.join(LEXICON_DIR,
+                                                 "positive_words.txt"))
+    negative_vocab = define_lexicon(os.path.join(LEXICON_DIR,
+                                                 "negative_words.txt"))
+    analyzer = IncrementalAnalyzer(args.input, args.term_filter,
+                                   positive_vocab, negative_vocab,
+                                   args.keywords, args.symmetric)
+    if not args.restart and analyzer.load():
+        print("Resuming from byte %d (%d tweets)." % (analyzer.offset,
+                                                      analyzer.ntweets))
+    saved = time.time()
+    try:
+        while True:
+            if analyzer.update() or args.once:
+                print_results(analyzer.results(args.n))
+            if args.once:
+                break
+            if time.time() - saved >= args.save_interval:
+                analyzer.save()
+                saved = time.time()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    analyzer.save()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+'''
+This Python script contains an inverted index for keyword queries on a data
+set of Tweets. For every term, the index keeps the sorted list of the IDs of
+the Tweets that contain it (its posting list), so a query only has to look at
+the Tweets that match instead of scanning every Tweet. Posting lists are
+stored compressed: the IDs are replaced by the differences between
+consecutive IDs, which are small numbers, and these are written as variable-
+length integers (7 bits per byte). The terms of each Tweet are also kept, as
+term IDs, so that the terms that co-occur with the keywords can be counted.
+
+An index is built once from the output of analysis.generate_term_list (or
+analysis.iter_terms) and can be saved to and loaded from disk:
+
+index = InvertedIndex.build(term_list)
+index.save("data/stream_QUERY.idx")
+index = InvertedIndex.load("data/stream_QUERY.idx")
+index.co_occurrences(["bernie", "sanders"], 10, mode="and")
+'''
+import json
+import struct
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from cooccurrence import Vocabulary
+
+MAGIC = b"TWIDX1\n"
+
+
+def encode_postings(ids):
+    '''
+    Compress a sorted list of Tweet IDs into variable-length integer deltas.
+    '''
+    out = bytearray()
+    previous = 0
+    for tweet_id in ids:
+        delta = tweet_id - previous
+        previous = tweet_id
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_postings(data):
+    '''
+    Decompress the output of encode_postings into an array of Tweet IDs.
+    '''
+    ids = array('I')
+    current = 0
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            current += value
+            ids.append(current)
+            value = 0
+            shift = 0
+    return ids
+
+
+def contains(ids, tweet_id):
+    '''
+    Check whether a sorted array of Tweet IDs contains the given ID.
+    '''
+    i = bisect_left(ids, tweet_id)
+    return i < len(ids) and ids[i] == tweet_id
+
+
+class InvertedIndex(object):
+    '''
+    Inverted index of the terms of a data set of Tweets.
+
+    **Parameters**
+
+        vocabulary: *cooccurrence.Vocabulary*
+            The terms of the index.
+        blob: *bytes*
+            The compressed posting lists of all of the terms, one after the
+            other in the order of the vocabulary.
+        blob_offsets: *array.array*
+            The start of the posting list of each term in blob, followed by
+            the length of blob.
+        tokens: *array.array*
+            The term IDs of all of the Tweets, one after the other.
+        tweet_offsets: *array.array*
+            The start of the terms of each Tweet in tokens, followed by the
+            length of tokens.
+    '''
+
+    def __init__(self, vocabulary, blob, blob_offsets, tokens, tweet_offsets):
+        self.vocabulary = vocabulary
+        self.blob = blob
+        self.blob_offsets = blob_offsets
+        self.tokens = tokens
+        self.tweet_offsets = tweet_offsets
+        self._cache = {}
+
+    @classmethod
+    def build(cls, term_list):
+        '''
+        Build the index from the terms of each Tweet.
+        '''
+        vocabulary = Vocabulary()
+        tokens = array('I')
+        tweet_offsets = array('Q', [0])
+        postings = []
+        for tweet_id, tweet in enumerate(term_list):
+            ids = vocabulary.encode(tweet)
+            tokens.extend(ids)
+            tweet_offsets.append(len(tokens))
+            for term_id in dict.fromkeys(ids):
+                if term_id == len(postings):
+                    postings.append(array('I'))
+                postings[term_id].append(tweet_id)
+        blob = bytearray()
+        blob_offsets = array('Q')
+        for ids in postings:
+            blob_offsets.append(len(blob))
+            blob += encode_postings(ids)
+        blob_offsets.append(len(blob))
+        return cls(vocabulary, bytes(blob), blob_offsets, tokens,
+                   tweet_offsets)
+
+    def __len__(self):
+        return len(self.tweet_offsets) - 1
+
+    def tweet(self, tweet_id):
+        '''
+        Return the terms of a Tweet.
+        '''
+        start = self.tweet_offsets[tweet_id]
+        end = self.tweet_offsets[tweet_id + 1]
+        return self.vocabulary.decode(self.tokens[start:end])
+
+    def postings(self, term):
+        '''
+        Return the sorted IDs of the Tweets that contain a term.
+        '''
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            return array('I')
+        ids = self._cache.get(term_id)
+        if ids is None:
+            start = self.blob_offsets[term_id]
+            end = self.blob_offsets[term_id + 1]
+            ids = decode_postings(self.blob[start:end])
+            self._cache[term_id] = ids
+        return ids
+
+    def search(self, keywords, mode="and"):
+        '''
+        Find the Tweets that contain the keywords.
+
+        **Parameters**
+
+            keywords: *str or list, str*
+                The keyword or keywords to search for.
+            mode: *str*
+                "and" to find the Tweets that contain all of the keywords, or
+                "or" to find the Tweets that contain any of them.
+
+        **Returns**
+
+            ids: *list, int*
+                The sorted IDs of the matching Tweets.
+        '''
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        lists = [self.postings(keyword) for keyword in keywords]
+        if not lists:
+            return []
+        if mode == "or":
+            return sorted(set().union(*lists))
+        elif mode == "and":
+            # Check the IDs of the shortest list against the other lists
+            lists.sort(key=len)
+            shortest = lists[0]
+            others = lists[1:]
+            return [tweet_id for tweet_id in shortest
+                    if all(contains(ids, tweet_id) for ids in others)]
+        else:
+            raise Exception("Invalid search mode.")
+
+    def co_occurrences(self, keywords, n, mode="and"):
+        '''
+        Calculate the terms that co-occur most frequently with the keywords,
+        only looking at the Tweets that match the query. For a single keyword
+        the result is the same as that of
+        analysis.search_word_co_occurrences.
+
+        **Parameters**
+
+            keywords: *str or list, str*
+                The keyword or keywords to search for.
+            n: *int*
+                The number of terms to return.
+            mode: *str*
+                "and" or "or", as in search.
+
+        **Returns**
+
+            count_search_most_common: *list, tuple*
+                A list with the words that appear the most frequently along
+                with the keywords.
+        '''
+        count_search = Counter()
+        tokens = self.tokens
+        offsets = self.tweet_offsets
+        for tweet_id in self.search(keywords, mode):
+            count_search.update(tokens[offsets[tweet_id]:offsets[tweet_id + 1]])
+        terms = self.vocabulary.terms
+        return [(terms[term_id], count)
+                for term_id, count in count_search.most_common(n)]
+
+    def save(self, filename):
+        '''
+        Save the index to a binary file.
+        '''
+        vocab = json.dumps(self.vocabulary.terms).encode("utf-8")
+        with open(filename, 'wb') as f:
+            f.write(MAGIC)
+            sections = [vocab, self.blob, self.blob_offsets.tobytes(),
+                        self.tokens.tobytes(), self.tweet_offsets.tobytes()]
+            # Write the length of every section, then the sections
+            f.write(struct.pack("<5Q", *[len(section) for section in sections]))
+            for section in sections:
+                f.write(section)
+
+    @classmethod
+    def load(cls, filename):
+        '''
+        Load an index that was saved with the save method.
+        '''
+        with open(filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise Exception("Invalid index file.")
+            lengths = struct.unpack("<5Q", f.read(40))
+            vocab, blob, blob_offsets, tokens, tweet_offsets = \
+                [f.read(length) for length in lengths]
+        return cls(Vocabulary(json.loads(vocab.decode("utf-8"))), blob,
+                   array('Q', blob_offsets), array('I', tokens),
+                   array('Q', tweet_offsets))
@@ -0,0 +1,119 @@
+'''
+This Python script contains the word lists used by the analysis: the
+stop-words of the term filters (the English stop-words of NLTK, along with
+punctuation and single digits) and the lexicons of positive and negative words
+of the sentiment analysis. Building them is a large part of the startup time
+of a short analysis, since the stop-words need NLTK to be imported, so the
+lists are compiled once into a snapshot file (term_database/snapshot.pickle)
+and loaded from it afterwards:
+    every list is stored along with the path and modification time of the
+    file it was built from, and is rebuilt when that file changes
+    the snapshot is read at most once per process, and every list is only
+    built once per process
+    if the snapshot cannot be written, the lists are still built, but not
+    saved
+'''
+import os
+import pickle
+import string
+from functools import lru_cache
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "term_database", "snapshot.pickle")
+# The stop-words that are added to the English stop-words of NLTK
+EXTRA_STOP_WORDS = tuple(string.punctuation) + (
+    "rt", "via", "…", "’", "“", "”", "‘", "1", "2", "3", "4", "5", "6", "7",
+    "8", "9", "0")
+
+
+@lru_cache(maxsize=None)
+def read_snapshot():
+    '''
+    Read the entries of the snapshot file, or return an empty dict if there
+    is no valid snapshot.
+    '''
+    try:
+        with open(SNAPSHOT_FILE, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return {}
+    if not isinstance(snapshot, dict) or \
+            snapshot.get("version") != SNAPSHOT_VERSION:
+        return {}
+    return snapshot["entries"]
+
+
+def write_snapshot(key, entry):
+    '''
+    Add an entry to the snapshot file, which is replaced atomically.
+    '''
+    entries = read_snapshot()
+    entries[key] = entry
+    temporary = "%s.%d.tmp" % (SNAPSHOT_FILE, os.getpid())
+    try:
+        with open(temporary, 'wb') as f:
+            pickle.dump({"version": SNAPSHOT_VERSION, "entries": entries}, f,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, SNAPSHOT_FILE)
+    except OSError:
+        pass
+
+
+def modification_time(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def cached_entry(key, check):
+    '''
+    Return the value of a snapshot entry if its source file has not changed
+    and check (the parameters it was built with) is the same, or None.
+    '''
+    entry = read_snapshot().get(key)
+    if entry is None or entry["check"] != check or \
+            modification_time(entry["source"]) != entry["mtime"]:
+        return None
+    return entry["value"]
+
+
+@lru_cache(maxsize=None)
+def stop_words():
+    '''
+    Return the set of stop-words, which are common words that do not carry
+    significance (conjunctions, adverbs, etc.), along with punctuation and
+    single digits.
+    '''
+    value = cached_entry("stop_words", EXTRA_STOP_WORDS)
+    if value is not None:
+        return value
+    # NLTK is only imported when the snapshot is missing or out of date
+    from nltk.corpus import stopwords
+    value = frozenset(stopwords.words('english') + list(EXTRA_STOP_WORDS))
+    source = stopwords.abspath('english')
+    write_snapshot("stop_words", {"source": str(source),
+                                  "mtime": modification_time(str(source)),
+                                  "check": EXTRA_STOP_WORDS,
+                                  "value": value})
+    return value
+
+
+@lru_cache(maxsize=None)
+def lexicon(filename):
+    '''
+    Return the words of a lexicon file (one word per line) as a tuple, in the
+    order of the file. Words that are listed more than once are kept, since
+    every listing counts in the sentiment analysis.
+    '''
+    path = os.path.abspath(filename)
+    value = cached_entry(path, None)
+    if value is not None:
+        return value
+    with open(path, encoding="ISO-8859-1") as f:
+        value = tuple(line.splitlines()[0] for line in f)
+    write_snapshot(path, {"source": path, "mtime": modification_time(path),
+                          "check": None, "value": value})
+    return value
+
@@ -0,0 +1,317 @@
+'''
+This Python script measures how many Tweets per second the collection of
+Tweets can sustain. It starts a local replay server (see replay_server.py),
+connects a listener to it through an HTTP line source, and reports:
+    throughput - the number of Tweets written to disk per second
+    latency - the time between the arrival of a Tweet and its write to disk
+    loss - the Tweets that were sent by the server but never reached the
+           disk, split into the ones cut by dropped connections, the ones
+           dropped by the full queue of the writer and the ones still missing
+To run a load test from the terminal, enter the following command:
+
+python load_test.py --rate 5000 --duration 10 --burst-every 5 --disconnect-every 20000
+
+By default, the listener is the MyListener object of collect_data.py, which
+needs tweepy to be installed but no Twitter credentials. Use
+"--listener writer" to measure the writer alone, or pass any object with
+on_data and close methods to run_load_test.
+'''
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+from replay_server import add_stream_arguments
+from replay_server import build_server
+from tweet_reader import open_input
+from writers import StreamWriter
+
+LISTENERS = ["mylistener", "writer"]
+
+
+class HTTPLineSource(object):
+    '''
+    Iterable that yields the lines of a streaming HTTP response, reconnecting
+    with an exponential backoff when the connection is dropped, until it is
+    stopped. Blank keep-alive lines are skipped.
+
+    **Parameters**
+
+        url: *str*
+            The URL of the stream.
+        timeout: *float*
+            The socket timeout, in seconds.
+        backoff: *float*
+            The first wait before reconnecting, in seconds.
+        max_backoff: *float*
+            The longest wait before reconnecting, in seconds.
+
+    **Attributes**
+
+        received: *int*
+            The number of lines received.
+        keepalives: *int*
+            The number of blank lines received.
+        reconnects: *int*
+            The number of times the source reconnected.
+    '''
+
+    def __init__(self, url, timeout=10.0, backoff=0.05, max_backoff=5.0):
+        self.url = urlparse(url)
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.received = 0
+        self.keepalives = 0
+        self.reconnects = 0
+        self.stopping = threading.Event()
+
+    def stop(self):
+        self.stopping.set()
+
+    def __iter__(self):
+        backoff = self.backoff
+        path = self.url.path + ("?" + self.url.query if self.url.query else "")
+        while not self.stopping.is_set():
+            connection = http.client.HTTPConnection(
+                self.url.hostname, self.url.port, timeout=self.timeout)
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                while True:
+                    line = response.readline()
+                    if not line.endswith(b"\n"):
+                        # The stream ended, or the connection was dropped in
+                        # the middle of a line. As with the streaming API,
+                        # both are handled by reconnecting.
+                        break
+                    backoff = self.backoff
+                    if not line.strip():
+                        self.keepalives += 1
+                        continue
+                    self.received += 1
+                    # The line is passed on with its newline, as by tweepy
+                    yield line.decode("utf-8")
+            except (http.client.HTTPException, OSError):
+                pass
+            finally:
+                connection.close()
+            if self.stopping.is_set():
+                return
+            self.reconnects += 1
+            self.stopping.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+
+class WriterListener(object):
+    '''
+    Listener that only hands the Tweets to a writer, to measure the writer
+    without the rest of MyListener.
+    '''
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.received = 0
+        self.dropped = 0
+
+    def on_data(self, data):
+        self.received += 1
+        if not self.writer.write(data):
+            self.dropped += 1
+        return True
+
+    def close(self):
+        self.writer.close()
+
+
+class LatencyRecorder(object):
+    '''
+    Recorder of the time between the arrival of each Tweet and its write to
+    disk. The writer writes the accepted Tweets in order, so every write of n
+    Tweets completes the n oldest arrivals.
+    '''
+
+    def __init__(self):
+        self.arrivals = deque()
+        self.latencies = []
+
+    def wrap(self, writer):
+        '''
+        Record the arrival time of every Tweet that the writer accepts.
+        '''
+        write = writer.write
+        arrivals = self.arrivals
+
+        def timed_write(data):
+            arrivals.append(time.time())
+            if write(data):
+                return True
+            arrivals.pop()
+            return False
+
+        writer.write = timed_write
+        writer.on_write = self.on_write
+        return writer
+
+    def on_write(self, n, written_at):
+        popleft = self.arrivals.popleft
+        self.latencies.extend(written_at - popleft() for _ in range(n))
+
+    def percentiles(self, points=(50, 95, 99, 100)):
+        '''
+        Return the latency percentiles, in milliseconds.
+        '''
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+        return {"p%d" % point: 1000 * latencies[min(len(latencies) - 1,
+                                                     len(latencies) * point // 100)]
+                for point in points}
+
+
+def count_lines(filenames):
+    '''
+    Count the lines of the files written by a test.
+    '''
+    count = 0
+    for filename in filenames:
+        with open_input(filename) as f:
+            count += sum(block.count(b"\n") for block in
+                         iter(lambda: f.read(1 << 20), b""))
+    return count
+
+
+def build_listener(kind, directory, writer):
+    '''
+    Return a listener of the given kind that saves Tweets with the writer.
+    '''
+    if kind == "mylistener":
+        from collect_data import MyListener
+        return MyListener(directory, "load_test", float("inf"), writer)
+    return WriterListener(writer)
+
+
+def run_load_test(server, listener_kind="mylistener", duration=10.0,
+                  directory=None, compress=False, queue_size=10000,
+                  flush_interval=1.0, listener=None):
+    '''
+    Run a load test against a replay server.
+
+    **Parameters**
+
+        server: *replay_server.ReplayServer*
+            The server, which is started and stopped by the test.
+        listener_kind: *str*
+            The kind of listener: "mylistener" or "writer".
+        duration: *float*
+            The duration of the test, in seconds.
+        directory: *str, optional*
+            The directory the Tweets are written to. By default, a temporary
+            directory that is deleted after the test.
+        compress: *boolean*
+            Whether the writer compresses the output with gzip.
+        queue_size: *int*
+            The size of the queue of the writer.
+        flush_interval: *float*
+            The flush interval of the writer, in seconds.
+        listener: *object, optional*
+            A listener to use instead of one of the given kind. It must have
+            on_data and close methods and write through a StreamWriter
+            available as its writer attribute.
+
+    **Returns**
+
+        report: *dict*
+            The throughput, latency and loss of the test.
+    '''
+    if directory is None:
+        with tempfile.TemporaryDirectory() as directory:
+            return run_load_test(server, listener_kind, duration, directory,
+                                 compress, queue_size, flush_interval,
+                                 listener)
+    recorder = LatencyRecorder()
+    if listener is None:
+        writer = StreamWriter(os.path.join(directory,
+                                           "stream_load_test.json"),
+                              compress=compress, flush_interval=flush_interval,
+                              background=True, queue_size=queue_size)
+        listener = build_listener(listener_kind, directory, writer)
+    recorder.wrap(listener.writer)
+    source = HTTPLineSource(server.url)
+    server.start()
+    start = time.time()
+
+    def consume():
+        for line in source:
+            if not listener.on_data(line):
+                break
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    thread.join(duration)
+    # The source stops at the end of the stream, so every line sent is still
+    # received
+    source.stop()
+    server.stop()
+    thread.join()
+    elapsed = time.time() - start
+    listener.close()
+    written = count_lines(listener.writer.files())
+    stats = server.stats()
+    full_lines = stats["sent"] - stats["partial"]
+    return {"seconds": elapsed,
+            "sent": stats["sent"],
+            "received": source.received,
+            "written": written,
+            "tweets_per_sec": written / elapsed if elapsed else None,
+            "latency_ms": recorder.percentiles(),
+            "connections": stats["connections"],
+            "disconnects": stats["disconnects"],
+            "reconnects": source.reconnects,
+            "keepalives": source.keepalives,
+            "lost": {"partial": stats["partial"],
+                     "queue_full": listener.writer.dropped,
+                     "other": full_lines - listener.writer.dropped - written},
+            "loss_rate": (stats["sent"] - written) / stats["sent"]
+            if stats["sent"] else 0.0}
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Load test the collection")
+    add_stream_arguments(parser)
+    parser.add_argument("--duration", dest="duration", type=float,
+                        default=10.0, help="The duration of the test, in seconds")
+    parser.add_argument("--listener", dest="listener", default="mylistener",
+                        choices=LISTENERS, help="The listener to test")
+    parser.add_argument("-z", "--gzip", dest="compress", action="store_true",
+                        help="Compress the output with gzip")
+    parser.add_argument("--queue-size", dest="queue_size", type=int,
+                        default=10000, help="The size of the queue of the writer")
+    parser.add_argument("--flush-interval", dest="flush_interval", type=float,
+                        default=1.0, help="The flush interval of the writer")
+    parser.add_argument("-o", "--output", dest="output",
+                        help="A .json file to write the report to")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    server = build_server(args)
+    report = run_load_test(server, args.listener, args.duration,
+                           compress=args.compress, queue_size=args.queue_size,
+                           flush_interval=args.flush_interval)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
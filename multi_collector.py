@@ -0,0 +1,405 @@
+'''
+This Python script collects the Tweets of many queries at once over a single
+connection to the stream, instead of running one collect_data.py process (and
+one connection) per query. The stream is asked for the Tweets of every query,
+and each Tweet that arrives is matched against all of the queries with one
+precompiled regular expression and saved in the file of every query it
+matches (data/stream_QUERY.json, as with collect_data.py). To collect the
+Tweets of several queries from the terminal, enter the following command:
+
+python multi_collector.py -q "bernie sanders" warren "#debate" -d data -t 600
+
+As with the track parameter of the streaming API, a query matches a Tweet if
+every one of its words appears in the text of the Tweet, in any order and
+case. A word also matches its hashtag and its mention.
+
+The collector runs on asyncio. Every query has a bounded queue and a task
+that hands its Tweets to a StreamWriter in a thread, so the event loop never
+waits on the disk. When the queue of a query is full, the collector stops
+reading from the stream until there is room again (backpressure), or, with
+--drop, drops the Tweet for that query only. The stream can be Twitter
+(which needs tweepy and config.py), any URL that streams Tweets such as
+replay_server.py (--url), or a recorded .json file (-i).
+'''
+import argparse
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from urllib.parse import urlparse
+from tweet_reader import extract_fields
+from writers import StreamWriter
+from writers import format_filename
+
+
+class QueryMatcher(object):
+    '''
+    Matcher of the text of Tweets against many queries at once. The words of
+    all of the queries are compiled into a single regular expression, so the
+    text of a Tweet is scanned once whatever the number of queries.
+
+    **Parameters**
+
+        queries: *list, str*
+            The queries. A query matches a Tweet if all of its words appear
+            in the text of the Tweet.
+    '''
+
+    def __init__(self, queries):
+        self.queries = list(queries)
+        self.query_words = [frozenset(query.lower().split())
+                            for query in self.queries]
+        # The queries that each word is part of
+        self.word_queries = {}
+        for i, words in enumerate(self.query_words):
+            for word in words:
+                self.word_queries.setdefault(word, []).append(i)
+        # Longer words first, so that a word is not matched by its prefix
+        words = sorted(self.word_queries, key=len, reverse=True)
+        self.words_re = re.compile(
+            r"(?<![\w#@])[#@]?(?:%s)(?!\w)" % "|".join(map(re.escape, words)))
+
+    def match(self, text):
+        '''
+        Return the indexes of the queries that match a text.
+        '''
+        found = set()
+        for word in self.words_re.findall(text.lower()):
+            # As with the streaming API, a word also matches its hashtag and
+            # mention
+            found.add(word.lstrip("#@"))
+            found.add(word)
+        if not found:
+            return []
+        candidates = set()
+        for word in found:
+            candidates.update(self.word_queries.get(word, ()))
+        return sorted(i for i in candidates
+                      if self.query_words[i] <= found)
+
+    def track(self):
+        '''
+        Return the words to ask the stream for.
+        '''
+        return sorted(self.word_queries)
+
+
+async def iter_source(lines, rate=None):
+    '''
+    Asynchronous generator that yields lines from an iterable, such as a
+    recorded .json file, at a given rate (or as fast as possible).
+    '''
+    start = time.time()
+    for i, line in enumerate(lines):
+        if rate:
+            delay = start + i / rate - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif i % 1000 == 0:
+            # Let the other tasks run
+            await asyncio.sleep(0)
+        yield line
+
+
+async def http_source(url, track=(), backoff=0.05, max_backoff=5.0):
+    '''
+    Asynchronous generator that yields the lines of a streaming HTTP response
+    with chunked encoding, such as the one of replay_server.py, and
+    reconnects with an exponential backoff when the connection is dropped.
+    Blank keep-alive lines are skipped.
+    '''
+    url = urlparse(url)
+    path = url.path or "/"
+    if track:
+        path += "?track=" + quote(",".join(track))
+    delay = backoff
+    while True:
+        writer = None
+        try:
+            reader, writer = await asyncio.open_connection(url.hostname,
+                                                           url.port or 80)
+            writer.write(("GET %s HTTP/1.1\r\nHost: %s\r\n\r\n" %
+                          (path, url.netloc)).encode("ascii"))
+            await writer.drain()
+            # Skip the status line and the headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            partial = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    break
+                data = partial + await reader.readexactly(size)
+                await reader.readexactly(2)
+                lines = data.split(b"\n")
+                partial = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        delay = backoff
+                        yield line + b"\n"
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if writer is not None:
+                writer.close()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_backoff)
+
+
+async def twitter_source(track, queue_size=10000):
+    '''
+    Asynchronous generator that yields the Tweets of the Twitter streaming
+    API. tweepy runs in a thread and blocks when the queue is full, so that
+    the backpressure of the collector reaches the connection.
+    '''
+    from tweepy import OAuthHandler
+    from tweepy import Stream
+    from tweepy.streaming import StreamListener
+    import config
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue(maxsize=queue_size)
+
+    class QueueListener(StreamListener):
+
+        def on_data(self, data):
+            asyncio.run_coroutine_threadsafe(lines.put(data),
+                                             loop).result()
+            return True
+
+        def on_error(self, status):
+            print(status)
+            return True
+
+    auth = OAuthHandler(config.consumer_key, config.consumer_secret)
+    auth.set_access_token(config.access_token, config.access_secret)
+    stream = Stream(auth, QueueListener(), timeout=10)
+    stream.filter(track=list(track), is_async=True)
+    try:
+        while True:
+            yield await lines.get()
+    finally:
+        stream.disconnect()
+
+
+class MultiCollector(object):
+    '''
+    Collector that routes the Tweets of one stream to the files of many
+    queries.
+
+    **Parameters**
+
+        queries: *list, str*
+            The queries.
+        data_dir: *str*
+            The directory where the data of every query will be saved.
+        queue_size: *int*
+            The number of Tweets the queue of each query can hold.
+        drop: *boolean*
+            If True, a Tweet is dropped for a query whose queue is full.
+            Otherwise, the collector waits until there is room.
+        compress: *boolean*
+            Whether to compress the output with gzip.
+        flush_interval: *float*
+            The maximum time, in seconds, that a Tweet stays in the buffer of
+            a writer.
+        batch_size: *int*
+            The maximum number of Tweets handed to a writer at once.
+
+    **Attributes**
+
+        received: *int*
+            The number of lines received from the stream.
+        unmatched: *int*
+            The number of Tweets that matched no query.
+        matched: *list, int*
+            The number of Tweets matched by each query.
+        dropped: *list, int*
+            The number of Tweets dropped for each query.
+    '''
+
+    def __init__(self, queries, data_dir, queue_size=10000, drop=False,
+                 compress=False, flush_interval=1.0, batch_size=1000):
+        self.matcher = QueryMatcher(queries)
+        self.queries = self.matcher.queries
+        self.queue_size = queue_size
+        self.drop = drop
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.writers = [StreamWriter(os.path.join(
+            data_dir, "stream_%s.json" % format_filename(query)),
+            compress=compress, flush_interval=flush_interval)
+            for query in self.queries]
+        self.received = 0
+        self.unmatched = 0
+        self.matched = [0] * len(self.queries)
+        self.dropped = [0] * len(self.queries)
+        self.queues = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, min(4, len(self.queries))))
+
+    def track(self):
+        return self.matcher.track()
+
+    def route(self, line):
+        '''
+        Return the indexes of the queries that a line of the stream is for.
+        '''
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        try:
+            text = extract_fields(line, ("text",))[0]
+        except (ValueError, AttributeError):
+            return []
+        if not isinstance(text, str):
+            return []
+        return self.matcher.match(text)
+
+    async def _write(self, i):
+        '''
+        Task that hands the Tweets of the queue of a query to its writer, in
+        batches, in a thread.
+        '''
+        loop = asyncio.get_running_loop()
+        queue = self.queues[i]
+        writer = self.writers[i]
+        while True:
+            try:
+                line = await asyncio.wait_for(queue.get(),
+                                              self.flush_interval)
+            except asyncio.TimeoutError:
+                await loop.run_in_executor(self._executor, writer.flush)
+                continue
+            if line is None:
+                break
+            batch = [line]
+            while len(batch) < self.batch_size and not queue.empty():
+                line = queue.get_nowait()
+                if line is None:
+                    queue.put_nowait(None)
+                    break
+                batch.append(line)
+            await loop.run_in_executor(self._executor, write_batch, writer,
+                                       batch)
+        await loop.run_in_executor(self._executor, writer.close)
+
+    async def run(self, source, time_limit=None):
+        '''
+        Collect the Tweets of an asynchronous source of lines until it ends
+        or the time limit (in seconds) is reached.
+        '''
+        self.queues = [asyncio.Queue(maxsize=self.queue_size)
+                       for _ in self.queries]
+        tasks = [asyncio.ensure_future(self._write(i))
+                 for i in range(len(self.queries))]
+        try:
+            if time_limit is None:
+                await self._route(source)
+            else:
+                try:
+                    await asyncio.wait_for(self._route(source), time_limit)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for queue in self.queues:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+            self._executor.shutdown()
+
+    async def _route(self, source):
+        queues = self.queues
+        async for line in source:
+            self.received += 1
+            matches = self.route(line)
+            if not matches:
+                self.unmatched += 1
+                continue
+            for i in matches:
+                self.matched[i] += 1
+                if self.drop:
+                    try:
+                        queues[i].put_nowait(line)
+                    except asyncio.QueueFull:
+                        self.dropped[i] += 1
+                else:
+                    await queues[i].put(line)
+
+    def stats(self):
+        '''
+        Return the number of Tweets matched, written and dropped for each
+        query.
+        '''
+        return {query: {"matched": self.matched[i],
+                        "written": self.writers[i].written,
+                        "dropped": self.dropped[i]}
+                for i, query in enumerate(self.queries)}
+
+
+def write_batch(writer, batch):
+    '''
+    Write a batch of Tweets with a writer.
+    '''
+    for line in batch:
+        writer.write(line)
+
+
+def read_lines(filename):
+    '''
+    Generator that yields the lines of a recorded .json file.
+    '''
+    with open(filename, 'rb') as f:
+        for line in f:
+            yield line
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Download Tweets of many queries")
+    parser.add_argument("-q", "--query", dest="queries", nargs="+",
+                        required=True, help="The desired queries")
+    parser.add_argument("-d", "--data-dir", dest="data_dir", default="data",
+                        help="The directory where the data will be saved")
+    parser.add_argument("-t", "--time-limit", dest="time_limit", type=float,
+                        help="The number of seconds to run the collector for")
+    parser.add_argument("--url", dest="url",
+                        help="A URL that streams Tweets, instead of Twitter")
+    parser.add_argument("-i", "--input", dest="input",
+                        help="A recorded .json file to read, instead of Twitter")
+    parser.add_argument("--rate", dest="rate", type=float,
+                        help="The rate at which the recorded file is read")
+    parser.add_argument("--queue-size", dest="queue_size", type=int,
+                        default=10000,
+                        help="The number of Tweets the queue of each query can hold")
+    parser.add_argument("--drop", dest="drop", action="store_true",
+                        help="Drop Tweets for queries whose queue is full instead of waiting")
+    parser.add_argument("-z", "--gzip", dest="compress", action="store_true",
+                        help="Compress the output with gzip")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    collector = MultiCollector(args.queries, args.data_dir, args.queue_size,
+                               args.drop, args.compress)
+    if args.input:
+        source = iter_source(read_lines(args.input), args.rate)
+    elif args.url:
+        source = http_source(args.url, collector.track())
+    else:
+        source = twitter_source(collector.track())
+    try:
+        asyncio.run(collector.run(source, args.time_limit))
+    except KeyboardInterrupt:
+        pass
+    print("%d tweets received, %d matched no query." % (collector.received,
+                                                       collector.unmatched))
+    for query, stats in collector.stats().items():
+        print("%s: %d matched, %d written, %d dropped." %
+              (query, stats["matched"], stats["written"], stats["dropped"]))
+
+
+if __name__ == '__main__':
+    main()
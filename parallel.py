@@ -0,0 +1,235 @@
+'''
+This Python script runs the analysis of Tweets on several cores at once. The
+input is either a single large .json file, which is split into byte-range
+chunks on line boundaries, or a directory containing several .json files
+(shards). Every chunk is tokenized and counted by a separate worker process,
+which returns partial term counts and a partial co-occurrence matrix. The
+partial results are then merged in the order of the chunks, so that the
+results are exactly the same as those of the serial functions in analysis.py.
+To run the analysis from the terminal, enter the following command:
+
+python parallel.py -i data/stream_QUERY.json -w 4 -f terms_only -n 10
+'''
+import argparse
+import os
+from collections import Counter
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from analysis import TermStream
+from analysis import add_co_occurrences
+from analysis import co_occurrent_terms
+from co_occurrence_modes import resolve_mode
+from tweet_reader import is_compressed
+
+INPUT_EXTENSIONS = (".json", ".jsonl", ".json.gz", ".jsonl.gz")
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Analyze Tweets in parallel")
+    parser.add_argument("-i", "--input", dest="input", required=True,
+                        help="A .json file or a directory of .json files")
+    parser.add_argument("-w", "--workers", dest="workers", type=int,
+                        default=None, help="The number of worker processes")
+    parser.add_argument("-f", "--filter", dest="term_filter",
+                        default="terms_only", help="The term filter to use")
+    parser.add_argument("-k", "--keyword", dest="keywords", action="append",
+                        default=[], help="A word to search co-occurrences for")
+    parser.add_argument("-n", dest="n", type=int, default=10,
+                        help="The number of terms to return")
+    parser.add_argument("--co-mode", dest="co_mode", default="full",
+                        help="The co-occurrence mode, such as full, window:5, dedup or cap:50")
+    return parser
+
+
+def list_shards(source):
+    '''
+    List the .json files to be analyzed. If the source is a directory, all of
+    the .json, .jsonl, .json.gz and .jsonl.gz files in it are returned in
+    alphabetical order.
+    '''
+    if os.path.isdir(source):
+        return [os.path.join(source, name) for name in sorted(os.listdir(source))
+                if name.endswith(INPUT_EXTENSIONS)]
+    return [source]
+
+
+def file_chunks(filename, nchunks):
+    '''
+    Split a file into byte ranges that start and end on line boundaries.
+
+    **Parameters**
+
+        filename: *str*
+            The name of the .json file to be split.
+        nchunks: *int*
+            The desired number of chunks. Fewer chunks are returned if the
+            file does not contain enough lines.
+
+    **Returns**
+
+        chunks: *list, tuple*
+            A list of (filename, start, end) tuples covering the whole file,
+            where end is None for the last chunk.
+    '''
+    size = os.path.getsize(filename)
+    # A compressed file cannot be read from an offset, so it is one chunk
+    if size == 0 or nchunks <= 1 or is_compressed(filename):
+        return [(filename, 0, None)]
+    boundaries = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, nchunks):
+            # Move to the next line after the approximate boundary
+            f.seek(max(size * i // nchunks - 1, boundaries[-1]))
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(None)
+    return [(filename, boundaries[i], boundaries[i + 1])
+            for i in range(len(boundaries) - 1)]
+
+
+def analyze_chunk(task):
+    '''
+    Tokenize and count the Tweets in a single chunk. This function is run by
+    the worker processes.
+
+    **Parameters**
+
+        task: *tuple*
+            A (filename, start, end, term_filter, keywords, mode) tuple.
+
+    **Returns**
+
+        partial: *tuple*
+            The line count, the number of Tweets, the term counts, the
+            co-occurrence matrix as a dict of dicts and the keyword counts.
+    '''
+    filename, start, end, term_filter, keywords, mode = task
+    stream = TermStream(filename, term_filter, start, end)
+    count_all = Counter()
+    com = defaultdict(Counter)
+    keyword_counts = {keyword: Counter() for keyword in keywords}
+    for tweet in stream:
+        count_all.update(tweet)
+        if mode.full:
+            add_co_occurrences(com, tweet)
+        else:
+            add_co_occurrences(com, mode.prepare(tweet), mode.window)
+        for keyword, count_search in keyword_counts.items():
+            if keyword in tweet:
+                count_search.update(tweet)
+    # The defaultdict is converted to a dict so that it can be pickled
+    return stream.count, stream.ntweets, count_all, dict(com), keyword_counts
+
+
+def merge_partials(partials, keywords=()):
+    '''
+    Merge the partial results of the workers in the order of the chunks. Since
+    dicts keep their insertion order, merging in chunk order gives the same
+    ordering of terms as a serial pass over the data.
+    '''
+    count = 0
+    ntweets = 0
+    count_all = Counter()
+    com = defaultdict(lambda: defaultdict(int))
+    keyword_counts = {keyword: Counter() for keyword in keywords}
+    for part_count, part_ntweets, part_terms, part_com, part_keywords in partials:
+        count += part_count
+        ntweets += part_ntweets
+        count_all.update(part_terms)
+        for w1, row in part_com.items():
+            com_row = com[w1]
+            for w2, n in row.items():
+                com_row[w2] += n
+        for keyword, count_search in part_keywords.items():
+            keyword_counts[keyword].update(count_search)
+    return count_all, com, keyword_counts, ntweets, count
+
+
+def parallel_statistics(source, term_filter, keywords=(), workers=None,
+                        chunks_per_worker=4, mode=None):
+    '''
+    Calculate the term frequencies, the co-occurrence matrix and the keyword
+    co-occurrences of a .json file or a directory of .json files using a pool
+    of worker processes.
+
+    **Parameters**
+
+        source: *str*
+            The name of a .json file or of a directory of .json files.
+        term_filter: *str or TermFilter*
+            The filter to be used for parsing through all the words in the
+            Tweets. It must be picklable, so user-defined filters have to be
+            module-level objects.
+        keywords: *list, str*
+            The words we want to calculate co-occurrences for.
+        workers: *int, optional*
+            The number of worker processes. If None, the number of CPUs is
+            used. If 1, everything is run in the current process.
+        chunks_per_worker: *int*
+            The number of chunks each file is split into per worker, which
+            balances the load when the Tweets vary in length.
+        mode: *str or co_occurrence_modes.CoOccurrenceMode, optional*
+            The mode of the co-occurrence matrix. All of the pairs of terms
+            are counted by default.
+
+    **Returns**
+
+        count_all: *collections.Counter*
+            The number of times each term appears.
+        com: *collections.defaultdict*
+            The co-occurrence matrix, as built by analysis.generate_co_matrix.
+        keyword_counts: *dict*
+            A Counter object for each keyword with the terms that appear in
+            the same Tweets as the keyword.
+        ntweets: *int*
+            The number of Tweets.
+        count: *int*
+            The number of lines read.
+    '''
+    if workers is None:
+        workers = os.cpu_count() or 1
+    keywords = tuple(keywords)
+    mode = resolve_mode(mode)
+    tasks = []
+    for filename in list_shards(source):
+        for chunk in file_chunks(filename, workers * chunks_per_worker):
+            tasks.append(chunk + (term_filter, keywords, mode))
+    if workers == 1 or len(tasks) == 1:
+        partials = map(analyze_chunk, tasks)
+        return merge_partials(partials, keywords)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map returns the results in the order of the tasks
+        partials = pool.map(analyze_chunk, tasks)
+        return merge_partials(partials, keywords)
+
+
+def main():
+    # Define parser and retrieve the input arguments
+    args = get_parser().parse_args()
+    count_all, com, keyword_counts, ntweets, count = parallel_statistics(
+        args.input, args.term_filter, args.keywords, args.workers,
+        mode=args.co_mode)
+    # Print results
+    print("Most frequent terms:")
+    for i in count_all.most_common(args.n):
+        print(i)
+    print("\nMost frequent co-occurrent terms:")
+    for i in co_occurrent_terms(com, args.n):
+        print(i)
+    for keyword, count_search in keyword_counts.items():
+        print("\nFor the word %s, the most frequent co-occurrent terms are:" %
+              keyword)
+        for i in count_search.most_common(args.n):
+            print(i)
+    print("\nAnalyzed %d tweets from %d lines." % (ntweets, count))
+
+
+if __name__ == '__main__':
+    main()
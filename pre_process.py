@@ -1,37 +1,52 @@
 '''
 This Python script contains functions that are used to pre-process Twitter
-data.
+data. All of the regular expressions are compiled once when the module is
+imported, so that tokenizing millions of Tweets does not rebuild them for
+every single line of a .json file.
 '''
 import re
 
-
-def tokenize(s):
-    '''
-    Split a string of text into individual tokens.
-    '''
-    # Define string of various emoticons to be recognized as tokens
-    emoticons_str = r"""
+# Define string of various emoticons to be recognized as tokens
+emoticons_str = r"""
     (?:
         [:=;]
         [oO\-]?
         [D\)\]\(\]/\\OpP]
     )"""
-    # Define regular expressions which contain possible patterns for text in
-    # Tweets, such as hashtags, URLs, and numbers
-    regex_str = [
-        emoticons_str,
-        r"<[^>]+>",
-        r"(?:@[\w_]+)",
-        r"(?:\#+[\w_]+[\w\'_\-]*[\w_]+)",
-        r"http[s]?://(?:[a-z]|[0-9]|[$-_@.&amp;+]|[!*\(\),]|(?:%[0-9a-f][0-9a-f]))+",
-        r"(?:(?:\d+,?)+(?:\.?\d+)?)",
-        r"(?:[a-z][a-z'\-_]+[a-z])",
-        r"(?:[\w_]+)",
-        r"(?:\S)"]
-    # Use Verbose and Ignorecase flags to ignore spaces in original strings
-    # and read both lowercase and uppercase characters
-    tokens_re = re.compile(r'(' + '|'.join(regex_str) + ')',
-                           re.VERBOSE | re.IGNORECASE)
+# Define regular expressions which contain possible patterns for text in
+# Tweets, such as hashtags, URLs, and numbers. Each pattern is paired with the
+# name of the class of token that it recognizes, and the order of the list is
+# the order in which the patterns are tried.
+token_classes = [
+    ("emoticon", emoticons_str),
+    ("html", r"<[^>]+>"),
+    ("mention", r"(?:@[\w_]+)"),
+    ("hashtag", r"(?:\#+[\w_]+[\w\'_\-]*[\w_]+)"),
+    ("url",
+     r"http[s]?://(?:[a-z]|[0-9]|[$-_@.&amp;+]|[!*\(\),]|(?:%[0-9a-f][0-9a-f]))+"),
+    ("number", r"(?:(?:\d+,?)+(?:\.?\d+)?)"),
+    ("word", r"(?:[a-z][a-z'\-_]+[a-z])"),
+    ("word", r"(?:[\w_]+)"),
+    ("other", r"(?:\S)")]
+regex_str = [pattern for _, pattern in token_classes]
+# Use Verbose and Ignorecase flags to ignore spaces in original strings and
+# read both lowercase and uppercase characters
+tokens_re = re.compile(r'(' + '|'.join(regex_str) + ')',
+                       re.VERBOSE | re.IGNORECASE)
+emoticon_re = re.compile(r'^' + emoticons_str + '$',
+                         re.VERBOSE | re.IGNORECASE)
+# The same patterns with one numbered group per pattern, so that a single
+# scan of a Tweet reports both the token and which pattern recognized it
+classified_re = re.compile(
+    '|'.join('(%s)' % pattern for pattern in regex_str),
+    re.VERBOSE | re.IGNORECASE)
+group_classes = [None] + [name for name, _ in token_classes]
+
+
+def tokenize(s):
+    '''
+    Split a string of text into individual tokens.
+    '''
     return tokens_re.findall(s)
 
 
@@ -53,17 +68,6 @@ def preprocess(s, lowercase=True):
         tokens: *list, str*
             The individual string tokens from the original Tweet.
     '''
-    # Define string of various emoticons to be recognized as tokens
-    emoticons_str = r"""
-    (?:
-        [:=;]
-        [oO\-]?
-        [D\)\]\(\]/\\OpP]
-    )"""
-    # Use Verbose and Ignorecase flags to ignore spaces in original strings
-    # and read both lowercase and uppercase characters in the emoticons
-    emoticon_re = re.compile(r'^' + emoticons_str + '$',
-                             re.VERBOSE | re.IGNORECASE)
     # Call the tokenize function and convert characters to lowercase if the
     # flag is set to be True
     tokens = tokenize(s)
@@ -71,3 +75,79 @@ def preprocess(s, lowercase=True):
         tokens = [token if emoticon_re.search(
             token) else token.lower() for token in tokens]
     return tokens
+
+
+def classify(s, lowercase=True):
+    '''
+    Split a string of text into individual tokens and classify each of them in
+    a single pass over the text.
+
+    **Parameters**
+
+        s: *str*
+            The text to be split into separate strings.
+        lowercase: *boolean*
+            A flag to decide whether the tokens will be converted to lowercase,
+            except for emoticons, in the same way as in preprocess.
+
+    **Returns**
+
+        tokens: *list, tuple*
+            A list of (token, kind) pairs, where kind is one of "emoticon",
+            "html", "mention", "hashtag", "url", "number", "word" or "other".
+    '''
+    tokens = []
+    for match in classified_re.finditer(s):
+        kind = group_classes[match.lastindex]
+        token = match.group()
+        # Emoticons keep their case, since ":D" and ":d" are different faces
+        if lowercase and kind != "emoticon":
+            token = token.lower()
+        tokens.append((token, kind))
+    return tokens
+
+
+def tokenize_many(texts):
+    '''
+    Generator that tokenizes an iterable of strings, yielding the list of
+    tokens for each string in turn.
+    '''
+    findall = tokens_re.findall
+    for s in texts:
+        yield findall(s)
+
+
+def preprocess_many(texts, lowercase=True, classified=False):
+    '''
+    Generator that pre-processes an iterable of Tweet texts.
+
+    **Parameters**
+
+        texts: *iterable, str*
+            The texts of the Tweets to be split into separate strings.
+        lowercase: *boolean*
+            A flag to decide whether the tokens will be converted to lowercase,
+            except for emoticons.
+        classified: *boolean*
+            If True, each token is yielded as a (token, kind) pair as returned
+            by the classify function.
+
+    **Returns**
+
+        tokens: *list, str*
+            The tokens of each Tweet, yielded in the same order as the texts.
+            These are exactly the tokens returned by preprocess.
+    '''
+    if classified:
+        for s in texts:
+            yield classify(s, lowercase)
+        return
+    finditer = classified_re.finditer
+    for s in texts:
+        if lowercase:
+            # Only emoticons are matched by the first group, so every other
+            # token can be lowercased without running a second regex on it
+            yield [match.group() if match.lastindex == 1
+                   else match.group().lower() for match in finditer(s)]
+        else:
+            yield [match.group() for match in finditer(s)]
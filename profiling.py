@@ -0,0 +1,233 @@
+'''
+This Python script contains the instrumentation of analysis runs. A Profiler
+records, for each stage of a run:
+    wall - the wall time of the stage, in seconds
+    cpu - the CPU time of the process during the stage, in seconds
+    tweets_per_sec and tokens_per_sec - the throughput of the stage, if the
+                                         number of Tweets or tokens is known
+    peak_rss_mb - the peak resident memory of the process at the end of the
+                  stage, in MB
+along with any other metrics of the run, such as the size of the vocabulary
+or the number of entries of the co-occurrence matrix. The report is written
+as a .json file. A sampling profiler can also be attached to one stage, which
+dumps how often each call stack was seen in the collapsed format used by
+flame graph tools ("outer;inner;innermost count").
+
+When profiling is disabled, a NullProfiler is used instead, whose methods do
+nothing, so that the instrumented code runs at full speed.
+'''
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb():
+    '''
+    Return the peak resident memory of the process, in MB, or None if it is
+    not available on this platform.
+    '''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / 2 ** 20
+    return peak / 2 ** 10
+
+
+class SamplingProfiler(object):
+    '''
+    Profiler that samples the call stack of a thread at a fixed interval from
+    a background thread.
+
+    **Parameters**
+
+        interval: *float*
+            The time between samples, in seconds.
+        thread_id: *int, optional*
+            The ID of the thread to sample. By default, the thread that
+            creates the profiler.
+    '''
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s (%s:%d)" % (code.co_name, code.co_filename,
+                                             code.co_firstlineno))
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def dump(self, filename):
+        '''
+        Write the sampled stacks in collapsed format, most frequent first.
+        '''
+        with open(filename, 'w') as f:
+            for stack, count in sorted(self.stacks.items(),
+                                       key=lambda item: item[1], reverse=True):
+                f.write("%s %d\n" % (stack, count))
+
+
+class Profiler(object):
+    '''
+    Recorder of the time, throughput and memory of the stages of a run.
+
+    **Parameters**
+
+        sample_stage: *str, optional*
+            The name of a stage to run under a SamplingProfiler.
+        sample_file: *str*
+            The file that the sampled stacks are written to.
+        sample_interval: *float*
+            The time between samples, in seconds.
+    '''
+
+    enabled = True
+
+    def __init__(self, sample_stage=None, sample_file="profile_stacks.txt",
+                 sample_interval=0.005):
+        self.stages = {}
+        self.metrics = {}
+        self.sample_stage = sample_stage
+        self.sample_file = sample_file
+        self.sample_interval = sample_interval
+        self.start_time = time.time()
+
+    @contextmanager
+    def stage(self, name, tweets=None, tokens=None):
+        '''
+        Context manager that records a stage of the run. The number of Tweets
+        and tokens processed by the stage can be given here or, when they are
+        only known at the end of the stage, set in the returned dict.
+        '''
+        sampler = None
+        if name == self.sample_stage:
+            sampler = SamplingProfiler(self.sample_interval)
+            sampler.start()
+        record = {"tweets": tweets, "tokens": tokens}
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            if sampler is not None:
+                sampler.stop()
+                sampler.dump(self.sample_file)
+                record["samples"] = sampler.samples
+                record["sample_file"] = self.sample_file
+            record["wall"] = wall
+            record["cpu"] = cpu
+            for count in ("tweets", "tokens"):
+                if record[count] is not None:
+                    record[count + "_per_sec"] = \
+                        record[count] / wall if wall > 0 else None
+            record["peak_rss_mb"] = peak_rss_mb()
+            self.stages[name] = record
+
+    def record(self, **metrics):
+        '''
+        Record metrics of the run, such as vocabulary_size=12345.
+        '''
+        self.metrics.update(metrics)
+
+    def report(self):
+        '''
+        Return the report of the run as a dict.
+        '''
+        return {"started": self.start_time,
+                "total_wall": sum(stage["wall"] for stage in
+                                  self.stages.values()),
+                "peak_rss_mb": peak_rss_mb(),
+                "stages": self.stages,
+                "metrics": self.metrics}
+
+    def write(self, filename):
+        '''
+        Write the report of the run to a .json file.
+        '''
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+class NullStage(object):
+    '''
+    Context manager that does nothing, returned by NullProfiler.stage.
+    '''
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullProfiler(object):
+    '''
+    Profiler that records nothing, used when profiling is disabled.
+    '''
+
+    enabled = False
+    _stage = NullStage()
+
+    def stage(self, name, tweets=None, tokens=None):
+        return self._stage
+
+    def record(self, **metrics):
+        pass
+
+    def report(self):
+        return {}
+
+    def write(self, filename):
+        pass
+
+
+def get_profiler(enabled, sample_stage=None, sample_file="profile_stacks.txt"):
+    '''
+    Return a Profiler if profiling is enabled, and a NullProfiler otherwise.
+    '''
+    if enabled:
+        return Profiler(sample_stage, sample_file)
+    return NullProfiler()
+
+
+def co_matrix_entries(com):
+    '''
+    Return the number of entries of a co-occurrence matrix.
+    '''
+    if hasattr(com, "nnz"):
+        return com.nnz
+    return sum(len(row) for row in com.values())
@@ -0,0 +1,346 @@
+'''
+This Python script contains a local stand-in for the Twitter streaming API,
+which replays recorded .json files (such as the ones saved by collect_data.py)
+over HTTP, so that the collection of Tweets can be tested and measured without
+access to Twitter. As with the streaming API, every connection receives one
+Tweet per line in a chunked HTTP response that stays open, and the server can:
+    send the Tweets at a fixed rate, with periodic bursts at a higher rate
+    send blank keep-alive lines when there is nothing to send
+    drop a connection in the middle of a Tweet every few Tweets
+The stream is live: the Tweets that become due while no client is connected
+are missed, as they would be with the real API. To start a replay server from
+the terminal, enter the following command:
+
+python replay_server.py -i data/stream_QUERY.json --rate 1000 --port 8080
+
+and connect to http://localhost:8080/1.1/statuses/filter.json?track=QUERY.
+If no file is given, a synthetic stream is replayed (see synthetic_stream.py).
+'''
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+from synthetic_stream import SyntheticStream
+
+
+def read_lines(filenames):
+    '''
+    Read the non-blank lines of .json files, each ending with "\\r\\n", as
+    the streaming API sends them.
+    '''
+    lines = []
+    for filename in filenames:
+        with open(filename, 'rb') as f:
+            for line in f:
+                line = line.rstrip(b"\r\n")
+                if line:
+                    lines.append(line + b"\r\n")
+    return lines
+
+
+class ReplayStream(object):
+    '''
+    The schedule of a replayed stream: which line is due at what time.
+
+    **Parameters**
+
+        lines: *list, bytes*
+            The lines to replay, each ending with a newline.
+        rate: *float*
+            The number of lines per second.
+        burst_every: *float, optional*
+            The time between the starts of two bursts, in seconds.
+        burst_seconds: *float*
+            The duration of a burst, in seconds.
+        burst_factor: *float*
+            The rate during a burst, as a multiple of the normal rate.
+        loop: *boolean*
+            Whether to start again from the first line after the last one.
+    '''
+
+    def __init__(self, lines, rate=1000.0, burst_every=None, burst_seconds=1.0,
+                 burst_factor=10.0, loop=True):
+        self.lines = lines
+        self.rate = rate
+        self.burst_every = burst_every
+        self.burst_seconds = burst_seconds
+        self.burst_factor = burst_factor
+        self.loop = loop
+        self.start_time = time.time()
+
+    def due(self, now=None):
+        '''
+        Return the number of lines that are due at a given time.
+        '''
+        elapsed = (now or time.time()) - self.start_time
+        due = self.rate * elapsed
+        if self.burst_every:
+            # Every period starts with a burst
+            periods, remainder = divmod(elapsed, self.burst_every)
+            burst_time = periods * min(self.burst_seconds, self.burst_every) + \
+                min(remainder, self.burst_seconds)
+            due += self.rate * (self.burst_factor - 1) * burst_time
+        due = int(due)
+        if not self.loop:
+            due = min(due, len(self.lines))
+        return due
+
+    def finished(self, position):
+        return not self.loop and position >= len(self.lines)
+
+    def line(self, index):
+        return self.lines[index % len(self.lines)]
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    '''
+    Handler of the connections to the replay server, which streams the due
+    lines to the client in a chunked response.
+    '''
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        track = [word.lower().encode("utf-8") for value in query.get("track", [])
+                 for word in value.split(",") if word]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        stream = server.stream
+        # The client only receives the lines that are due after it connects
+        position = stream.due()
+        sent = 0
+        last_send = time.time()
+        server.connected(1)
+        try:
+            while not server.stopping.is_set():
+                due = min(stream.due(), position + server.batch_size)
+                if due > position:
+                    lines = [stream.line(i) for i in range(position, due)]
+                    if track:
+                        lines = [line for line in lines
+                                 if any(word in line.lower() for word in track)]
+                    position = due
+                    if server.disconnect_every and \
+                            sent + len(lines) >= server.disconnect_every:
+                        # Send the lines up to the limit and half of the next
+                        # one, and drop the connection
+                        keep = server.disconnect_every - sent
+                        partial = lines[keep][:len(lines[keep]) // 2] \
+                            if keep < len(lines) else b""
+                        self._chunk(b"".join(lines[:keep]) + partial)
+                        server.count(keep + (1 if partial else 0),
+                                     partial=1 if partial else 0)
+                        server.disconnects += 1
+                        self.close_connection = True
+                        return
+                    if lines:
+                        self._chunk(b"".join(lines))
+                        server.count(len(lines))
+                        sent += len(lines)
+                        last_send = time.time()
+                    continue
+                if stream.finished(position):
+                    break
+                if time.time() - last_send >= server.keepalive:
+                    self._chunk(b"\r\n")
+                    last_send = time.time()
+                time.sleep(server.poll_interval)
+            # End the chunked response
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.close_connection = True
+            server.connected(-1)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    '''
+    HTTP server that replays a stream of Tweets.
+
+    **Parameters**
+
+        address: *tuple*
+            The host and port to listen on. Port 0 picks a free port.
+        stream: *ReplayStream*
+            The stream to replay.
+        keepalive: *float*
+            The time without data after which a blank line is sent, in
+            seconds.
+        disconnect_every: *int, optional*
+            The number of lines after which a connection is dropped in the
+            middle of the next line.
+        poll_interval: *float*
+            The time between two checks for due lines, in seconds.
+        batch_size: *int*
+            The maximum number of lines sent in one chunk.
+        verbose: *boolean*
+            Whether to log every request.
+
+    **Attributes**
+
+        sent: *int*
+            The number of lines sent, including the partial ones.
+        partial: *int*
+            The number of lines that were cut by a dropped connection.
+        connections: *int*
+            The number of connections made.
+        disconnects: *int*
+            The number of connections that were dropped on purpose.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, address, stream, keepalive=5.0, disconnect_every=None,
+                 poll_interval=0.001, batch_size=1000, verbose=False):
+        ThreadingHTTPServer.__init__(self, address, ReplayHandler)
+        self.stream = stream
+        self.keepalive = keepalive
+        self.disconnect_every = disconnect_every
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.stopping = threading.Event()
+        self.sent = 0
+        self.partial = 0
+        self.connections = 0
+        self.disconnects = 0
+        self.active = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return "http://%s:%d/1.1/statuses/filter.json" % (host, port)
+
+    def count(self, lines, partial=0):
+        with self._lock:
+            self.sent += lines
+            self.partial += partial
+
+    def connected(self, change):
+        with self._lock:
+            self.active += change
+            if change > 0:
+                self.connections += 1
+
+    def start(self):
+        '''
+        Serve in a background thread.
+        '''
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        '''
+        End the open streams and stop the server.
+        '''
+        self.stopping.set()
+        end = time.time() + timeout
+        while self.active and time.time() < end:
+            time.sleep(0.01)
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        '''
+        Return the statistics of the server as a dict.
+        '''
+        return {"sent": self.sent, "partial": self.partial,
+                "connections": self.connections,
+                "disconnects": self.disconnects,
+                "due": self.stream.due()}
+
+
+def add_stream_arguments(parser):
+    '''
+    Add the arguments of a replayed stream to a parser.
+    '''
+    parser.add_argument("-i", "--input", dest="inputs", nargs="+",
+                        help="The .json files to replay")
+    parser.add_argument("-n", dest="n", type=int, default=10000,
+                        help="The number of synthetic lines if no file is given")
+    parser.add_argument("--rate", dest="rate", type=float, default=1000.0,
+                        help="The number of Tweets per second")
+    parser.add_argument("--burst-every", dest="burst_every", type=float,
+                        help="The time between bursts, in seconds")
+    parser.add_argument("--burst-seconds", dest="burst_seconds", type=float,
+                        default=1.0, help="The duration of a burst, in seconds")
+    parser.add_argument("--burst-factor", dest="burst_factor", type=float,
+                        default=10.0,
+                        help="The rate during a burst, as a multiple of the rate")
+    parser.add_argument("--keepalive", dest="keepalive", type=float,
+                        default=5.0,
+                        help="The time without data after which a blank line is sent")
+    parser.add_argument("--disconnect-every", dest="disconnect_every",
+                        type=int,
+                        help="Drop the connection after this many Tweets")
+    parser.add_argument("--no-loop", dest="loop", action="store_false",
+                        help="End the stream after the last line")
+    return parser
+
+
+def build_server(args, host="localhost", port=0, verbose=False):
+    '''
+    Build a replay server from the arguments of add_stream_arguments.
+    '''
+    if args.inputs:
+        lines = read_lines(args.inputs)
+    else:
+        lines = [line.encode("utf-8") for line in
+                 SyntheticStream().lines(args.n)]
+    stream = ReplayStream(lines, args.rate, args.burst_every,
+                          args.burst_seconds, args.burst_factor, args.loop)
+    return ReplayServer((host, port), stream, args.keepalive,
+                        args.disconnect_every, verbose=verbose)
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Replay a stream of Tweets")
+    add_stream_arguments(parser)
+    parser.add_argument("--host", dest="host", default="localhost",
+                        help="The host to listen on")
+    parser.add_argument("-p", "--port", dest="port", type=int, default=8080,
+                        help="The port to listen on")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    server = build_server(args, args.host, args.port, verbose=True)
+    print("Replaying %d lines on %s" % (len(server.stream.lines), server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stopping.set()
+        server.server_close()
+        print(server.stats())
+
+
+if __name__ == '__main__':
+    main()
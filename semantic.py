@@ -0,0 +1,178 @@
+'''
+This Python script contains a vectorized version of the sentiment analysis in
+analysis.py, which uses Semantic Orientation (SO) and Pointwise Mutual
+Information (PMI) as the relevant metrics. For two terms t1 and t2,
+
+    PMI(t1, t2) = log2(P(t1, t2) / (P(t1) * P(t2)))
+    SO(t) = sum of PMI(t, tx) over positive tx - sum of PMI(t, tx) over
+            negative tx
+
+Since the PMI of two terms that never appear together does not contribute to
+the SO of a term, the PMI is only computed for the non-zero entries of the
+co-occurrence matrix. The lexicons are turned into one weight per term (+1
+for every listing in the positive lexicon, -1 for every listing in the
+negative lexicon), so that the SO of all of the terms is a single weighted sum
+over the entries of the matrix, computed with np.bincount.
+'''
+from collections import Counter
+import numpy as np
+from cooccurrence import Vocabulary
+
+
+def co_matrix_arrays(com, vocabulary):
+    '''
+    Return the (rows, cols, counts) arrays of a co-occurrence matrix, with the
+    IDs of the terms in the given vocabulary.
+
+    **Parameters**
+
+        com: *cooccurrence.SparseCoMatrix or dict*
+            The co-occurrence matrix, either sparse or as the dict of dicts
+            returned by analysis.generate_co_matrix.
+        vocabulary: *cooccurrence.Vocabulary*
+            The vocabulary that the returned IDs refer to. Terms of the matrix
+            that are not in the vocabulary are added to it.
+    '''
+    if hasattr(com, "coo"):
+        rows, cols, counts = com.coo()
+        # Map the IDs of the matrix onto the IDs of the vocabulary
+        mapping = np.array(vocabulary.encode(com.vocabulary.terms),
+                           dtype=np.int64)
+        return mapping[rows], mapping[cols], counts.astype(np.float64)
+    rows = []
+    cols = []
+    counts = []
+    intern = vocabulary.intern
+    for t1 in com:
+        row = com[t1]
+        if not row:
+            continue
+        t1_id = intern(t1)
+        rows.extend([t1_id] * len(row))
+        cols.extend(intern(t2) for t2 in row)
+        counts.extend(row.values())
+    return (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64),
+            np.array(counts, dtype=np.float64))
+
+
+def lexicon_weights(vocabulary, positive_vocab, negative_vocab):
+    '''
+    Return the lexicon weight of every term of the vocabulary: the number of
+    times it is listed in the positive lexicon minus the number of times it is
+    listed in the negative lexicon.
+    '''
+    weights = np.zeros(len(vocabulary), dtype=np.float64)
+    for lexicon, sign in ((positive_vocab, 1.0), (negative_vocab, -1.0)):
+        for term, n in Counter(lexicon).items():
+            term_id = vocabulary.get(term)
+            if term_id is not None:
+                weights[term_id] += sign * n
+    return weights
+
+
+def semantic_orientations(term_counts, com, positive_vocab, negative_vocab,
+                          ntweets, symmetric=False):
+    '''
+    Calculate the semantic orientation of every term.
+
+    **Parameters**
+
+        term_counts: *collections.Counter*
+            The number of times each term appears.
+        com: *cooccurrence.SparseCoMatrix or dict*
+            The co-occurrence matrix.
+        positive_vocab: *list, str*
+            The lexicon of words that have a positive connotation.
+        negative_vocab: *list, str*
+            The lexicon of words that have a negative connotation.
+        ntweets: *int*
+            The number of Tweets.
+        symmetric: *boolean*
+            If True, both halves of the symmetric co-occurrence matrix are
+            used, so that the PMI of t1 and t2 counts towards the SO of both
+            terms. If False, only the triangular half stored in the matrix is
+            used (a term is only associated with the terms that come after it
+            in alphabetical order), as in analysis.sentiment_analysis.
+
+    **Returns**
+
+        terms: *list, str*
+            The terms, in the order of term_counts.
+        orientations: *numpy.ndarray*
+            The semantic orientation of each term.
+    '''
+    vocabulary = Vocabulary(term_counts)
+    nterms = len(vocabulary)
+    rows, cols, counts = co_matrix_arrays(com, vocabulary)
+    if len(vocabulary) > nterms and len(rows):
+        # Every term of the matrix must have a count, as in
+        # analysis.sentiment_analysis
+        missing = vocabulary.terms[nterms]
+        raise KeyError(missing)
+    # Calculate the probability of observing each term and of observing each
+    # pair of terms together in the same Tweet
+    pt = np.array(list(term_counts.values()), dtype=np.float64) / ntweets
+    ptcom = counts / ntweets
+    # Calculate the PMI of the non-zero entries of the matrix only
+    pmi = np.log2(ptcom / (pt[rows] * pt[cols]))
+    weights = lexicon_weights(vocabulary, positive_vocab, negative_vocab)
+    orientations = np.bincount(rows, weights=pmi * weights[cols],
+                               minlength=nterms)
+    if symmetric:
+        orientations += np.bincount(cols, weights=pmi * weights[rows],
+                                    minlength=nterms)
+    return vocabulary.terms, orientations
+
+
+def sentiment_analysis(term_list, term_counts, com, positive_vocab,
+                       negative_vocab, num, ntweets=None, symmetric=False):
+    '''
+    Perform sentiment analysis for a given data set of Tweets. The parameters
+    and outputs are the same as those of analysis.sentiment_analysis, which
+    this function reproduces (up to floating-point rounding) when symmetric
+    is False.
+
+    **Parameters**
+
+        term_list: *list, str*
+            A list with all of the individual terms that appear in the .json
+            file. It is only used to count the Tweets if ntweets is None.
+        term_counts: *collections.Counter*
+            The number of times each term appears.
+        com: *cooccurrence.SparseCoMatrix or dict*
+            The co-occurrence matrix.
+        positive_vocab: *list, str*
+            The lexicon of words that have a positive connotation.
+        negative_vocab: *list, str*
+            The lexicon of words that have a negative connotation.
+        num: *int*
+            The number of words to be returned in the top_pos and top_neg
+            lists.
+        ntweets: *int, optional*
+            The number of Tweets.
+        symmetric: *boolean*
+            Whether both halves of the co-occurrence matrix are used (see
+            semantic_orientations).
+
+    **Returns**
+
+        semantic_sorted: *list, tuple*
+            The sorted list of semantic orientations for all of the terms in
+            the term list.
+        top_pos: *list, tuple*
+            The terms with the highest semantic orienations.
+        top_neg: *list, tuple*
+            The terms with the lowest semantic orientations.
+    '''
+    if ntweets is None:
+        ntweets = len(term_list)
+    terms, orientations = semantic_orientations(
+        term_counts, com, positive_vocab, negative_vocab, ntweets, symmetric)
+    # Sort in descending order, keeping the order of term_counts for ties
+    order = np.argsort(-orientations, kind="stable")
+    values = orientations[order].tolist()
+    semantic_sorted = [(terms[i], value)
+                       for i, value in zip(order.tolist(), values)]
+    top_pos = semantic_sorted[:num]
+    top_neg = semantic_sorted[-num:]
+    return semantic_sorted, top_pos, top_neg
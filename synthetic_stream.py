@@ -0,0 +1,216 @@
+'''
+This Python script generates synthetic streams of Tweets, in the same format
+as the .json files saved by collect_data.py, for benchmarking and testing
+without access to Twitter. The streams are deterministic for a given seed and
+have realistic distributions:
+    words, hashtags and mentions are drawn from Zipf distributions, so that a
+    few terms are very common and most terms are rare
+    a fraction of the Tweets are retweets ("RT @user: ...") of recent Tweets
+    a fraction of the lines are delete notices, which are not Tweets
+    every Tweet has nested user and entities objects and a created_at time
+To generate a stream from the terminal, enter the following command:
+
+python synthetic_stream.py -n 100000 -o data/stream_synthetic.json
+'''
+import argparse
+import json
+import os
+import random
+import time
+from collections import deque
+from itertools import accumulate
+
+# Common English words, which appear much more often than other words
+COMMON_WORDS = [
+    "the", "to", "and", "a", "of", "in", "is", "for", "that", "on", "you",
+    "it", "this", "be", "are", "with", "not", "have", "we", "he", "his",
+    "they", "will", "but", "just", "was", "at", "all", "so", "what", "about",
+    "who", "i", "my", "me", "he's", "can't", "if", "like", "from", "more"]
+LEXICONS = [os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "term_database", name)
+            for name in ("positive_words.txt", "negative_words.txt")]
+EMOTICONS = [":)", ":(", ":D", ";)", ":-)", ":P", "=)", ":/"]
+SYLLABLES = ["ba", "ko", "ri", "men", "sa", "tor", "vel", "ni", "qua", "dro",
+             "pe", "lu", "zan", "ti", "mo", "rek", "sho", "fi", "gal", "dun"]
+
+
+def read_words(filename):
+    '''
+    Read the words of a lexicon, one word per line.
+    '''
+    with open(filename, encoding="ISO-8859-1") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def zipf_weights(n, exponent):
+    '''
+    Return the cumulative weights of a Zipf distribution over n ranks.
+    '''
+    return list(accumulate(1.0 / (rank ** exponent)
+                           for rank in range(1, n + 1)))
+
+
+class SyntheticStream(object):
+    '''
+    Generator of synthetic Tweets.
+
+    **Parameters**
+
+        seed: *int*
+            The seed of the random number generator.
+        vocab_size: *int*
+            The number of distinct words, not counting common words.
+        retweet_rate: *float*
+            The fraction of Tweets that are retweets.
+        delete_rate: *float*
+            The fraction of lines that are delete notices.
+        start_time: *int*
+            The Unix time of the first Tweet.
+        tweets_per_second: *float*
+            The average rate of Tweets, which sets their created_at times.
+        lexicons: *list, str*
+            Lexicon files whose words are mixed into the vocabulary, so that
+            the sentiment analysis has positive and negative words to find.
+    '''
+
+    def __init__(self, seed=0, vocab_size=50000, retweet_rate=0.3,
+                 delete_rate=0.02, start_time=1574096172,
+                 tweets_per_second=50.0, lexicons=LEXICONS):
+        self.rng = random.Random(seed)
+        self.retweet_rate = retweet_rate
+        self.delete_rate = delete_rate
+        self.time = float(start_time)
+        self.tweets_per_second = tweets_per_second
+        self.next_id = 1196477217557098498
+        words = set()
+        for filename in lexicons:
+            try:
+                words.update(read_words(filename))
+            except OSError:
+                pass
+        while len(words) < vocab_size:
+            words.add("".join(self.rng.choice(SYLLABLES) for _ in
+                              range(self.rng.randint(2, 5))))
+        words = sorted(words)
+        self.rng.shuffle(words)
+        self.words = words[:vocab_size]
+        self.word_weights = zipf_weights(len(self.words), 1.1)
+        self.hashtags = ["#" + w for w in self.words[:2000]]
+        self.hashtag_weights = zipf_weights(len(self.hashtags), 1.3)
+        self.users = ["user%d" % i for i in range(20000)]
+        self.user_weights = zipf_weights(len(self.users), 1.2)
+        # Recent Tweets that can be retweeted
+        self.recent = deque(maxlen=1000)
+
+    def text(self):
+        '''
+        Generate the text of an original Tweet.
+        '''
+        rng = self.rng
+        nwords = rng.randint(3, 25)
+        tokens = []
+        for word in rng.choices(self.words, cum_weights=self.word_weights,
+                                k=nwords):
+            tokens.append(rng.choice(COMMON_WORDS) if rng.random() < 0.4
+                          else word)
+        if rng.random() < 0.4:
+            tokens.extend(rng.choices(self.hashtags,
+                                      cum_weights=self.hashtag_weights,
+                                      k=rng.randint(1, 3)))
+        if rng.random() < 0.3:
+            tokens.insert(0, "@" + rng.choices(
+                self.users, cum_weights=self.user_weights)[0])
+        if rng.random() < 0.1:
+            tokens.append(rng.choice(EMOTICONS))
+        if rng.random() < 0.3:
+            tokens.append("https://t.co/%010x" % rng.getrandbits(40))
+        if rng.random() < 0.1:
+            tokens[0] = tokens[0].capitalize()
+        return " ".join(tokens)
+
+    def tweet(self):
+        '''
+        Generate a Tweet as a dict.
+        '''
+        rng = self.rng
+        self.time += rng.expovariate(self.tweets_per_second)
+        self.next_id += rng.randint(1, 1000)
+        screen_name = rng.choices(self.users, cum_weights=self.user_weights)[0]
+        retweeted = None
+        if self.recent and rng.random() < self.retweet_rate:
+            retweeted = rng.choice(self.recent)
+            text = "RT @%s: %s" % (retweeted["user"]["screen_name"],
+                                   retweeted["text"])
+            if len(text) > 140:
+                text = text[:139] + "…"
+        else:
+            text = self.text()
+        tweet = {
+            "created_at": time.strftime("%a %b %d %H:%M:%S +0000 %Y",
+                                        time.gmtime(self.time)),
+            "id": self.next_id,
+            "id_str": str(self.next_id),
+            "text": text,
+            "truncated": False,
+            "user": {"id": rng.getrandbits(32), "screen_name": screen_name,
+                     "name": screen_name.capitalize(),
+                     "followers_count": rng.randint(0, 100000),
+                     "description": "Synthetic account"},
+            "retweet_count": 0,
+            "favorite_count": rng.randint(0, 10),
+            "entities": {"hashtags": [], "urls": [], "user_mentions": []},
+            "lang": "en"}
+        if retweeted is not None:
+            tweet["retweeted_status"] = retweeted
+        else:
+            self.recent.append({"created_at": tweet["created_at"],
+                                "id": tweet["id"], "text": text,
+                                "user": tweet["user"]})
+        return tweet
+
+    def lines(self, n):
+        '''
+        Generator that yields n lines of the stream, including delete
+        notices, each ending with a newline.
+        '''
+        for _ in range(n):
+            if self.rng.random() < self.delete_rate:
+                status = self.rng.getrandbits(60)
+                yield json.dumps({"delete": {"status": {
+                    "id": status, "id_str": str(status)}}}) + "\r\n"
+            else:
+                yield json.dumps(self.tweet()) + "\r\n"
+
+
+def generate_stream(filename, n, seed=0, **kwargs):
+    '''
+    Write a synthetic stream of n lines to a file.
+    '''
+    stream = SyntheticStream(seed, **kwargs)
+    with open(filename, 'w', encoding="utf-8", newline="") as f:
+        for line in stream.lines(n):
+            f.write(line)
+    return filename
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Generate synthetic Tweets")
+    parser.add_argument("-n", dest="n", type=int, default=10000,
+                        help="The number of lines to generate")
+    parser.add_argument("-o", "--output", dest="output", required=True,
+                        help="The name of the .json file to write")
+    parser.add_argument("-s", "--seed", dest="seed", type=int, default=0,
+                        help="The seed of the random number generator")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    generate_stream(args.output, args.n, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+'''
+This Python script contains a compact container for the filtered terms of a
+data set. The term list returned by analysis.generate_term_list is a list of
+lists of strings, in which every token of every Tweet is a separate Python
+object. A TermCorpus stores the same data in three parts instead:
+    a vocabulary - every distinct term once, with an integer ID
+    a token array - the term IDs of all of the Tweets, one after the other,
+                    4 bytes per token (array('I'))
+    an offsets array - the start of the terms of each Tweet in the token
+                       array, followed by the length of the token array
+
+so that a Tweet costs 8 bytes plus 4 bytes per token, instead of a list
+object plus a string object per token. Iterating over a TermCorpus yields the
+terms of each Tweet as a list of strings, so it can be used in place of a term
+list with every analysis function, and the functions that count terms or
+search for a keyword work on the token array directly.
+
+The terms of every Tweet without repetitions are computed once by unique(),
+so the single_* view of a data set does not require reading and tokenizing
+the data again: the unique() corpus of the default filter is the corpus of
+single_terms, and the one of remove_stop_words is that of single_stop_words.
+'''
+from array import array
+from collections import Counter
+import numpy as np
+from analysis import TermStream
+from cooccurrence import SparseCoMatrix
+from cooccurrence import Vocabulary
+
+
+class TermCorpus(object):
+    '''
+    The filtered terms of each Tweet of a data set.
+
+    **Parameters**
+
+        vocabulary: *cooccurrence.Vocabulary, optional*
+            The vocabulary of the term IDs.
+        tokens: *array or memoryview, optional*
+            The term IDs of all of the Tweets.
+        offsets: *array or memoryview, optional*
+            The start of the terms of each Tweet in tokens, followed by the
+            length of tokens.
+        count: *int*
+            The number of lines that were read to build the corpus.
+
+    **Attributes**
+
+        terms: *list, str*
+            The vocabulary, indexed by term ID.
+    '''
+
+    def __init__(self, vocabulary=None, tokens=None, offsets=None, count=0):
+        self._vocabulary = vocabulary if vocabulary is not None \
+            else Vocabulary()
+        self.terms = self._vocabulary.terms
+        self.tokens = tokens if tokens is not None else array('I')
+        self.offsets = offsets if offsets is not None else array('Q', [0])
+        self.count = count
+        self._unique = None
+
+    @classmethod
+    def from_file(cls, filename, term_filter, start=0, end=None):
+        '''
+        Build the corpus of a .json file.
+        '''
+        corpus = cls()
+        corpus.extend(TermStream(filename, term_filter, start, end))
+        return corpus
+
+    @property
+    def vocabulary(self):
+        if self._vocabulary is None:
+            self._vocabulary = Vocabulary(self.terms)
+        return self._vocabulary
+
+    def append(self, terms):
+        '''
+        Add the terms of a Tweet. A corpus cannot grow while views returned
+        by ids are still held.
+        '''
+        self.tokens.extend(self.vocabulary.encode(terms))
+        self.offsets.append(len(self.tokens))
+        self._unique = None
+
+    def extend(self, term_stream):
+        '''
+        Add the terms of every Tweet of a stream, such as a TermStream.
+
+        **Returns**
+
+            count: *int*
+                The number of lines read, if the stream counts them.
+        '''
+        encode = self.vocabulary.encode
+        tokens = self.tokens
+        offsets = self.offsets
+        for tweet in term_stream:
+            tokens.extend(encode(tweet))
+            offsets.append(len(tokens))
+        self._unique = None
+        count = getattr(term_stream, "count", 0)
+        self.count += count
+        return count
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def ids(self, tweet_id):
+        '''
+        Return the term IDs of a Tweet as a memoryview, without copying them.
+        '''
+        return memoryview(self.tokens)[self.offsets[tweet_id]:
+                                       self.offsets[tweet_id + 1]]
+
+    def __getitem__(self, tweet_id):
+        terms = self.terms
+        return [terms[i] for i in
+                self.tokens[self.offsets[tweet_id]:self.offsets[tweet_id + 1]]]
+
+    def __iter__(self):
+        terms = self.terms
+        tokens = self.tokens
+        offsets = self.offsets
+        for i in range(len(offsets) - 1):
+            yield [terms[j] for j in tokens[offsets[i]:offsets[i + 1]]]
+
+    def id_arrays(self):
+        '''
+        Return the token and offsets arrays as NumPy arrays, without copying
+        them.
+        '''
+        return (np.frombuffer(self.tokens, dtype=np.uint32),
+                np.frombuffer(self.offsets, dtype=np.uint64).astype(np.int64))
+
+    def nbytes(self):
+        '''
+        Return the size of the token and offsets arrays, in bytes.
+        '''
+        return len(self.tokens) * 4 + len(self.offsets) * 8
+
+    def term_counts(self):
+        '''
+        Count the terms directly from the token array. The result is the same
+        Counter (with the same order of terms) as that of
+        analysis.calculate_term_frequencies.
+        '''
+        terms = self.terms
+        counts = Counter(self.tokens)
+        return Counter({terms[i]: n for i, n in counts.items()})
+
+    def tweets_containing(self, term):
+        '''
+        Return the IDs of the Tweets that contain a term, in order.
+        '''
+        term_id = self.vocabulary.get(term)
+        if term_id is None or not len(self.tokens):
+            return []
+        tokens, offsets = self.id_arrays()
+        positions = np.flatnonzero(tokens == term_id)
+        tweet_ids = np.searchsorted(offsets, positions, side="right") - 1
+        return np.unique(tweet_ids).tolist()
+
+    def keyword_counts(self, keyword):
+        '''
+        Count the terms of the Tweets that contain a keyword. The result is
+        the same Counter as the one built by
+        analysis.search_word_co_occurrences.
+        '''
+        count_search = Counter()
+        terms = self.terms
+        tokens = self.tokens
+        offsets = self.offsets
+        for i in self.tweets_containing(keyword):
+            count_search.update([terms[j] for j in
+                                 tokens[offsets[i]:offsets[i + 1]]])
+        return count_search
+
+    def co_matrix(self, batch_size=1000000, mode=None):
+        '''
+        Build the sparse co-occurrence matrix directly from the token array,
+        with the given mode (see co_occurrence_modes.py).
+        '''
+        com = SparseCoMatrix(Vocabulary(self.terms), batch_size, mode)
+        tokens = self.tokens
+        offsets = self.offsets
+        for i in range(len(offsets) - 1):
+            com.add_ids(tokens[offsets[i]:offsets[i + 1]].tolist())
+        return com
+
+    def unique(self):
+        '''
+        Return the corpus with each term only counted once per Tweet, as with
+        the single_* term filters, sharing the vocabulary of this corpus. It
+        is computed once and kept until the corpus changes.
+        '''
+        if self._unique is None:
+            tokens = array('I')
+            offsets = array('Q', [0])
+            source = self.tokens
+            source_offsets = self.offsets
+            for i in range(len(source_offsets) - 1):
+                # Keep the first occurrence of each term in the Tweet
+                tokens.extend(dict.fromkeys(
+                    source[source_offsets[i]:source_offsets[i + 1]]))
+                offsets.append(len(tokens))
+            unique = TermCorpus(tokens=tokens, offsets=offsets,
+                                count=self.count)
+            unique._vocabulary = self._vocabulary
+            unique.terms = self.terms
+            self._unique = unique
+        return self._unique
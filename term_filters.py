@@ -0,0 +1,126 @@
+'''
+This Python script contains the term filters that are applied to the tokens of
+each Tweet before they are analyzed. A filter is resolved once into a
+TermFilter object, so that the choice of filter and the list of stop-words are
+not looked up again for every line of a .json file. The available filters are:
+    default - considers all of the terms
+    remove_stop_words - does not consider stop-words
+    hashtags - only considers hashtags and no other terms
+    terms_only - does not consider hashtags or mentions
+    single_terms - only counts terms once in a Tweet
+    single_stop_words - only counts terms once and does not consider
+                        stop-words
+'''
+from lexicons import stop_words
+
+
+def default_stop_words():
+    '''
+    Define the set of stop-words, which are common words that do not carry
+    significance (conjunctions, adverbs, etc.), along with punctuation and
+    single digits. The set is loaded from the snapshot of lexicons.py, so
+    NLTK is not imported unless the snapshot is out of date, and it is only
+    loaded once per process.
+    '''
+    return stop_words()
+
+
+class TermFilter(object):
+    '''
+    A term filter that can be applied to the list of tokens of a Tweet.
+
+    **Parameters**
+
+        name: *str*
+            The name of the filter.
+        stop_words: *frozenset, str, optional*
+            The stop-words to be removed. If None, stop-words are kept.
+        include: *tuple, str, optional*
+            If given, only terms starting with one of these prefixes are kept.
+        exclude: *tuple, str, optional*
+            If given, terms starting with one of these prefixes are removed.
+        single: *boolean*
+            Whether a term should only be counted once in a Tweet.
+    '''
+
+    def __init__(self, name, stop_words=None, include=None, exclude=None,
+                 single=False):
+        self.name = name
+        self.stop_words = frozenset(stop_words) if stop_words else None
+        self.include = tuple(include) if include else None
+        self.exclude = tuple(exclude) if exclude else None
+        self.single = single
+
+    def __repr__(self):
+        return "TermFilter(%r)" % self.name
+
+    def keep(self, term):
+        '''
+        Check whether a single term passes the filter.
+        '''
+        if self.stop_words is not None and term in self.stop_words:
+            return False
+        if self.include is not None and not term.startswith(self.include):
+            return False
+        if self.exclude is not None and term.startswith(self.exclude):
+            return False
+        return True
+
+    def __call__(self, tokens):
+        '''
+        Apply the filter to the list of tokens of a Tweet and return the list
+        of terms that are kept.
+        '''
+        stop = self.stop_words
+        include = self.include
+        exclude = self.exclude
+        if stop is not None and exclude is not None:
+            terms = [term for term in tokens
+                     if term not in stop and not term.startswith(exclude)]
+        elif stop is not None:
+            terms = [term for term in tokens if term not in stop]
+        elif include is not None:
+            terms = [term for term in tokens if term.startswith(include)]
+        else:
+            terms = [term for term in tokens if self.keep(term)]
+        if self.single:
+            # Keep the first occurrence of each term in the Tweet
+            terms = list(dict.fromkeys(terms))
+        return terms
+
+
+def build_filter(term_filter):
+    '''
+    Build the TermFilter object for one of the named filters.
+    '''
+    if term_filter == "default" or term_filter is None:
+        return TermFilter("default")
+    elif term_filter == "remove_stop_words":
+        return TermFilter(term_filter, stop_words=default_stop_words())
+    elif term_filter == "hashtags":
+        return TermFilter(term_filter, include=('#',))
+    elif term_filter == "terms_only":
+        return TermFilter(term_filter, stop_words=default_stop_words(),
+                          exclude=('#', '@'))
+    elif term_filter == "single_terms":
+        return TermFilter(term_filter, single=True)
+    elif term_filter == "single_stop_words":
+        return TermFilter(term_filter, stop_words=default_stop_words(),
+                          single=True)
+    else:
+        raise Exception("Invalid filter type.")
+
+
+FILTER_NAMES = ("default", "remove_stop_words", "hashtags", "terms_only",
+                "single_terms", "single_stop_words")
+
+
+def resolve_filter(term_filter):
+    '''
+    Resolve a term filter given either by name or as a TermFilter object (or
+    any other callable that takes a list of tokens and returns a list of
+    terms), so that user-defined filters can be plugged in.
+    '''
+    if callable(term_filter):
+        return term_filter
+    return build_filter(term_filter)
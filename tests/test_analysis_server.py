@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+import analysis_server
+from analysis_server import AnalysisServer
+from analysis_server import AnalysisService
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in ("a.json", "b.json"):
+        with open(str(tmp_path / name), 'w') as f:
+            for text in ["good vote today", "bad debate", "vote vote good"]:
+                f.write(json.dumps({"text": text}) + "\n")
+    return tmp_path
+
+
+def test_corpus_is_loaded_once_outside_of_the_service_lock(data_dir,
+                                                            monkeypatch):
+    service = AnalysisService(str(data_dir))
+    loaded = []
+    original = analysis_server.ResidentCorpus
+
+    def slow_corpus(*args, **kwargs):
+        # The service lock must be free while a corpus loads
+        assert service._lock.acquire(timeout=1)
+        service._lock.release()
+        loaded.append(args[0])
+        time.sleep(0.2)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(analysis_server, "ResidentCorpus", slow_corpus)
+    path = service.resolve_file("a.json")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        service.corpus(path, "terms_only"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loaded == [path]
+    assert all(resident is results[0] for resident in results)
+    assert service.loads == 1
+    assert not service._loading
+
+
+def test_unexpected_errors_are_answered(data_dir, monkeypatch):
+    service = AnalysisService(str(data_dir))
+
+    def fail(*args):
+        raise ValueError("broken")
+
+    monkeypatch.setattr(service, "compute", fail)
+    server = AnalysisServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        url = "http://127.0.0.1:%d/frequencies?file=a.json" % \
+            server.server_address[1]
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url, timeout=5)
+        assert error.value.code == 500
+        assert "broken" in json.loads(error.value.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def test_negative_n_is_rejected(data_dir):
+    service = AnalysisService(str(data_dir))
+    with pytest.raises(analysis_server.QueryError):
+        service.query("frequencies", {"file": ["a.json"], "n": ["-1"]})
+    result = service.query("frequencies", {"file": ["a.json"], "n": ["0"]})
+    assert json.loads(result)["frequencies"] == []
@@ -0,0 +1,89 @@
+import csv
+import json
+import os
+import sys
+import pytest
+import batch_analysis
+from analysis import calculate_term_frequencies
+from analysis import define_lexicon
+from analysis import generate_co_matrix
+from analysis import generate_term_list
+from analysis import search_word_co_occurrences
+from cooccurrence import generate_sparse_co_matrix
+from semantic import sentiment_analysis
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data",
+                    "stream_sanders.json")
+KEYWORDS = ["sanders", "#bernie"]
+FILTERS = ["terms_only", "hashtags", "single_terms", "remove_stop_words"]
+
+
+@pytest.fixture(scope="module")
+def lexicons():
+    return (define_lexicon(os.path.join(batch_analysis.LEXICON_DIR,
+                                        "positive_words.txt")),
+            define_lexicon(os.path.join(batch_analysis.LEXICON_DIR,
+                                        "negative_words.txt")))
+
+
+def test_single_pass_matches_each_filter(lexicons):
+    positive_vocab, negative_vocab = lexicons
+    results, lines = batch_analysis.analyze(
+        [DATA], FILTERS, KEYWORDS, 10, positive_vocab, negative_vocab)
+    assert [result["filter"] for result in results] == FILTERS
+    for result in results:
+        term_list, count = generate_term_list(DATA, result["filter"])
+        assert lines == count
+        assert result["lines"] == count
+        assert result["tweets"] == len(term_list)
+        term_counts, frequencies = calculate_term_frequencies(term_list, 10)
+        assert result["frequencies"] == frequencies
+        assert result["co_occurrences"] == \
+            generate_sparse_co_matrix(term_list).top_pairs(10)
+        for keyword in KEYWORDS:
+            assert result["keywords"][keyword] == \
+                search_word_co_occurrences(keyword, term_list, 10)
+        so, top_pos, top_neg = sentiment_analysis(
+            term_list, term_counts, generate_co_matrix(term_list),
+            positive_vocab, negative_vocab, 10, len(term_list))
+        sentiment = result["sentiment"]
+        assert [term for term, _ in sentiment["top_positive"]] == \
+            [term for term, _ in top_pos]
+        assert [term for term, _ in sentiment["top_negative"]] == \
+            [term for term, _ in top_neg]
+        if so:
+            assert sentiment["average"] == pytest.approx(
+                sum(value for _, value in so) / len(so))
+
+
+def test_main_writes_json_and_csv(tmp_path, monkeypatch):
+    for fmt in ("json", "csv"):
+        output = str(tmp_path / ("results." + fmt))
+        monkeypatch.setattr(sys, "argv", [
+            "batch_analysis.py", "-i", DATA, DATA, "--combine",
+            "-f", "terms_only", "hashtags", "-k", "sanders", "-n", "5",
+            "--format", fmt, "-o", output])
+        batch_analysis.main()
+        with open(output) as f:
+            if fmt == "json":
+                results = json.load(f)["results"]
+                assert [result["filter"] for result in results] == \
+                    ["terms_only", "hashtags"]
+                term_list, count = generate_term_list(DATA, "terms_only")
+                assert results[0]["tweets"] == 2 * len(term_list)
+                assert results[0]["lines"] == 2 * count
+            else:
+                rows = list(csv.reader(f))
+                assert rows[0] == ["input", "filter", "section", "key",
+                                   "term", "term2", "value"]
+                sections = {row[2] for row in rows[1:]}
+                assert {"tweets", "frequency", "co_occurrence", "keyword",
+                        "average_orientation"} <= sections
+
+
+def test_missing_input(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", [
+        "batch_analysis.py", "-i", str(tmp_path / "missing.json")])
+    with pytest.raises(SystemExit) as error:
+        batch_analysis.main()
+    assert error.value.code == 2
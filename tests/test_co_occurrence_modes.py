@@ -0,0 +1,60 @@
+import pytest
+from analysis import generate_co_matrix
+from co_occurrence_modes import DEFAULT_WINDOW
+from co_occurrence_modes import FULL
+from co_occurrence_modes import CoOccurrenceMode
+from co_occurrence_modes import build_mode
+from co_occurrence_modes import resolve_mode
+from cooccurrence import generate_sparse_co_matrix
+from term_corpus import TermCorpus
+
+TWEET = ["a", "b", "a", "c", "d"]
+EXPECTED = {
+    "full": {("a", "b"): 2, ("a", "c"): 2, ("a", "d"): 2, ("b", "c"): 1,
+             ("b", "d"): 1, ("c", "d"): 1},
+    "window:2": {("a", "b"): 2, ("a", "c"): 1, ("c", "d"): 1},
+    "window:3": {("a", "b"): 2, ("a", "c"): 1, ("c", "d"): 1, ("b", "c"): 1,
+                 ("a", "d"): 1},
+    "dedup": {("a", "b"): 1, ("a", "c"): 1, ("a", "d"): 1, ("b", "c"): 1,
+              ("b", "d"): 1, ("c", "d"): 1},
+    "cap:3": {("a", "b"): 2},
+    "dedup+window:2": {("a", "b"): 1, ("b", "c"): 1, ("c", "d"): 1},
+    # The repetitions are removed before the terms are capped
+    "cap:3+dedup": {("a", "b"): 1, ("a", "c"): 1, ("b", "c"): 1}}
+
+
+def dict_pairs(com):
+    return {(t1, t2): count for t1, row in com.items()
+            for t2, count in row.items() if count}
+
+
+@pytest.mark.parametrize("mode", sorted(EXPECTED))
+def test_pairs_of_a_tweet(mode):
+    assert dict_pairs(generate_co_matrix([TWEET], mode)) == EXPECTED[mode]
+    assert dict_pairs(generate_sparse_co_matrix([TWEET], mode=mode)) == \
+        EXPECTED[mode]
+    corpus = TermCorpus()
+    corpus.append(TWEET)
+    assert dict_pairs(corpus.co_matrix(mode=mode)) == EXPECTED[mode]
+
+
+@pytest.mark.parametrize("window", [None, 2, 3, 5, 10])
+def test_npairs(window):
+    mode = CoOccurrenceMode(window=window)
+    for k in range(12):
+        pairs = sum(1 for i in range(k) for j in range(i + 1, k)
+                    if window is None or j - i < window)
+        assert mode.npairs(k) == pairs
+
+
+def test_build_and_resolve():
+    mode = build_mode("dedup+window")
+    assert mode.dedup and mode.window == DEFAULT_WINDOW
+    assert not mode.full
+    assert build_mode("full").full
+    assert resolve_mode(None) is FULL
+    assert resolve_mode(mode) is mode
+    assert resolve_mode("cap:7").max_tokens == 7
+    for invalid in ["all", "dedup:3", "window:1", "cap:-1", "window:x"]:
+        with pytest.raises(Exception):
+            build_mode(invalid)
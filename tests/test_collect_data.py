@@ -0,0 +1,26 @@
+import pytest
+from writers import StreamWriter
+
+pytest.importorskip("tweepy")
+from collect_data import MyListener  # noqa: E402
+
+
+def test_listener_writes_until_the_time_limit(tmp_path):
+    writer = StreamWriter(str(tmp_path / "stream_vote.json"), background=True)
+    listener = MyListener(str(tmp_path), "vote", 60, writer)
+    for i in range(10):
+        assert listener.on_data('{"text": "vote %d"}\n' % i)
+    listener.close()
+    assert listener.received == 10
+    assert listener.written == 10
+    assert listener.dropped == 0
+    with open(listener.outfile) as f:
+        assert len(f.read().splitlines()) == 10
+
+
+def test_listener_stops_after_the_time_limit(tmp_path):
+    listener = MyListener(str(tmp_path), "#vote now", 0)
+    assert listener.outfile.endswith("stream__vote_now.json")
+    assert listener.on_data('{"text": "late"}\n') is False
+    assert listener.closed
+    assert listener.received == 0
@@ -0,0 +1,83 @@
+import random
+import pytest
+from analysis import generate_co_matrix
+from analysis import sentiment_analysis
+from cooccurrence import SparseCoMatrix
+from cooccurrence import generate_sparse_co_matrix
+
+WORDS = ["vote", "debate", "sanders", "rally", "news", "iowa", "good", "bad",
+         "#bernie", "@user", "today"]
+
+
+def random_tweets(n, seed=0):
+    random_ = random.Random(seed)
+    return [[random_.choice(WORDS) for _ in range(random_.randint(0, 9))]
+            for _ in range(n)]
+
+
+def dict_pairs(com):
+    return {(t1, t2): count for t1, row in com.items()
+            for t2, count in row.items() if count}
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 100, 1000000])
+def test_matches_dict_matrix(batch_size):
+    tweets = random_tweets(500)
+    com = generate_co_matrix(tweets)
+    sparse = generate_sparse_co_matrix(tweets, batch_size=batch_size)
+    assert sparse.to_dict() == {t1: dict(row) for t1, row in com.items()
+                                if row}
+    # More Tweets after the matrix was built
+    more = random_tweets(50, seed=1)
+    for tweet in more:
+        sparse.add(tweet)
+    assert dict_pairs(sparse) == dict_pairs(generate_co_matrix(tweets + more))
+
+
+def test_get_and_neighbors():
+    tweets = random_tweets(300)
+    pairs = dict_pairs(generate_co_matrix(tweets))
+    sparse = generate_sparse_co_matrix(tweets, batch_size=10)
+    for t1 in WORDS + ["missing"]:
+        expected = {}
+        for t2 in WORDS + ["missing"]:
+            count = pairs.get(tuple(sorted([t1, t2])), 0)
+            assert sparse.get(t1, t2) == count
+            if count:
+                expected[t2] = count
+        cols, counts = sparse.neighbors(t1)
+        terms = sparse.vocabulary.terms
+        assert dict(zip([terms[i] for i in cols.tolist()],
+                        counts.tolist())) == expected
+        assert len(cols) == len(expected)
+
+
+def test_top_pairs_ties_are_ordered_by_term():
+    tweets = random_tweets(300)
+    pairs = dict_pairs(generate_co_matrix(tweets))
+    expected = sorted(pairs.items(), key=lambda item: (-item[1], item[0]))
+    sparse = generate_sparse_co_matrix(tweets, batch_size=10)
+    for n in (1, 5, 17, len(expected), len(expected) + 3):
+        assert sparse.top_pairs(n) == expected[:n]
+    assert SparseCoMatrix().top_pairs(3) == []
+
+
+def test_sentiment_analysis_with_sparse_matrix():
+    tweets = random_tweets(300)
+    term_counts = {}
+    for tweet in tweets:
+        for term in tweet:
+            term_counts[term] = term_counts.get(term, 0) + 1
+    positive = ["good", "rally"]
+    negative = ["bad"]
+    expected = sentiment_analysis(tweets, term_counts,
+                                  generate_co_matrix(tweets), positive,
+                                  negative, 3)
+    result = sentiment_analysis(tweets, term_counts,
+                                generate_sparse_co_matrix(tweets), positive,
+                                negative, 3)
+    for (term, so), (expected_term, expected_so) in zip(result[0] + result[1],
+                                                        expected[0] +
+                                                        expected[1]):
+        assert term == expected_term
+        assert so == pytest.approx(expected_so)
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+from corpus_cache import cache_path
+from corpus_cache import load_corpus
+from term_corpus import TermCorpus
+
+
+def write_stream(path, texts):
+    with open(path, 'w') as f:
+        for text in texts:
+            f.write(json.dumps({"text": text}) + "\n")
+
+
+def test_cache_matches_the_corpus(tmp_path):
+    path = str(tmp_path / "stream.json")
+    write_stream(path, ["good vote today", "bad debate", "vote vote good"])
+    expected = list(TermCorpus.from_file(path, "terms_only"))
+    corpus = load_corpus(path, "terms_only")
+    assert list(corpus) == expected
+    corpus.close()
+    assert os.path.exists(cache_path(path, "terms_only"))
+    corpus = load_corpus(path, "terms_only")
+    assert list(corpus) == expected
+    corpus.close()
+    # No temporary file is left behind
+    assert sorted(os.listdir(str(tmp_path))) == \
+        sorted(["stream.json", os.path.basename(cache_path(path,
+                                                           "terms_only"))])
+
+
+def test_concurrent_rebuilds(tmp_path):
+    path = str(tmp_path / "stream.json")
+    write_stream(path, ["tweet number %d" % i for i in range(2000)])
+    errors = []
+
+    def rebuild():
+        try:
+            load_corpus(path, "terms_only", rebuild=True).close()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=rebuild) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    corpus = load_corpus(path, "terms_only")
+    assert len(corpus) == 2000
+    corpus.close()
+    assert not [name for name in os.listdir(str(tmp_path))
+                if name.endswith(".tmp")]
+
+
+def test_unterminated_last_line(tmp_path):
+    path = str(tmp_path / "stream.json")
+    write_stream(path, ["good vote today", "bad debate"])
+    with open(path, 'a') as f:
+        f.write(json.dumps({"text": "vote vote good"}))
+    expected = TermCorpus.from_file(path, "terms_only")
+    assert len(expected) == 3
+    corpus = load_corpus(path, "terms_only")
+    assert list(corpus) == list(expected)
+    assert corpus.count == expected.count
+    corpus.close()
+    # The line is completed and the file grows, so the last line is re-read
+    with open(path, 'a') as f:
+        f.write("\n" + json.dumps({"text": "debate tonight"}) + "\n")
+    expected = TermCorpus.from_file(path, "terms_only")
+    assert len(expected) == 4
+    corpus = load_corpus(path, "terms_only")
+    assert list(corpus) == list(expected)
+    assert corpus.count == expected.count
+    corpus.close()
+
+
+def test_sample_data_is_read_in_full():
+    path = os.path.join(os.path.dirname(__file__), "..", "data",
+                        "stream_sanders.json")
+    expected = TermCorpus.from_file(path, "terms_only")
+    corpus = load_corpus(path, "terms_only", rebuild=True)
+    try:
+        assert len(corpus) == len(expected)
+        assert list(corpus) == list(expected)
+    finally:
+        corpus.close()
+        os.remove(cache_path(path, "terms_only"))
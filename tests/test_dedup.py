@@ -0,0 +1,59 @@
+import json
+from analysis import calculate_term_frequencies
+from analysis import generate_term_list
+from cooccurrence import generate_sparse_co_matrix
+from dedup import Deduplicator
+from dedup import collapse_duplicates
+from dedup import dedup_term_list
+
+TEXTS = ["Bernie Sanders at the rally https://t.co/abc",
+         "RT @user: Bernie Sanders at the rally https://t.co/abc",
+         "Bernie Sanders at the rally https://t.co/xyz",
+         "@someone Bernie Sanders at the rally",
+         "bernie sanders at the rally",
+         "Something else entirely #vote",
+         "Something else entirely #vote"]
+
+
+def write_stream(path, texts):
+    with open(path, 'w') as f:
+        for text in texts:
+            f.write(json.dumps({"text": text}) + "\n")
+
+
+def test_weights_give_the_counts_of_every_copy(tmp_path):
+    path = str(tmp_path / "stream.json")
+    write_stream(path, TEXTS)
+    for term_filter in ("default", "terms_only", "remove_stop_words"):
+        terms, weights, count, stats = dedup_term_list(path, term_filter,
+                                                       near=False)
+        full = generate_term_list(path, term_filter)[0]
+        assert count == len(TEXTS)
+        assert sum(weights) == len(full)
+        assert calculate_term_frequencies(terms, 10, weights=weights)[0] == \
+            calculate_term_frequencies(full, 10)[0]
+        assert generate_sparse_co_matrix(terms, weights=weights).to_dict() == \
+            generate_sparse_co_matrix(full).to_dict()
+
+
+def test_exact_key_is_the_terms():
+    texts = ["a b", "a  b", "A b"]
+    terms = [["a", "b"], ["a", "b"], ["A", "b"]]
+    unique, weights = collapse_duplicates(texts, Deduplicator(near=False),
+                                          terms)
+    assert unique == [["a", "b"], ["A", "b"]]
+    assert weights == [2, 1]
+    # Without terms, the normalized texts are compared
+    unique, weights = collapse_duplicates(texts, Deduplicator(near=False))
+    assert unique == ["a b"]
+    assert weights == [3]
+
+
+def test_near_duplicates():
+    deduplicator = Deduplicator(near=True, threshold=0.5)
+    first = "the quick brown fox jumps over the lazy dog near the river bank"
+    assert deduplicator.add(first, first.split()) == (0, False)
+    record, duplicate = deduplicator.add(first + " today",
+                                         (first + " today").split())
+    assert (record, duplicate) == (0, True)
+    assert deduplicator.stats()["near_duplicates"] == 1
@@ -0,0 +1,82 @@
+import json
+import pytest
+from collections import Counter
+from incremental import IncrementalAnalyzer
+
+
+def append_tweets(path, texts):
+    with open(path, 'a') as f:
+        for text in texts:
+            f.write(json.dumps({"text": text}) + "\n")
+
+
+def test_top_results_are_kept_up_to_date(tmp_path):
+    path = str(tmp_path / "stream.json")
+    batches = [["good vote today", "bad debate", "vote vote good"],
+               ["rally today good", "debate debate news"],
+               ["news news news today", "awful rally", "good news"]]
+    open(path, 'w').close()
+    analyzer = IncrementalAnalyzer(path, "terms_only",
+                                   state_file=str(tmp_path / "state"))
+    for batch in batches:
+        append_tweets(path, batch)
+        analyzer.update()
+        results = analyzer.results(3)
+        assert results["frequencies"] == analyzer.term_counts.most_common(3)
+        pairs = Counter({(w1, w2): count for w1, row in analyzer.com.items()
+                         for w2, count in row.items()})
+        assert results["co_occurrences"] == sorted(
+            pairs.items(), key=lambda item: (-item[1], item[0]))[:3]
+    # Changing n ranks every term again
+    assert analyzer.results(5)["frequencies"] == \
+        analyzer.term_counts.most_common(5)
+
+
+def test_resume_after_save(tmp_path):
+    path = str(tmp_path / "stream.json")
+    state = str(tmp_path / "state")
+    append_tweets(path, ["good vote today", "bad debate"])
+    analyzer = IncrementalAnalyzer(path, "terms_only", state_file=state)
+    analyzer.update()
+    analyzer.save()
+    append_tweets(path, ["vote vote good"])
+    resumed = IncrementalAnalyzer(path, "terms_only", state_file=state)
+    assert resumed.load()
+    resumed.update()
+    assert resumed.ntweets == 3
+    assert resumed.results(2)["frequencies"] == \
+        resumed.term_counts.most_common(2)
+
+
+@pytest.mark.parametrize("texts", [
+    # Few negative terms, so the lists are filled with terms with an SO of 0
+    ["good rally today", "win x", "hate debate", "good rally news",
+     "vote good", "win"],
+    # Too few negative terms and terms with an SO of 0 to fill the list
+    ["good ace", "good bold", "good cool", "good deal", "good east",
+     "good fair", "hate crowd"]])
+def test_top_orientations_match_sentiment_analysis(tmp_path, texts):
+    from analysis import calculate_term_frequencies
+    from analysis import generate_co_matrix
+    from analysis import generate_term_list
+    from semantic import sentiment_analysis
+    path = str(tmp_path / "stream.json")
+    append_tweets(path, texts)
+    positive, negative = ["good"], ["hate"]
+    analyzer = IncrementalAnalyzer(path, "terms_only", positive, negative,
+                                   state_file=str(tmp_path / "state"))
+    analyzer.update()
+    term_list, _ = generate_term_list(path, "terms_only")
+    term_counts, _ = calculate_term_frequencies(term_list, 10)
+    com = generate_co_matrix(term_list)
+    for n in range(1, 12):
+        _, top_pos, top_neg = sentiment_analysis(
+            term_list, term_counts, com, positive, negative, n,
+            len(term_list))
+        pos, neg = analyzer.top_orientations(n)
+        assert [term for term, _ in pos] == [term for term, _ in top_pos]
+        assert [term for term, _ in neg] == [term for term, _ in top_neg]
+        assert [value for _, value in pos] == \
+            pytest.approx([value for _, value in top_pos])
+        assert [value for _, value in neg] == \
+            pytest.approx([value for _, value in top_neg])
@@ -0,0 +1,69 @@
+import os
+import pytest
+from analysis import generate_term_list
+from analysis import search_word_co_occurrences
+from inverted_index import InvertedIndex
+from inverted_index import decode_postings
+from inverted_index import encode_postings
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data",
+                    "stream_sanders.json")
+
+
+@pytest.fixture(scope="module")
+def term_list():
+    return generate_term_list(DATA, "terms_only")[0]
+
+
+def test_postings_round_trip():
+    # Deltas that take one, two, three and five bytes
+    ids = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 21 + 5, 2 ** 32 - 1]
+    assert list(decode_postings(encode_postings(ids))) == ids
+    assert list(decode_postings(encode_postings([]))) == []
+
+
+def test_co_occurrences_match_search_word(term_list):
+    index = InvertedIndex.build(term_list)
+    assert len(index) == len(term_list)
+    keywords = {term for tweet in term_list for term in tweet}
+    for keyword in sorted(keywords) + ["missing"]:
+        assert index.co_occurrences(keyword, 10) == \
+            search_word_co_occurrences(keyword, term_list, 10)
+
+
+def test_search_modes(term_list):
+    index = InvertedIndex.build(term_list)
+    both = [i for i, tweet in enumerate(term_list)
+            if "bernie" in tweet and "sanders" in tweet]
+    either = [i for i, tweet in enumerate(term_list)
+              if "bernie" in tweet or "sanders" in tweet]
+    assert index.search(["bernie", "sanders"], "and") == both
+    assert index.search(["bernie", "sanders"], "or") == either
+    with pytest.raises(Exception):
+        index.search(["bernie"], "xor")
+
+
+def test_save_and_load(tmp_path, term_list):
+    # Repeat the Tweets so that the gaps between IDs need several bytes
+    term_list = term_list * 10 + [["sanders", "rare"]] + \
+        [["filler"]] * 20000 + [["rare", "vote"]]
+    index = InvertedIndex.build(term_list)
+    path = str(tmp_path / "stream.idx")
+    index.save(path)
+    loaded = InvertedIndex.load(path)
+    assert len(loaded) == len(index)
+    for term in index.vocabulary.terms:
+        assert list(loaded.postings(term)) == list(index.postings(term))
+    assert list(loaded.postings("rare")) == [len(term_list) - 20002,
+                                             len(term_list) - 1]
+    assert loaded.tweet(len(term_list) - 1) == ["rare", "vote"]
+    assert loaded.co_occurrences(["sanders", "rare"], 5) == \
+        index.co_occurrences(["sanders", "rare"], 5)
+
+
+def test_invalid_file(tmp_path):
+    path = str(tmp_path / "stream.idx")
+    with open(path, 'wb') as f:
+        f.write(b"not an index")
+    with pytest.raises(Exception):
+        InvertedIndex.load(path)
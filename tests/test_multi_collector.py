@@ -0,0 +1,46 @@
+import asyncio
+import json
+import os
+from multi_collector import MultiCollector
+from multi_collector import QueryMatcher
+from multi_collector import iter_source
+from multi_collector import read_lines
+
+
+def test_matcher():
+    matcher = QueryMatcher(["bernie sanders", "warren", "#debate"])
+    assert matcher.match("Bernie Sanders at the rally") == [0]
+    assert matcher.match("sanders, said bernie") == [0]
+    # A word matches its hashtag and mention
+    assert matcher.match("#Bernie @sanders and #warren") == [0, 1]
+    assert matcher.match("watching the #debate with warren") == [1, 2]
+    # A hashtag query only matches the hashtag
+    assert matcher.match("the debate tonight") == []
+    # A word is not matched inside another word
+    assert matcher.match("warrenty for bernie") == []
+    assert matcher.track() == ["#debate", "bernie", "sanders", "warren"]
+
+
+def test_tweets_are_routed_to_their_queries(tmp_path):
+    texts = ["Bernie Sanders rally", "warren speaks", "nothing here",
+             "#debate: sanders and warren", "bernie alone"]
+    source = str(tmp_path / "recorded.json")
+    with open(source, 'w') as f:
+        for text in texts:
+            f.write(json.dumps({"text": text}) + "\n")
+        f.write("not json\n")
+    data_dir = tmp_path / "out"
+    data_dir.mkdir()
+    collector = MultiCollector(["bernie sanders", "warren", "#debate"],
+                               str(data_dir), flush_interval=0.05)
+    asyncio.run(collector.run(iter_source(read_lines(source))))
+    assert collector.received == 6
+    assert collector.unmatched == 3
+    expected = {"bernie_sanders": [texts[0]],
+                "warren": [texts[1], texts[3]],
+                "_debate": [texts[3]]}
+    for name, query_texts in expected.items():
+        with open(os.path.join(str(data_dir), "stream_%s.json" % name)) as f:
+            assert [json.loads(line)["text"] for line in f] == query_texts
+    assert collector.stats()["warren"] == {"matched": 2, "written": 2,
+                                           "dropped": 0}
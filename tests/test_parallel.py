@@ -0,0 +1,61 @@
+import os
+import shutil
+import pytest
+from analysis import generate_co_matrix
+from analysis import generate_term_list
+from analysis import search_word_co_occurrences
+from parallel import file_chunks
+from parallel import parallel_statistics
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data",
+                    "stream_sanders.json")
+KEYWORDS = ("sanders", "hillary")
+
+
+def rows(com):
+    # The order of the rows and of the terms in each row is compared too
+    return [(w1, list(row.items())) for w1, row in com.items()]
+
+
+def test_chunks_cover_the_file():
+    chunks = file_chunks(DATA, 8)
+    assert len(chunks) > 1
+    assert chunks[0][1] == 0 and chunks[-1][2] is None
+    for (_, _, end), (_, start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+
+
+@pytest.mark.parametrize("term_filter", ["default", "terms_only",
+                                         "single_terms"])
+@pytest.mark.parametrize("mode", ["full", "window:3", "dedup"])
+def test_matches_the_serial_analysis(term_filter, mode):
+    term_list, count = generate_term_list(DATA, term_filter)
+    com = generate_co_matrix(term_list, mode)
+    # Several chunks are analyzed in the current process
+    count_all, parallel_com, keyword_counts, ntweets, parallel_count = \
+        parallel_statistics(DATA, term_filter, KEYWORDS, workers=1,
+                            chunks_per_worker=4, mode=mode)
+    assert ntweets == len(term_list)
+    assert parallel_count == count
+    expected_counts = {}
+    for tweet in term_list:
+        for term in tweet:
+            expected_counts[term] = expected_counts.get(term, 0) + 1
+    assert list(count_all.items()) == list(expected_counts.items())
+    assert rows(parallel_com) == rows(com)
+    for keyword in KEYWORDS:
+        assert keyword_counts[keyword].most_common(10) == \
+            search_word_co_occurrences(keyword, term_list, 10)
+
+
+def test_worker_processes_and_shards(tmp_path):
+    for name in ("a.json", "b.json"):
+        shutil.copy(DATA, str(tmp_path / name))
+    term_list, count = generate_term_list(DATA, "terms_only")
+    term_list = term_list * 2
+    count_all, com, _, ntweets, parallel_count = parallel_statistics(
+        str(tmp_path), "terms_only", workers=2)
+    assert ntweets == len(term_list)
+    assert parallel_count == 2 * count
+    assert rows(com) == rows(generate_co_matrix(term_list))
+    assert sum(count_all.values()) == sum(len(tweet) for tweet in term_list)
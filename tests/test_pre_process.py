@@ -0,0 +1,155 @@
+'''
+Parity tests of pre_process.py against the original implementation of the
+tokenizer, which rebuilt its regular expressions on every call.
+'''
+import os
+import random
+import re
+import pytest
+from pre_process import classify
+from pre_process import preprocess
+from pre_process import preprocess_many
+from pre_process import tokenize
+from pre_process import tokenize_many
+from tweet_reader import read_texts
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))), "data", "stream_sanders.json")
+
+# The original implementation
+emoticons_str = r"""
+    (?:
+        [:=;]
+        [oO\-]?
+        [D\)\]\(\]/\\OpP]
+    )"""
+regex_str = [
+    emoticons_str,
+    r"<[^>]+>",
+    r"(?:@[\w_]+)",
+    r"(?:\#+[\w_]+[\w\'_\-]*[\w_]+)",
+    r"http[s]?://(?:[a-z]|[0-9]|[$-_@.&amp;+]|[!*\(\),]|(?:%[0-9a-f][0-9a-f]))+",
+    r"(?:(?:\d+,?)+(?:\.?\d+)?)",
+    r"(?:[a-z][a-z'\-_]+[a-z])",
+    r"(?:[\w_]+)",
+    r"(?:\S)"]
+kinds = ["emoticon", "html", "mention", "hashtag", "url", "number", "word",
+         "word", "other"]
+
+
+def original_tokenize(s):
+    tokens_re = re.compile(r'(' + '|'.join(regex_str) + ')',
+                           re.VERBOSE | re.IGNORECASE)
+    return tokens_re.findall(s)
+
+
+def original_preprocess(s, lowercase=True):
+    emoticon_re = re.compile(r'^' + emoticons_str + '$',
+                             re.VERBOSE | re.IGNORECASE)
+    tokens = original_tokenize(s)
+    if lowercase:
+        tokens = [token if emoticon_re.search(
+            token) else token.lower() for token in tokens]
+    return tokens
+
+
+def original_kinds(s):
+    '''
+    Return the class of each token, which is the first pattern that matches
+    at the position of the token.
+    '''
+    tokens_re = re.compile(r'(' + '|'.join(regex_str) + ')',
+                           re.VERBOSE | re.IGNORECASE)
+    patterns = [re.compile(pattern, re.VERBOSE | re.IGNORECASE)
+                for pattern in regex_str]
+    result = []
+    for match in tokens_re.finditer(s):
+        for pattern, kind in zip(patterns, kinds):
+            if pattern.match(s, match.start()):
+                result.append(kind)
+                break
+    return result
+
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "Hello World :) :-D ;P =( :O :/ :\\ xD",
+    "<b>bold</b> &amp; <a href='x'>link</a>",
+    "@user_1 @Another mentions @ alone",
+    "#Hashtag #two_words #don't #a #### #x-y-z #CamelCase",
+    "https://t.co/AbC123 http://example.com/path?q=1&r=(2) https:// foo",
+    "1,000,000 3.14 .5 42, 7.0.1 2019",
+    "Ünïcödé café naïve 日本語のテキスト Привет мир 😀🔥 ¿qué?",
+    "RT @Megafono_Mx: Bernie Sanders responde\n\n“Morales…",
+    "don't won't rock-n-roll snake_case_word _leading trailing_",
+    "MIXED case :P and :p and =D and =d",
+    "a​b\tc\r\nd",
+]
+
+
+def fuzz_strings(n=2000, seed=0):
+    pieces = [":", ")", "(", "-", "D", "P", "o", "=", ";", "#", "@", "_", "'",
+              "<", ">", "/", "\\", "http://", "https://t.co/", "%2F", ",", ".",
+              "1", "9", "a", "Z", "é", "ß", "日", "😀", " ", "\n", "&amp;",
+              "!", "?"]
+    random_ = random.Random(seed)
+    for _ in range(n):
+        yield "".join(random_.choice(pieces)
+                      for _ in range(random_.randint(0, 30)))
+
+
+def sample_texts(limit=2000):
+    if not os.path.exists(SAMPLE):
+        return []
+    texts = []
+    for text in read_texts(SAMPLE):
+        texts.append(text)
+        if len(texts) == limit:
+            break
+    return texts
+
+
+CASES = EDGE_CASES + list(fuzz_strings())
+
+
+@pytest.mark.parametrize("s", EDGE_CASES)
+def test_edge_cases(s):
+    assert tokenize(s) == original_tokenize(s)
+    assert preprocess(s) == original_preprocess(s)
+    assert preprocess(s, False) == original_preprocess(s, False)
+
+
+def test_fuzz():
+    for s in fuzz_strings():
+        assert tokenize(s) == original_tokenize(s), s
+        assert preprocess(s) == original_preprocess(s), s
+
+
+def test_sample_stream():
+    texts = sample_texts()
+    if not texts:
+        pytest.skip("The sample stream is not available.")
+    for s in texts:
+        assert preprocess(s) == original_preprocess(s)
+    assert list(preprocess_many(texts)) == \
+        [original_preprocess(s) for s in texts]
+
+
+@pytest.mark.parametrize("lowercase", [True, False])
+def test_batch_api(lowercase):
+    texts = CASES + sample_texts(500)
+    assert list(tokenize_many(texts)) == [original_tokenize(s) for s in texts]
+    assert list(preprocess_many(texts, lowercase)) == \
+        [original_preprocess(s, lowercase) for s in texts]
+    assert list(preprocess_many(texts, lowercase, classified=True)) == \
+        [classify(s, lowercase) for s in texts]
+
+
+def test_classify():
+    for s in CASES + sample_texts(500):
+        tokens = classify(s)
+        assert [token for token, _ in tokens] == original_preprocess(s)
+        assert [kind for _, kind in tokens] == original_kinds(s)
+        assert [token for token, _ in classify(s, False)] == \
+            original_tokenize(s)
@@ -0,0 +1,75 @@
+import json
+from load_test import LatencyRecorder
+from load_test import run_load_test
+from replay_server import ReplayServer
+from replay_server import ReplayStream
+from replay_server import read_lines
+
+
+def tweet_lines(n):
+    return [json.dumps({"text": "tweet %d" % i}).encode("utf-8") + b"\r\n"
+            for i in range(n)]
+
+
+def test_read_lines(tmp_path):
+    path = str(tmp_path / "stream.json")
+    with open(path, 'wb') as f:
+        f.write(b'{"text": "a"}\n\n{"text": "b"}\r\n{"text": "c"}')
+    assert read_lines([path]) == [b'{"text": "a"}\r\n', b'{"text": "b"}\r\n',
+                                  b'{"text": "c"}\r\n']
+
+
+def test_schedule_with_bursts():
+    stream = ReplayStream(tweet_lines(10), rate=100, burst_every=10,
+                          burst_seconds=1, burst_factor=5, loop=False)
+    start = stream.start_time
+    # 5 times the rate during the first second of every 10 seconds
+    assert stream.due(start + 0.5) == 10
+    stream.loop = True
+    assert stream.due(start + 0.5) == 250
+    assert stream.due(start + 5) == 500 + 400
+    assert stream.due(start + 10.5) == 1050 + 400 + 200
+    assert stream.line(12) == stream.line(2)
+    assert not stream.finished(100)
+
+
+def test_latency_recorder():
+    class Writer(object):
+        on_write = None
+
+        def write(self, data):
+            return data != "full"
+
+    recorder = LatencyRecorder()
+    writer = recorder.wrap(Writer())
+    assert writer.write("a") and writer.write("b")
+    assert not writer.write("full")
+    arrivals = list(recorder.arrivals)
+    recorder.on_write(2, arrivals[-1] + 0.5)
+    assert [round(latency, 6) for latency in recorder.latencies] == \
+        [round(arrivals[-1] + 0.5 - arrival, 6) for arrival in arrivals]
+    assert set(recorder.percentiles()) == {"p50", "p95", "p99", "p100"}
+
+
+def test_every_full_line_sent_is_written():
+    stream = ReplayStream(tweet_lines(500), rate=2000, loop=False)
+    server = ReplayServer(("127.0.0.1", 0), stream, keepalive=0.1)
+    report = run_load_test(server, "writer", duration=1.0,
+                           flush_interval=0.05)
+    assert report["sent"] > 0
+    assert report["received"] == report["sent"]
+    assert report["written"] == report["sent"]
+    assert report["lost"] == {"partial": 0, "queue_full": 0, "other": 0}
+
+
+def test_dropped_connections_are_resumed():
+    stream = ReplayStream(tweet_lines(1000), rate=2000)
+    server = ReplayServer(("127.0.0.1", 0), stream, keepalive=0.1,
+                          disconnect_every=100)
+    report = run_load_test(server, "writer", duration=1.0,
+                           flush_interval=0.05)
+    assert report["disconnects"] >= 1
+    assert report["reconnects"] >= report["disconnects"]
+    # Only the lines cut by a dropped connection are lost
+    assert report["written"] == report["sent"] - report["lost"]["partial"]
+    assert report["lost"]["other"] == 0
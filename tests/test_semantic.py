@@ -0,0 +1,33 @@
+import random
+from collections import Counter
+import pytest
+import analysis
+import semantic
+from cooccurrence import generate_sparse_co_matrix
+
+POSITIVE = ["good", "great", "good"]
+NEGATIVE = ["bad", "awful"]
+WORDS = POSITIVE + NEGATIVE + ["vote", "debate", "sanders", "rally", "news"]
+
+
+def random_tweets(n, seed=0):
+    random_ = random.Random(seed)
+    return [[random_.choice(WORDS) for _ in range(random_.randint(0, 8))]
+            for _ in range(n)]
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_default_matches_legacy_sentiment_analysis(sparse):
+    tweets = random_tweets(400)
+    term_counts = Counter(term for tweet in tweets for term in tweet)
+    com = analysis.generate_co_matrix(tweets)
+    expected = analysis.sentiment_analysis(tweets, term_counts, com, POSITIVE,
+                                           NEGATIVE, 3)
+    if sparse:
+        com = generate_sparse_co_matrix(tweets)
+    result = semantic.sentiment_analysis(tweets, term_counts, com, POSITIVE,
+                                         NEGATIVE, 3)
+    for got, want in zip(result, expected):
+        assert [term for term, _ in got] == [term for term, _ in want]
+        assert [so for _, so in got] == \
+            pytest.approx([so for _, so in want], abs=1e-12)
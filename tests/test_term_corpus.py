@@ -0,0 +1,63 @@
+import os
+import pytest
+from analysis import calculate_term_frequencies
+from analysis import generate_co_matrix
+from analysis import generate_term_list
+from analysis import search_word_co_occurrences
+from term_corpus import TermCorpus
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data",
+                    "stream_sanders.json")
+
+
+def dict_pairs(com):
+    return {(t1, t2): count for t1, row in com.items()
+            for t2, count in row.items() if count}
+
+
+@pytest.mark.parametrize("term_filter", ["default", "terms_only",
+                                         "hashtags", "remove_stop_words"])
+def test_matches_the_term_list(term_filter):
+    term_list, count = generate_term_list(DATA, term_filter)
+    corpus, corpus_count = generate_term_list(DATA, term_filter, compact=True)
+    assert isinstance(corpus, TermCorpus)
+    assert corpus_count == count == corpus.count
+    assert len(corpus) == len(term_list)
+    assert list(corpus) == term_list
+    assert [corpus[i] for i in range(len(corpus))] == term_list
+    # The same Counter, with the same order of terms
+    counts = corpus.term_counts()
+    expected, _ = calculate_term_frequencies(term_list, 10)
+    assert list(counts.items()) == list(expected.items())
+    for keyword in list(counts)[:20] + ["missing"]:
+        assert corpus.keyword_counts(keyword).most_common(10) == \
+            search_word_co_occurrences(keyword, term_list, 10)
+        assert corpus.tweets_containing(keyword) == \
+            [i for i, tweet in enumerate(term_list) if keyword in tweet]
+    assert dict_pairs(corpus.co_matrix(batch_size=50)) == \
+        dict_pairs(generate_co_matrix(term_list))
+
+
+@pytest.mark.parametrize("term_filter, single", [
+    ("default", "single_terms"), ("remove_stop_words", "single_stop_words")])
+def test_unique_is_the_single_filter(term_filter, single):
+    corpus = TermCorpus.from_file(DATA, term_filter)
+    unique = corpus.unique()
+    assert unique is corpus.unique()
+    assert list(unique) == generate_term_list(DATA, single)[0]
+    # The cached view is dropped when the corpus grows
+    corpus.append(["new", "new"])
+    assert corpus.unique()[len(corpus) - 1] == ["new"]
+
+
+def test_ids_and_sizes():
+    corpus = TermCorpus()
+    corpus.append(["vote", "debate", "vote"])
+    corpus.append([])
+    corpus.append(["rally"])
+    assert list(corpus) == [["vote", "debate", "vote"], [], ["rally"]]
+    assert corpus.ids(0).tolist() == [0, 1, 0]
+    tokens, offsets = corpus.id_arrays()
+    assert tokens.tolist() == [0, 1, 0, 2]
+    assert offsets.tolist() == [0, 3, 3, 4]
+    assert corpus.nbytes() == 4 * 4 + 4 * 8
@@ -0,0 +1,60 @@
+import os
+import random
+import subprocess
+import sys
+from collections import Counter
+from topk import CountMinSketch
+from topk import SpaceSaving
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def zipf_items(n, seed=0):
+    random_ = random.Random(seed)
+    return ["w%d" % int(random_.paretovariate(1)) for _ in range(n)]
+
+
+def test_count_min_never_underestimates():
+    items = zipf_items(20000)
+    counts = Counter(items)
+    sketch = CountMinSketch(epsilon=0.01, capacity=50, buffer_size=100)
+    for i in range(0, len(items), 7):
+        sketch.update(items[i:i + 7])
+    bound = sketch.error_bounds()["max_overcount"]
+    assert sketch.total == len(items)
+    for item, count in counts.items():
+        assert count <= sketch[item] <= count + 10 * bound
+    assert [item for item, _ in sketch.most_common(3)] == \
+        [item for item, _ in counts.most_common(3)]
+
+
+def test_add_and_update_agree():
+    items = zipf_items(5000)
+    added = CountMinSketch(epsilon=0.01, buffer_size=10)
+    for item in items:
+        added.add(item)
+    updated = CountMinSketch(epsilon=0.01)
+    updated.update(items)
+    added.flush()
+    updated.flush()
+    assert added.table == updated.table
+
+
+def test_count_min_columns_do_not_depend_on_hash_seed():
+    code = ("from topk import CountMinSketch; "
+            "print(CountMinSketch()._columns('sanders'))")
+    columns = set()
+    for seed in ("0", "1", "random"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        columns.add(subprocess.check_output([sys.executable, "-c", code],
+                                            cwd=ROOT, env=env))
+    assert len(columns) == 1
+
+
+def test_space_saving_tracks_heavy_hitters():
+    items = zipf_items(20000)
+    sketch = SpaceSaving(capacity=100)
+    sketch.update(items)
+    counts = Counter(items)
+    for item, count in counts.most_common(5):
+        assert count <= sketch[item] <= count + len(items) / 100
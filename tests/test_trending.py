@@ -0,0 +1,51 @@
+import random
+from collections import Counter
+import pytest
+from cooccurrence import generate_sparse_co_matrix
+from semantic import semantic_orientations
+from trending import TimeBuckets
+
+POSITIVE = ["good", "great", "good"]
+NEGATIVE = ["bad", "awful"]
+WORDS = POSITIVE + NEGATIVE + ["vote", "debate", "sanders", "rally", "news",
+                               "iowa"]
+
+
+def random_tweets(n, seed=0):
+    random_ = random.Random(seed)
+    return [[random_.choice(WORDS) for _ in range(random_.randint(0, 8))]
+            for _ in range(n)]
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_window_orientations(symmetric):
+    tweets = random_tweets(300)
+    buckets = TimeBuckets(10, window=3, baseline=5, positive_vocab=POSITIVE,
+                          negative_vocab=NEGATIVE, symmetric=symmetric)
+    for i, terms in enumerate(tweets):
+        buckets.add(i, terms)
+    # The Tweets of the last 3 buckets of 10 seconds
+    window = tweets[-30:]
+    term_counts = Counter(term for terms in window for term in terms)
+    terms, expected = semantic_orientations(
+        term_counts, generate_sparse_co_matrix(window), POSITIVE, NEGATIVE,
+        len(window), symmetric)
+    orientations = buckets.orientations()
+    for term, so in zip(terms, expected.tolist()):
+        assert orientations.get(term, 0.0) == pytest.approx(so, abs=1e-9)
+    expected = dict(zip(terms, expected.tolist()))
+    averages = [sum(expected[term] for term in terms) / len(terms)
+                for terms in window if terms]
+    assert buckets.average_orientation() == \
+        pytest.approx(sum(averages) / len(averages))
+
+
+def test_evicted_terms_are_dropped():
+    buckets = TimeBuckets(1, window=2, baseline=2)
+    buckets.add(0, ["old"], ["#old"])
+    for t in range(1, 10):
+        buckets.add(t, ["new"])
+    assert "old" not in buckets.totals["terms"]
+    assert "old" not in buckets.baseline_totals["terms"]
+    assert "#old" not in buckets.baseline_squares["hashtags"]
+    assert buckets.top(1) == [("new", 2)]
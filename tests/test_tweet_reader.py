@@ -0,0 +1,36 @@
+import json
+from tweet_reader import TweetReader
+from tweet_reader import extract_fields
+
+
+def write_lines(path, lines):
+    with open(path, 'w', encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+    return str(path)
+
+
+def test_lone_surrogate_is_decoded(tmp_path):
+    # A Tweet truncated in the middle of an emoji ends with a lone surrogate,
+    # which the json module accepts
+    lines = ['{"text": "truncated \\ud83d", "id": 1}',
+             '{"text": "complete", "id": 2}']
+    filename = write_lines(tmp_path / "stream.json", lines)
+    reader = TweetReader(filename)
+    texts = list(reader)
+    assert texts == [json.loads(line)["text"] for line in lines]
+    assert reader.errors == 0
+
+
+def test_lone_surrogate_in_full_decode():
+    # The text comes after a nested object, so the whole line is decoded
+    line = b'{"user": {"name": "a"}, "text": "x \\udc00"}'
+    assert extract_fields(line, ("text",)) == [json.loads(line)["text"]]
+
+
+def test_invalid_line_is_an_error(tmp_path):
+    filename = write_lines(tmp_path / "stream.json",
+                           ['{"text": "ok"}', '{"text": "cut'])
+    reader = TweetReader(filename)
+    assert list(reader) == ["ok"]
+    assert reader.errors == 1
@@ -0,0 +1,68 @@
+import gzip
+import time
+import pytest
+from writers import StreamWriter
+from writers import format_filename
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_format_filename():
+    assert format_filename("#vote 2016/us") == "_vote_2016_us"
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_writes_every_tweet(tmp_path, background):
+    path = str(tmp_path / "stream.json")
+    lines = ['{"text": "tweet %d"}\n' % i for i in range(100)]
+    with StreamWriter(path, flush_bytes=64, background=background) as writer:
+        for line in lines:
+            assert writer.write(line)
+    assert writer.written == 100
+    assert read_lines(path) == [line.rstrip("\n") for line in lines]
+
+
+def test_compression_and_rotation(tmp_path):
+    path = str(tmp_path / "stream.json")
+    writer = StreamWriter(path, compress=True, flush_bytes=1,
+                          rotate_bytes=40)
+    for i in range(6):
+        writer.write('{"text": "tweet %d"}\n' % i)
+    writer.close()
+    files = writer.files()
+    assert len(files) > 1
+    assert all(name.endswith(".json.gz") for name in files)
+    lines = []
+    for name in files:
+        with gzip.open(name, 'rt') as f:
+            lines.extend(f.read().splitlines())
+    assert lines == ['{"text": "tweet %d"}' % i for i in range(6)]
+
+
+def test_foreground_flush_interval(tmp_path):
+    path = str(tmp_path / "stream.json")
+    writer = StreamWriter(path, flush_interval=0.05)
+    writer.write('{"text": "only tweet"}\n')
+    # The buffer is written without waiting for another Tweet
+    deadline = time.time() + 5
+    while writer.written == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert writer.written == 1
+    assert read_lines(path) == ['{"text": "only tweet"}']
+    writer.close()
+
+
+def test_background_error_is_raised(tmp_path):
+    # The output directory does not exist, so the thread fails to write
+    path = str(tmp_path / "missing" / "stream.json")
+    writer = StreamWriter(path, flush_bytes=1, background=True, queue_size=1)
+    writer.write('{"text": "tweet"}\n')
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+    with pytest.raises(OSError):
+        writer.write('{"text": "tweet"}\n')
+    with pytest.raises(OSError):
+        writer.close()
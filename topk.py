@@ -0,0 +1,290 @@
+'''
+This Python script contains functions and data structures for finding the
+most frequent items in a data set without sorting all of it.
+
+The exact functions use heaps (heapq.nlargest), which select the n largest
+items in O(N log n) time and only keep n items in memory. The approximate
+structures are streaming sketches for very large inputs, where keeping an
+exact count of every rare term is not worth the memory:
+    SpaceSaving - keeps a fixed number of counters. Every count it reports
+                  overestimates the true count by at most N / capacity, where
+                  N is the number of items seen, and every item that appears
+                  more than N / capacity times is guaranteed to be tracked.
+    CountMinSketch - keeps a fixed-size table of counters. Every count it
+                     reports overestimates the true count by at most
+                     epsilon * N with probability 1 - delta.
+
+The columns of an item in the Count-Min table are derived from a single
+BLAKE2b digest of the item (h1 + i * h2 for row i), so that they do not depend
+on the hash randomization of the interpreter (PYTHONHASHSEED) and a sketch
+gives the same counts in every run. The items added to the sketch are first
+counted in a buffer of at most buffer_size distinct items, so that the table
+is updated once per distinct item of the buffer instead of once per item.
+'''
+import heapq
+from hashlib import blake2b
+from math import ceil
+from math import e
+from collections import Counter
+from math import log
+from operator import itemgetter
+
+
+def top_k(items, n, key=itemgetter(1)):
+    '''
+    Return the n largest items of an iterable of (item, count) pairs, in
+    descending order of count. Items with equal counts keep their original
+    order, so the result is the same as that of sorting all of the items and
+    keeping the first n.
+    '''
+    return heapq.nlargest(n, items, key=key)
+
+
+def top_pairs(com, n):
+    '''
+    Return the n most frequent pairs of terms of a co-occurrence matrix given
+    as a dict of dicts, without sorting the rows of the matrix.
+    '''
+    pairs = (((t1, t2), count) for t1 in com for t2, count in com[t1].items())
+    return top_k(pairs, n)
+
+
+class SpaceSaving(object):
+    '''
+    Space-Saving sketch (Metwally et al., 2005) for the most frequent items of
+    a stream.
+
+    **Parameters**
+
+        capacity: *int*
+            The number of counters to keep. The maximum error of a count is
+            N / capacity, where N is the number of items seen.
+    '''
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.total = 0
+        # Item -> [count, error], where error is the count the item inherited
+        # when it replaced another item
+        self.counters = {}
+        # Min-heap of (count, item). It may contain stale entries, which are
+        # skipped when they no longer match the count of the item.
+        self._heap = []
+
+    def _pop_min(self):
+        '''
+        Remove and return the item with the lowest count.
+        '''
+        heap = self._heap
+        counters = self.counters
+        while True:
+            count, item = heapq.heappop(heap)
+            entry = counters.get(item)
+            if entry is not None and entry[0] == count:
+                return item, count
+
+    def add(self, item, count=1):
+        '''
+        Add an item to the sketch.
+        '''
+        self.total += count
+        counters = self.counters
+        entry = counters.get(item)
+        if entry is not None:
+            entry[0] += count
+        elif len(counters) < self.capacity:
+            entry = counters[item] = [count, 0]
+        else:
+            # Replace the item with the lowest count, which is the largest
+            # possible error of the new item
+            old, minimum = self._pop_min()
+            del counters[old]
+            entry = counters[item] = [minimum + count, minimum]
+        heapq.heappush(self._heap, (entry[0], item))
+        # Rebuild the heap when it holds too many stale entries
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, (c, _) in counters.items()]
+            heapq.heapify(self._heap)
+
+    def update(self, items):
+        '''
+        Add every item of an iterable to the sketch.
+        '''
+        for item in items:
+            self.add(item)
+
+    def __getitem__(self, item):
+        entry = self.counters.get(item)
+        return entry[0] if entry is not None else 0
+
+    def most_common(self, n):
+        '''
+        Return the n items with the highest estimated counts.
+        '''
+        return top_k(((item, entry[0]) for item, entry in
+                      self.counters.items()), n)
+
+    def error_bounds(self):
+        '''
+        Return the error guarantees of the current estimates.
+
+        **Returns**
+
+            bounds: *dict*
+                max_overcount is the largest amount by which a count can
+                exceed the true count, guaranteed_threshold is the count above
+                which an item is guaranteed to be tracked, and total is the
+                number of items seen.
+        '''
+        bound = self.total / self.capacity
+        return {"method": "space_saving",
+                "capacity": self.capacity,
+                "total": self.total,
+                "max_overcount": bound,
+                "guaranteed_threshold": bound,
+                "probability": 1.0}
+
+
+class CountMinSketch(object):
+    '''
+    Count-Min sketch (Cormode and Muthukrishnan, 2005) that also tracks a
+    bounded set of heavy hitters, so that the most frequent items can be
+    returned.
+
+    **Parameters**
+
+        epsilon: *float*
+            The relative error of the counts. The width of the table is
+            ceil(e / epsilon).
+        delta: *float*
+            The probability that a count exceeds the error bound. The depth of
+            the table is ceil(ln(1 / delta)).
+        capacity: *int*
+            The number of candidate heavy hitters to keep.
+        seed: *int*
+            The seed of the hash functions.
+        buffer_size: *int*
+            The number of distinct items that are counted exactly before the
+            table is updated.
+    '''
+
+    def __init__(self, epsilon=0.0001, delta=0.01, capacity=1000, seed=0,
+                 buffer_size=100000):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.capacity = capacity
+        self.seed = seed
+        self.buffer_size = buffer_size
+        self.width = int(ceil(e / epsilon))
+        self.depth = int(ceil(log(1 / delta)))
+        # The rows are Python lists, which are much faster than a NumPy array
+        # to update one counter at a time
+        self.table = [[0] * self.width for _ in range(self.depth)]
+        self._key = seed.to_bytes(8, "little")
+        self._buffer = Counter()
+        self.total = 0
+        # Candidate heavy hitters with their latest estimates
+        self.candidates = {}
+        self._heap = []
+
+    def _columns(self, item):
+        '''
+        Return the column of the item in each row of the table.
+        '''
+        data = item if isinstance(item, str) else repr(item)
+        digest = blake2b(data.encode("utf-8", "surrogatepass"),
+                         digest_size=16, key=self._key).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        # An odd step, so that the rows do not all share a column
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        width = self.width
+        return [(h1 + i * h2) % width for i in range(self.depth)]
+
+    def add(self, item, count=1):
+        '''
+        Add an item to the sketch.
+        '''
+        buffer = self._buffer
+        buffer[item] += count
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def update(self, items):
+        '''
+        Add every item of an iterable to the sketch.
+        '''
+        buffer = self._buffer
+        buffer.update(items)
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Add the counts of the buffer to the table.
+        '''
+        buffer = self._buffer
+        self._buffer = Counter()
+        for item, count in buffer.items():
+            self._add(item, count)
+
+    def _add(self, item, count):
+        self.total += count
+        estimate = None
+        for row, col in zip(self.table, self._columns(item)):
+            value = row[col] + count
+            row[col] = value
+            if estimate is None or value < estimate:
+                estimate = value
+        candidates = self.candidates
+        if item in candidates or len(candidates) < self.capacity:
+            candidates[item] = estimate
+            heapq.heappush(self._heap, (estimate, item))
+            return
+        # Replace the weakest candidate if the item is now more frequent
+        heap = self._heap
+        while heap[0][1] not in candidates or \
+                candidates[heap[0][1]] != heap[0][0]:
+            heapq.heappop(heap)
+        if estimate > heap[0][0]:
+            _, old = heapq.heappop(heap)
+            del candidates[old]
+            candidates[item] = estimate
+            heapq.heappush(heap, (estimate, item))
+        if len(heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, c in candidates.items()]
+            heapq.heapify(self._heap)
+
+    def __getitem__(self, item):
+        if self._buffer:
+            self.flush()
+        return min(row[col] for row, col in
+                   zip(self.table, self._columns(item)))
+
+    def most_common(self, n):
+        '''
+        Return the n candidate heavy hitters with the highest estimated counts.
+        '''
+        if self._buffer:
+            self.flush()
+        return top_k(((item, self[item]) for item in self.candidates), n)
+
+    def error_bounds(self):
+        '''
+        Return the error guarantees of the current estimates.
+
+        **Returns**
+
+            bounds: *dict*
+                max_overcount is the largest amount by which a count exceeds
+                the true count with the given probability, and total is the
+                number of items seen.
+        '''
+        if self._buffer:
+            self.flush()
+        return {"method": "count_min",
+                "width": self.width,
+                "depth": self.depth,
+                "epsilon": self.epsilon,
+                "total": self.total,
+                "max_overcount": self.epsilon * self.total,
+                "probability": 1 - self.delta}
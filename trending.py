@@ -0,0 +1,496 @@
+'''
+This Python script contains a time-windowed analysis of a stream of Tweets,
+which uses the created_at time of each Tweet instead of treating the whole
+.json file as one bag of terms. The Tweets are counted in buckets of a fixed
+width (one minute by default), and the most recent buckets are kept in a ring
+buffer:
+    window - the last few buckets, whose counts give the current top terms
+             and hashtags
+    baseline - the buckets before the window, which give the usual rate of
+               every term
+
+The burst score of a term compares its rate in the window with its rate in
+the baseline:
+
+    burst(t) = (r_t - mean_t) / sqrt(var_t + 1)
+
+where r_t is the average count of t per bucket in the window, and mean_t and
+var_t are the mean and variance of its count per bucket in the baseline (the
+1 keeps terms that are new or constant in the baseline from dividing by zero).
+The running totals of the window and of the baseline are updated as buckets
+move from one to the other, and buckets that are older than the baseline are
+evicted, so that the memory stays bounded however long the stream runs. Terms
+are stored in the buckets as strings, so that nothing of an evicted bucket is
+kept.
+
+If the lexicons are given, the average semantic orientation of the Tweets of
+the window is also reported. The orientations are computed from the counts of
+the window only (see semantic.py), so every bucket also keeps the number of
+times each term appears in the same Tweet as each word of the lexicons, and
+the share of each term in the terms of its Tweets, so that
+
+    average SO = sum of share(t) * SO(t) / number of Tweets
+
+is the average over the Tweets of the window of the average SO of their
+terms. To find the trending terms of a data file from the terminal, enter the
+following command:
+
+python trending.py -i data/stream_QUERY.json -f terms_only --bucket 60 --window 5 --baseline 60 -n 10
+'''
+import argparse
+import calendar
+import os
+from collections import Counter
+from collections import deque
+from math import fsum
+from math import log2
+from math import sqrt
+from analysis import define_lexicon
+from pre_process import preprocess_many
+from term_filters import resolve_filter
+from topk import top_k
+from tweet_reader import TweetReader
+
+MONTHS = {month: i for i, month in enumerate(calendar.month_abbr) if month}
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "term_database")
+
+
+def parse_created_at(created_at):
+    '''
+    Convert the created_at time of a Tweet, such as
+    "Mon Nov 18 16:56:12 +0000 2019", into a Unix time. This is equivalent to
+    datetime.strptime with "%a %b %d %H:%M:%S %z %Y", but much faster.
+    '''
+    _, month, day, clock, offset, year = created_at.split()
+    hour, minute, second = clock.split(":")
+    seconds = calendar.timegm((int(year), MONTHS[month], int(day), int(hour),
+                               int(minute), int(second)))
+    sign = -1 if offset[0] == "-" else 1
+    return seconds - sign * (int(offset[1:3]) * 3600 + int(offset[3:5]) * 60)
+
+
+class Bucket(object):
+    '''
+    The counts of the Tweets of one time bucket.
+    '''
+
+    __slots__ = ("index", "counts", "ntweets", "shares", "pairs", "so_count")
+
+    def __init__(self, index):
+        self.index = index
+        # The term and hashtag counts of the bucket, keyed by term
+        self.counts = {"terms": Counter(), "hashtags": Counter()}
+        self.ntweets = 0
+        # The share of each term in the terms of its Tweets, and the number of
+        # times each term appears in the same Tweet as each word of the
+        # lexicons, keyed by (term, word)
+        self.shares = Counter()
+        self.pairs = Counter()
+        self.so_count = 0
+
+
+class TimeBuckets(object):
+    '''
+    Ring buffer of time buckets with the running totals of the window and of
+    the baseline.
+
+    **Parameters**
+
+        bucket_width: *int*
+            The width of a bucket, in seconds.
+        window: *int*
+            The number of buckets in the window, including the current one.
+        baseline: *int*
+            The number of buckets before the window in the baseline.
+        positive_vocab: *list, str, optional*
+            The lexicon of words that have a positive connotation. If both
+            lexicons are given, the average semantic orientation of the
+            Tweets of the window is reported.
+        negative_vocab: *list, str, optional*
+            The lexicon of words that have a negative connotation.
+        symmetric: *boolean*
+            Whether both halves of the co-occurrence matrix are used for the
+            semantic orientations (see semantic.semantic_orientations).
+
+    **Attributes**
+
+        late: *int*
+            The number of Tweets that were older than the baseline when they
+            arrived, and were not counted.
+    '''
+
+    def __init__(self, bucket_width=60, window=5, baseline=60,
+                 positive_vocab=None, negative_vocab=None, symmetric=False):
+        self.bucket_width = bucket_width
+        self.window = window
+        self.baseline = baseline
+        self.capacity = window + baseline
+        self.symmetric = symmetric
+        self.lexicon = None
+        if positive_vocab is not None and negative_vocab is not None:
+            # The lexicon weight of each word, as in semantic.lexicon_weights
+            lexicon = Counter(positive_vocab)
+            lexicon.subtract(negative_vocab)
+            self.lexicon = {word: weight for word, weight in lexicon.items()
+                            if weight}
+        self.buckets = [None] * self.capacity
+        self.newest = None
+        # The index of the oldest bucket that the stream has covered
+        self.oldest = None
+        self.late = 0
+        self.totals = {"terms": Counter(), "hashtags": Counter()}
+        self.baseline_totals = {"terms": Counter(), "hashtags": Counter()}
+        # The sum of the squared counts per bucket in the baseline, for the
+        # variance of the burst score
+        self.baseline_squares = {"terms": Counter(), "hashtags": Counter()}
+
+    def _in_window(self, index):
+        return index > self.newest - self.window
+
+    def _bucket(self, index):
+        '''
+        Return the bucket with the given index, advancing the ring buffer if
+        it is newer than the current bucket. Return None if it is older than
+        the baseline.
+        '''
+        if self.newest is None:
+            self.newest = self.oldest = index
+        elif index > self.newest:
+            if index - self.newest >= self.capacity:
+                # Every bucket has expired
+                for bucket in self.buckets:
+                    if bucket is not None:
+                        self._evict(bucket)
+                self.buckets = [None] * self.capacity
+                self.newest = index
+            while self.newest < index:
+                self._advance()
+        elif index <= self.newest - self.capacity:
+            return None
+        self.oldest = min(self.oldest, index)
+        slot = index % self.capacity
+        bucket = self.buckets[slot]
+        if bucket is None:
+            bucket = self.buckets[slot] = Bucket(index)
+        return bucket
+
+    def _advance(self):
+        '''
+        Move the window forward by one bucket: the oldest bucket of the window
+        moves into the baseline, and the oldest bucket of the baseline is
+        evicted.
+        '''
+        self.newest += 1
+        slot = self.newest % self.capacity
+        if self.buckets[slot] is not None:
+            self._evict(self.buckets[slot])
+            self.buckets[slot] = None
+        bucket = self.buckets[(self.newest - self.window) % self.capacity]
+        if bucket is not None and bucket.index == self.newest - self.window:
+            for kind, counts in bucket.counts.items():
+                totals = self.totals[kind]
+                baseline_totals = self.baseline_totals[kind]
+                baseline_squares = self.baseline_squares[kind]
+                for term, count in counts.items():
+                    remaining = totals[term] - count
+                    if remaining:
+                        totals[term] = remaining
+                    else:
+                        del totals[term]
+                    baseline_totals[term] += count
+                    baseline_squares[term] += count * count
+
+    def _evict(self, bucket):
+        '''
+        Remove the counts of a bucket from the running totals.
+        '''
+        if self._in_window(bucket.index):
+            removals = [(self.totals, 1)]
+        else:
+            removals = [(self.baseline_totals, 1),
+                        (self.baseline_squares, 2)]
+        for totals, power in removals:
+            for kind, counts in bucket.counts.items():
+                kind_totals = totals[kind]
+                for term, count in counts.items():
+                    remaining = kind_totals[term] - count ** power
+                    if remaining:
+                        kind_totals[term] = remaining
+                    else:
+                        del kind_totals[term]
+
+    def add(self, timestamp, terms, hashtags=()):
+        '''
+        Add a Tweet.
+
+        **Parameters**
+
+            timestamp: *float*
+                The Unix time of the Tweet.
+            terms: *list, str*
+                The filtered terms of the Tweet.
+            hashtags: *list, str*
+                The hashtags of the Tweet.
+
+        **Returns**
+
+            added: *boolean*
+                False if the Tweet was older than the baseline.
+        '''
+        bucket = self._bucket(int(timestamp // self.bucket_width))
+        if bucket is None:
+            self.late += 1
+            return False
+        bucket.ntweets += 1
+        in_window = self._in_window(bucket.index)
+        for kind, tokens in (("terms", terms), ("hashtags", hashtags)):
+            if not tokens:
+                continue
+            counts = bucket.counts[kind]
+            if in_window:
+                totals = self.totals[kind]
+                for term in tokens:
+                    counts[term] += 1
+                    totals[term] += 1
+            else:
+                # A late Tweet in a bucket of the baseline
+                baseline_totals = self.baseline_totals[kind]
+                baseline_squares = self.baseline_squares[kind]
+                for term in tokens:
+                    count = counts[term]
+                    counts[term] = count + 1
+                    baseline_totals[term] += 1
+                    baseline_squares[term] += 2 * count + 1
+        if self.lexicon is not None and terms:
+            share = 1.0 / len(terms)
+            shares = bucket.shares
+            for term in terms:
+                shares[term] += share
+            bucket.so_count += 1
+            # Count the pairs of positions of a term and a word of the
+            # lexicons, as in analysis.add_co_occurrences. Unless symmetric,
+            # a term is only associated with the words that come after it in
+            # alphabetical order, as in the triangular matrix.
+            pairs = bucket.pairs
+            lexicon = self.lexicon
+            symmetric = self.symmetric
+            for j, word in enumerate(terms):
+                if word in lexicon:
+                    for i, term in enumerate(terms):
+                        if i != j and term != word and \
+                                (symmetric or term < word):
+                            pairs[term, word] += 1
+        return True
+
+    def _window_buckets(self):
+        if self.newest is None:
+            return []
+        buckets = []
+        for index in range(self.newest - self.window + 1, self.newest + 1):
+            bucket = self.buckets[index % self.capacity]
+            if bucket is not None and bucket.index == index:
+                buckets.append(bucket)
+        return buckets
+
+    def top(self, n, kind="terms"):
+        '''
+        Return the n most common terms or hashtags of the window, along with
+        their counts.
+        '''
+        return top_k(self.totals[kind].items(), n)
+
+    def bursts(self, n, kind="terms", min_count=5):
+        '''
+        Return the n terms or hashtags with the highest burst scores, along
+        with their scores. Terms that appear fewer than min_count times in the
+        window are not scored.
+        '''
+        baseline_totals = self.baseline_totals[kind]
+        baseline_squares = self.baseline_squares[kind]
+        nbaseline = self.baseline_length()
+        scores = []
+        for term, count in self.totals[kind].items():
+            if count < min_count:
+                continue
+            mean = variance = 0.0
+            if nbaseline:
+                mean = baseline_totals.get(term, 0) / nbaseline
+                variance = max(baseline_squares.get(term, 0) / nbaseline -
+                               mean * mean, 0.0)
+            rate = count / self.window
+            scores.append((term, (rate - mean) / sqrt(variance + 1)))
+        return top_k(scores, n)
+
+    def baseline_length(self):
+        '''
+        Return the number of buckets of the baseline that the stream has
+        already covered.
+        '''
+        if self.newest is None:
+            return 0
+        return max(0, min(self.baseline,
+                          self.newest - self.window + 1 - self.oldest))
+
+    def orientations(self):
+        '''
+        Return the semantic orientation of every term of the window that
+        appears in the same Tweet as a word of the lexicons, as a dict. The
+        orientations are those of semantic.semantic_orientations for the
+        Tweets of the window, with the full co-occurrence mode.
+        '''
+        if self.lexicon is None:
+            return {}
+        pairs = Counter()
+        ntweets = 0
+        for bucket in self._window_buckets():
+            pairs.update(bucket.pairs)
+            ntweets += bucket.ntweets
+        term_counts = self.totals["terms"]
+        lexicon = self.lexicon
+        orientations = Counter()
+        for (term, word), count in pairs.items():
+            # PMI(t, w) = log2(P(t, w) / (P(t) * P(w)))
+            orientations[term] += lexicon[word] * log2(
+                count * ntweets / (term_counts[term] * term_counts[word]))
+        return orientations
+
+    def average_orientation(self):
+        '''
+        Return the average semantic orientation of the Tweets of the window,
+        or None if no Tweet of the window has terms or the lexicons were not
+        given.
+        '''
+        if self.lexicon is None:
+            return None
+        shares = Counter()
+        so_count = 0
+        for bucket in self._window_buckets():
+            shares.update(bucket.shares)
+            so_count += bucket.so_count
+        if not so_count:
+            return None
+        orientations = self.orientations()
+        return fsum(share * orientations[term] for term, share in
+                    shares.items() if term in orientations) / so_count
+
+    def window_start(self):
+        '''
+        Return the Unix time of the start of the window.
+        '''
+        if self.newest is None:
+            return None
+        return (self.newest - self.window + 1) * self.bucket_width
+
+    def report(self, n, min_count=5):
+        '''
+        Return the results of the window as a dict.
+        '''
+        return {"window_start": self.window_start(),
+                "window_end": None if self.newest is None else
+                (self.newest + 1) * self.bucket_width,
+                "tweets": sum(bucket.ntweets for bucket in
+                              self._window_buckets()),
+                "top_terms": self.top(n),
+                "top_hashtags": self.top(n, "hashtags"),
+                "trending_terms": self.bursts(n, "terms", min_count),
+                "trending_hashtags": self.bursts(n, "hashtags", min_count),
+                "average_orientation": self.average_orientation()}
+
+
+def timed_terms(filename, term_filter):
+    '''
+    Generator that yields the Unix time, the filtered terms and the hashtags
+    of each Tweet in a .json file.
+    '''
+    term_filter = resolve_filter(term_filter)
+    reader = TweetReader(filename, ("text", "created_at"),
+                         required=("text", "created_at"))
+    pending = deque()
+
+    def texts():
+        for text, created_at in reader:
+            pending.append(created_at)
+            yield text
+
+    for tokens in preprocess_many(texts()):
+        created_at = pending.popleft()
+        try:
+            timestamp = parse_created_at(created_at)
+        except (ValueError, KeyError):
+            continue
+        yield timestamp, term_filter(tokens), \
+            [token for token in tokens if token.startswith("#")]
+
+
+def get_parser():
+    '''
+    Get the parser for any arguments in the command line.
+    '''
+    parser = argparse.ArgumentParser(description="Find trending terms")
+    parser.add_argument("-i", "--input", dest="input", required=True,
+                        help="The .json file to analyze")
+    parser.add_argument("-f", "--filter", dest="term_filter",
+                        default="terms_only", help="The term filter to use")
+    parser.add_argument("-n", dest="n", type=int, default=10,
+                        help="The number of terms to return")
+    parser.add_argument("--bucket", dest="bucket", type=int, default=60,
+                        help="The width of a time bucket, in seconds")
+    parser.add_argument("--window", dest="window", type=int, default=5,
+                        help="The number of buckets in the window")
+    parser.add_argument("--baseline", dest="baseline", type=int, default=60,
+                        help="The number of buckets in the baseline")
+    parser.add_argument("--min-count", dest="min_count", type=int, default=5,
+                        help="The minimum count of a trending term in the window")
+    parser.add_argument("--every", dest="every", type=int, default=0,
+                        help="Print the results every this many buckets")
+    parser.add_argument("--sentiment", dest="sentiment", action="store_true",
+                        help="Also report the average semantic orientation")
+    parser.add_argument("--symmetric", dest="symmetric", action="store_true",
+                        help="Use both halves of the co-occurrence matrix for sentiment analysis")
+    return parser
+
+
+def print_report(report):
+    '''
+    Print the results of a window in the terminal.
+    '''
+    print("\nWindow %d-%d: %d tweets" % (report["window_start"],
+                                         report["window_end"],
+                                         report["tweets"]))
+    print("Top terms: %s" % report["top_terms"])
+    print("Top hashtags: %s" % report["top_hashtags"])
+    print("Trending terms: %s" % report["trending_terms"])
+    print("Trending hashtags: %s" % report["trending_hashtags"])
+    if report["average_orientation"] is not None:
+        print("Average orientation: %.4f" % report["average_orientation"])
+
+
+def main():
+    args = get_parser().parse_args()
+    positive_vocab = negative_vocab = None
+    if args.sentiment:
+        positive_vocab = define_lexicon(os.path.join(LEXICON_DIR,
+                                                     "positive_words.txt"))
+        negative_vocab = define_lexicon(os.path.join(LEXICON_DIR,
+                                                     "negative_words.txt"))
+    buckets = TimeBuckets(args.bucket, args.window, args.baseline,
+                          positive_vocab, negative_vocab, args.symmetric)
+    last = None
+    for timestamp, terms, hashtags in timed_terms(args.input,
+                                                  args.term_filter):
+        newest = buckets.newest
+        if args.every and newest is not None and \
+                timestamp // args.bucket > newest and \
+                (last is None or newest - last >= args.every):
+            print_report(buckets.report(args.n, args.min_count))
+            last = newest
+        buckets.add(timestamp, terms, hashtags)
+    if buckets.newest is not None:
+        print_report(buckets.report(args.n, args.min_count))
+    if buckets.late:
+        print("\n%d tweets were older than the baseline." % buckets.late)
+
+
+if __name__ == '__main__':
+    main()
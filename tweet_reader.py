@@ -0,0 +1,230 @@
+'''
+This Python script contains the reader that every analysis function uses to
+read Tweets from a .json file (one Tweet per line, as saved by
+collect_data.py). The reader:
+    reads the file in large blocks
+    reads gzip-compressed files (.json.gz, .jsonl.gz) transparently
+    skips lines that are not Tweets, such as delete and limit notices, before
+    decoding them
+    only extracts the requested fields of each Tweet
+    uses orjson to decode JSON when it is installed, and the json module
+    otherwise
+
+Since the short fields of a Tweet, such as created_at, id and text, come
+before its large nested objects (user, entities, retweeted_status), a field
+is normally found by scanning the start of the line and decoding only its
+value. If a field cannot be found that way, the whole line is decoded.
+'''
+import gzip
+import io
+import json
+import re
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    def loads(data):
+        '''
+        Decode JSON with orjson, falling back on the json module for the
+        lines that orjson rejects but the json module accepts, such as the
+        lone surrogates ("\\ud83d") of Tweets truncated in an emoji.
+        '''
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+else:
+    loads = json.loads
+
+GZIP_MAGIC = b"\x1f\x8b"
+# Tokens used to find the keys at the top level of a JSON object: strings and
+# the brackets that change the depth
+structure_re = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+string_re = re.compile(rb'"(?:[^"\\]|\\.)*"')
+scalar_re = re.compile(rb'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+space_re = re.compile(rb'[ \t\r\n]*')
+
+
+def is_compressed(filename):
+    '''
+    Check whether a file is gzip-compressed, from its name or its first bytes.
+    '''
+    if filename.endswith(".gz"):
+        return True
+    with open(filename, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def open_input(filename, block_size=1 << 20):
+    '''
+    Open a .json file, or a gzip-compressed one, for reading in binary mode
+    with a buffer of the given size.
+    '''
+    if is_compressed(filename):
+        return io.BufferedReader(gzip.open(filename, 'rb'), block_size)
+    return open(filename, 'rb', buffering=block_size)
+
+
+def scan_fields(line, fields):
+    '''
+    Find the values of top-level fields by scanning a line of JSON, without
+    decoding the nested objects of the line.
+
+    **Parameters**
+
+        line: *bytes*
+            A line with a JSON object.
+        fields: *dict*
+            The names of the fields as bytes, mapped to their index.
+
+    **Returns**
+
+        values: *list*
+            The value of each field, or None if not every field was found
+            before the first nested object.
+    '''
+    values = [None] * len(fields)
+    remaining = len(fields)
+    depth = 0
+    position = 0
+    while remaining:
+        match = structure_re.search(line, position)
+        if match is None:
+            return None
+        token = match.group()
+        position = match.end()
+        if token == b"{" or token == b"[":
+            depth += 1
+            if depth > 1:
+                # The remaining fields are after a nested object
+                return None
+            continue
+        if token == b"}" or token == b"]":
+            depth -= 1
+            continue
+        # The token is a string. It is a key if it is followed by a colon.
+        colon = space_re.match(line, position).end()
+        if depth != 1 or line[colon:colon + 1] != b":":
+            continue
+        index = fields.get(token[1:-1])
+        start = space_re.match(line, colon + 1).end()
+        if index is None:
+            position = start
+            continue
+        value = string_re.match(line, start) or scalar_re.match(line, start)
+        if value is None:
+            return None
+        values[index] = loads(value.group())
+        remaining -= 1
+        position = value.end()
+    return values
+
+
+def extract_fields(line, fields):
+    '''
+    Extract top-level fields from a line of JSON. Fields that are not in the
+    line are returned as None.
+    '''
+    names = {field.encode("utf-8"): i for i, field in enumerate(fields)}
+    values = scan_fields(line, names)
+    if values is None:
+        tweet = loads(line)
+        if not isinstance(tweet, dict):
+            return [None] * len(fields)
+        values = [tweet.get(field) for field in fields]
+    return values
+
+
+class TweetReader(object):
+    '''
+    Iterable that yields the requested fields of each Tweet in a .json file.
+
+    **Parameters**
+
+        filename: *str*
+            The name of the .json file, which can be gzip-compressed.
+        fields: *tuple, str*
+            The names of the top-level fields to extract. If a single field is
+            requested, its value is yielded; otherwise a list of values is
+            yielded.
+        required: *tuple, str, optional*
+            The fields that a line must have to be a Tweet. By default, the
+            first field is required.
+        start: *int*
+            The byte offset at which to start reading. It must be the start of
+            a line. Only uncompressed files can be read from an offset.
+        end: *int, optional*
+            The byte offset at which to stop reading. A line that starts
+            before end is read in full.
+        block_size: *int*
+            The size of the blocks in which the file is read.
+
+    **Attributes**
+
+        count: *int*
+            The number of lines read so far.
+        ntweets: *int*
+            The number of Tweets yielded so far.
+        errors: *int*
+            The number of lines that were not valid JSON, such as a last line
+            that is still being written.
+    '''
+
+    def __init__(self, filename, fields=("text",), required=None, start=0,
+                 end=None, block_size=1 << 20):
+        self.filename = filename
+        self.fields = tuple(fields)
+        if required is None:
+            required = self.fields[:1]
+        self.required = tuple(required)
+        self.start = start
+        self.end = end
+        self.block_size = block_size
+        self.count = 0
+        self.ntweets = 0
+        self.errors = 0
+
+    def __iter__(self):
+        self.count = 0
+        self.ntweets = 0
+        self.errors = 0
+        fields = self.fields
+        names = {field.encode("utf-8"): i for i, field in enumerate(fields)}
+        required = [fields.index(field) for field in self.required]
+        # Lines without these keys cannot be Tweets, so they are not decoded
+        markers = [b'"%s"' % field.encode("utf-8")
+                   for field in self.required]
+        single = len(fields) == 1
+        end = self.end
+        with open_input(self.filename, self.block_size) as f:
+            if self.start:
+                f.seek(self.start)
+            position = self.start
+            for line in f:
+                if end is not None and position >= end:
+                    break
+                position += len(line)
+                self.count += 1
+                if not all(marker in line for marker in markers):
+                    continue
+                try:
+                    values = scan_fields(line, names)
+                    if values is None:
+                        tweet = loads(line)
+                        values = [tweet.get(field) for field in fields]
+                except (ValueError, AttributeError):
+                    self.errors += 1
+                    continue
+                if any(values[i] is None for i in required):
+                    continue
+                self.ntweets += 1
+                yield values[0] if single else values
+
+
+def read_texts(filename, start=0, end=None):
+    '''
+    Return a TweetReader that yields the text of each Tweet in a .json file.
+    '''
+    return TweetReader(filename, ("text",), start=start, end=end)
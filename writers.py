@@ -0,0 +1,317 @@
+'''
+This Python script contains the writer that saves streamed Tweets to disk. It
+keeps the output file open, collects Tweets in a buffer and writes the buffer
+in one go when it holds enough data or when enough time has passed, instead
+of opening the file for every Tweet. It can also:
+    compress the output with gzip
+    rotate the output into numbered files by size or by age
+    do all of the writing in a background thread, which is fed through a
+    bounded queue so that the streaming callback never waits on the disk
+
+An error raised while writing in the background thread is kept and raised
+again by the next call to write or close, so that it is not lost.
+'''
+import gzip
+import os
+import queue
+import string
+import threading
+import time
+
+
+def convert_valid(char):
+    '''
+    Converts a character into an appropriate one for use in filenames. If a
+    character is invalid, it will be replaced with a '_' character.
+    '''
+    # Define string with all valid characters for filenames
+    valid_chars = "-_.%s%s" % (string.ascii_letters, string.digits)
+    # Check if the character is valid or not and replace the invalid character
+    if char in valid_chars:
+        return char
+    else:
+        return '_'
+
+
+def format_filename(filename):
+    '''
+    Converts the filename into a string with suitable characters. It takes in
+    the name of the file to be converted and will return the appropriate
+    string.
+    '''
+    return ''.join(convert_valid(char) for char in filename)
+
+
+class StreamWriter(object):
+    '''
+    Buffered writer for streamed Tweets.
+
+    **Parameters**
+
+        filename: *str*
+            The name of the output file, such as data/stream_QUERY.json. When
+            rotation is used, the parts are named data/stream_QUERY.0001.json,
+            data/stream_QUERY.0002.json, etc.
+        compress: *boolean*
+            Whether to write gzip-compressed files, in which case ".gz" is
+            added to the file names.
+        flush_bytes: *int*
+            The size of the buffer, in bytes, above which it is written.
+        flush_interval: *float*
+            The maximum time, in seconds, that a Tweet stays in the buffer.
+            Without a background thread, a timer thread writes the buffer
+            when no new Tweet arrives in time.
+        rotate_bytes: *int, optional*
+            The size, in bytes, above which a new file is started.
+        rotate_interval: *float, optional*
+            The time, in seconds, after which a new file is started.
+        background: *boolean*
+            Whether to write in a background thread.
+        queue_size: *int*
+            The number of Tweets the queue of the background thread can hold.
+            Tweets that arrive while the queue is full are dropped.
+        on_write: *function, optional*
+            A function called after every write to disk with the number of
+            Tweets written and the time of the write, for example to measure
+            how long Tweets take to reach the disk.
+
+    **Attributes**
+
+        written: *int*
+            The number of Tweets that have been written to disk.
+        dropped: *int*
+            The number of Tweets that were dropped because the queue was full.
+        error: *Exception*
+            The error that stopped the background thread, or None.
+    '''
+
+    def __init__(self, filename, compress=False, flush_bytes=1 << 20,
+                 flush_interval=1.0, rotate_bytes=None, rotate_interval=None,
+                 background=False, queue_size=10000, on_write=None):
+        self.filename = filename
+        self.compress = compress
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval
+        self.on_write = on_write
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._last_flush = time.time()
+        self._file = None
+        self._file_bytes = 0
+        self._opened_at = None
+        self._part = self._last_part()
+        self._first_part = self._part + 1 if self.rotating else 0
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        if background:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        else:
+            self._thread = threading.Thread(target=self._run_timer,
+                                            daemon=True)
+        self._thread.start()
+
+    @property
+    def rotating(self):
+        return self.rotate_bytes is not None or \
+            self.rotate_interval is not None
+
+    def part_name(self, part):
+        '''
+        Return the name of the file of a given part.
+        '''
+        root, ext = os.path.splitext(self.filename)
+        if self.rotating:
+            name = "%s.%04d%s" % (root, part, ext)
+        else:
+            name = self.filename
+        return name + ".gz" if self.compress else name
+
+    def _last_part(self):
+        '''
+        Find the last existing part, so that rotation never overwrites the
+        files of an earlier run.
+        '''
+        if not self.rotating:
+            return 0
+        part = 0
+        while os.path.exists(self.part_name(part + 1)):
+            part += 1
+        return part
+
+    def files(self):
+        '''
+        Return the names of the files that have been written so far.
+        '''
+        return [self.part_name(part) for part in
+                range(self._first_part, self._part + 1)
+                if os.path.exists(self.part_name(part))]
+
+    def _open(self):
+        '''
+        Open the next output file.
+        '''
+        if self.rotating:
+            self._part += 1
+        name = self.part_name(self._part)
+        if self.compress:
+            # Appending to a gzip file adds a new member, which is still a
+            # valid gzip file
+            self._file = gzip.open(name, 'ab')
+        else:
+            self._file = open(name, 'ab')
+        self._file_bytes = 0
+        self._opened_at = time.time()
+
+    def _needs_rotation(self):
+        if self._file is None:
+            return True
+        if self.rotate_bytes is not None and \
+                self._file_bytes >= self.rotate_bytes:
+            return True
+        if self.rotate_interval is not None and \
+                time.time() - self._opened_at >= self.rotate_interval:
+            return True
+        return False
+
+    def _write_buffer(self):
+        '''
+        Write the contents of the buffer to the output file.
+        '''
+        if self._buffer:
+            if self._needs_rotation():
+                if self._file is not None:
+                    self._file.close()
+                self._open()
+            data = b"".join(self._buffer)
+            self._file.write(data)
+            self._file.flush()
+            self._file_bytes += len(data)
+            self.written += len(self._buffer)
+            if self.on_write is not None:
+                self.on_write(len(self._buffer), time.time())
+            self._buffer = []
+            self._buffer_bytes = 0
+        self._last_flush = time.time()
+
+    def _add(self, data):
+        '''
+        Add a Tweet to the buffer and write the buffer if it is full or old.
+        '''
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._buffer.append(data)
+        self._buffer_bytes += len(data)
+        if self._buffer_bytes >= self.flush_bytes or \
+                time.time() - self._last_flush >= self.flush_interval:
+            self._write_buffer()
+
+    def _run(self):
+        '''
+        Main loop of the background thread. An error is kept in the error
+        attribute and stops the thread.
+        '''
+        try:
+            while True:
+                try:
+                    data = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    with self._lock:
+                        self._write_buffer()
+                    continue
+                if data is None:
+                    break
+                with self._lock:
+                    self._add(data)
+            with self._lock:
+                self._write_buffer()
+        except Exception as e:
+            self.error = e
+
+    def _run_timer(self):
+        '''
+        Main loop of the timer thread, which writes the buffer once it is
+        older than flush_interval when Tweets are written in the foreground.
+        '''
+        try:
+            while not self._closing.wait(self.flush_interval):
+                with self._lock:
+                    if self._buffer and time.time() - self._last_flush >= \
+                            self.flush_interval:
+                        self._write_buffer()
+        except Exception as e:
+            self.error = e
+
+    def _check_error(self):
+        '''
+        Raise the error of the background thread, if there was one.
+        '''
+        if self.error is not None:
+            raise self.error
+
+    def write(self, data):
+        '''
+        Write a Tweet. With a background thread, the Tweet is only put in the
+        queue.
+
+        **Returns**
+
+            accepted: *boolean*
+                False if the Tweet was dropped because the queue was full.
+        '''
+        self._check_error()
+        if self._queue is None:
+            with self._lock:
+                self._add(data)
+            return True
+        try:
+            self._queue.put_nowait(data)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self):
+        '''
+        Write the contents of the buffer to disk. Tweets that are still in the
+        queue of the background thread are written by the thread.
+        '''
+        with self._lock:
+            self._write_buffer()
+
+    def close(self):
+        '''
+        Write all of the remaining Tweets and close the output file. If the
+        background thread failed, the file is closed and its error is raised.
+        '''
+        if self._thread is not None:
+            self._closing.set()
+            while self._queue is not None and self._thread.is_alive():
+                # The queue may stay full if the thread has just failed
+                try:
+                    self._queue.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            self._thread.join()
+            self._thread = None
+        try:
+            self._check_error()
+            self.flush()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()